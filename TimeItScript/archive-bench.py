@@ -0,0 +1,432 @@
+"""
+archive-bench.py - benchmark the archive readers (testdata.py, data.py, test.py)
+
+Generates a synthetic archive (member count, size distribution, compression
+mix) with the testdata.py writer, then times list / extract / verify /
+index-lookup for every reader that supports the operation. Each case runs in
+a fresh subprocess so peak RSS belongs to that case alone.
+
+Every case is written as one JSON file shaped like `time-script.py --json`
+(plus mb_per_s / records_per_s / commit), named <reader>-<op>-<timestamp>.json,
+so two runs can be compared with json-report.py:
+
+  python archive-bench.py --members 2000 --size-dist lognormal --mean-kb 32 \\
+      --mix lzma:2,zlib:1,bzip2:1 --runs 3 --out-dir bench
+  python json-report.py bench/testdata-extract-<old>.json bench/testdata-extract-<new>.json
+
+  python archive-bench.py --archive ../data.arc --runs 5    # bench an existing archive
+"""
+
+import os
+import sys
+import io
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from contextlib import redirect_stdout, redirect_stderr
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+FORMAT_JSON = {
+    "config": {"default": "ArchiveFile"},
+    "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                    "name": "ArchiveFile", "extension": ".arc", "ver": "001"},
+}
+
+# reader -> operations it supports
+CASES = {
+    "testdata": ("list", "extract", "verify", "index-lookup"),
+    "data": ("list", "extract"),
+    "test": ("list", "extract", "verify", "index-lookup", "headers"),
+}
+
+WORDS = ("archive member header checksum delimiter payload stream record index "
+         "format magic offset buffer reader writer extract verify compress lzma "
+         "bzip2 zlib json field size block seek token").split()
+
+
+# --- Module loading ---
+
+def load_repo_module(name):
+    """
+    Import <repo>/<name>.py under a private name ('test' would otherwise
+    resolve to the stdlib test package).
+    """
+    mod_name = "bench_" + name
+    if mod_name in sys.modules:
+        return sys.modules[mod_name]
+    spec = importlib.util.spec_from_file_location(mod_name, REPO_DIR / (name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses look the module up in sys.modules while it executes
+    sys.modules[mod_name] = module
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+# --- Synthetic archive generator ---
+
+def parse_mix(mix):
+    """'lzma:2,zlib:1' -> ['lzma', 'lzma', 'zlib'] (a weighted round-robin cycle)."""
+    cycle = []
+    for part in mix.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        codec, _, weight = part.partition(":")
+        cycle.extend([codec.strip()] * int(weight or 1))
+    if not cycle:
+        raise ValueError("empty --mix")
+    return cycle
+
+
+def member_sizes(rng, count, dist, mean_bytes):
+    """Sizes for count members drawn from dist ('fixed', 'uniform' or 'lognormal')."""
+    sizes = []
+    for _ in range(count):
+        if dist == "fixed":
+            size = mean_bytes
+        elif dist == "uniform":
+            size = rng.randint(0, 2 * mean_bytes)
+        elif dist == "lognormal":
+            # sigma 1.0; mu chosen so the distribution mean is mean_bytes
+            size = int(rng.lognormvariate(math.log(max(mean_bytes, 1)) - 0.5, 1.0))
+        else:
+            raise ValueError(f"unknown size distribution: {dist}")
+        sizes.append(size)
+    return sizes
+
+
+def generate_tree(root, members, dist, mean_bytes, random_pct, seed, per_dir=64):
+    """
+    Write members files under root/bench, per_dir files per directory. Content
+    is word text with random_pct percent random bytes mixed in, so the
+    compression ratio is tunable. Returns (list of file paths, total bytes).
+    """
+    rng = random.Random(seed)
+    text_pool = " ".join(rng.choice(WORDS) for _ in range(200_000)).encode("ascii")
+    rand_pool = rng.randbytes(len(text_pool)) if hasattr(rng, "randbytes") else os.urandom(len(text_pool))
+    pool_len = len(text_pool)
+
+    paths = []
+    total = 0
+    for i, size in enumerate(member_sizes(rng, members, dist, mean_bytes)):
+        sub = os.path.join(root, "bench", f"d{i // per_dir:04d}")
+        if i % per_dir == 0:
+            os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f"m{i:06d}.dat")
+        with open(path, "wb") as out:
+            left = size
+            while left > 0:
+                n = min(left, 64 * 1024)
+                pool = rand_pool if rng.random() * 100 < random_pct else text_pool
+                start = rng.randrange(0, pool_len - n) if pool_len > n else 0
+                out.write(pool[start:start + n])
+                left -= n
+        paths.append(path)
+        total += size
+    return paths, total
+
+
+def build_archive(work, opts):
+    """Generate the source tree and pack it; returns the archive path."""
+    testdata = load_repo_module("testdata")
+    src_root = os.path.join(work, "src")
+    paths, total = generate_tree(src_root, opts.members, opts.size_dist, int(opts.mean_kb * 1024),
+                                 opts.random_pct, opts.seed)
+    cycle = parse_mix(opts.mix)
+    codec_of = {p: cycle[i % len(cycle)] for i, p in enumerate(paths)}
+    arc_path = os.path.join(work, "bench.arc")
+    print(f"Generated {len(paths)} members ({total / (1024 * 1024):.1f} MB, {opts.size_dist}, mix {opts.mix})")
+    old_cwd = os.getcwd()
+    os.chdir(src_root)
+    try:
+        testdata.create_archive(arc_path, opts.fmt, ["bench"], jobs=opts.pack_jobs,
+                                comp_for=lambda e: codec_of.get(os.path.join(src_root, e.src), cycle[0]))
+    finally:
+        os.chdir(old_cwd)
+    return arc_path
+
+
+def count_records(arc_path, fmt_path):
+    """(records, file members) as seen by testdata.py's scanner; also picks a lookup target."""
+    testdata = load_repo_module("testdata")
+    default_key, registry = testdata.load_formats(fmt_path)
+    fmt = testdata.detect_format(arc_path, registry, default_key)
+    records = files = 0
+    target = ""
+    with redirect_stdout(io.StringIO()):
+        with testdata.open_archive(arc_path) as f:
+            for r, loc in testdata.iter_members(f, testdata.make_token_reader(fmt.delimiter), fmt):
+                records += 1
+                if loc is not None:
+                    files += 1
+                    target = r.name
+    return records, files, target
+
+
+# --- Operations (run inside the case subprocess) ---
+
+def op_testdata(op, arc, fmt, out_dir, target):
+    testdata = load_repo_module("testdata")
+    if op == "list":
+        return testdata.list_archive(arc, fmt, use_index=False)
+    if op == "extract":
+        return testdata.extract_archive(arc, fmt, out_dir, use_index=False)
+    if op == "verify":
+        return testdata.extract_archive(arc, fmt, out_dir, use_index=False, verify=True)
+    if op == "index-lookup":
+        return testdata.extract_archive(arc, fmt, out_dir, names=[target], use_index=True)
+    raise ValueError(op)
+
+
+def op_data(op, arc, fmt, out_dir, target):
+    data = load_repo_module("data")
+    data.process_archive(arc, fmt, out_dir, op == "list")
+    return 0
+
+
+def op_test(op, arc, fmt, out_dir, target):
+    test = load_repo_module("test")
+    specs = test.__file_format_dict__
+    with open(arc, "rb") as fp:
+        if op == "list":
+            res = test.ReadFileDataWithContentToArray(fp, listonly=True, formatspecs=specs)
+        elif op == "verify":
+            res = test.ReadFileDataWithContentToArray(fp, uncompress=False, formatspecs=specs)
+        elif op == "extract":
+            res = test.ReadFileDataWithContentToArray(fp, formatspecs=specs, lazy=True)
+            for m in res["ffilelist"] if res else []:
+                if m.ftype != 0:
+                    continue
+                out_path = os.path.join(out_dir, m.fname[2:] if m.fname.startswith("./") else m.fname.lstrip("/"))
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                src = m.open()
+                with open(out_path, "wb") as w:
+                    shutil.copyfileobj(src, w)
+                src.close()
+        elif op == "headers":
+            # header parsing only: lazy members, contents hopped over, no checksums
+            res = test.ReadFileDataWithContentToArray(fp, formatspecs=specs, lazy=True, skipchecksum=True)
+        elif op == "index-lookup":
+            # test.py has no sidecar index; seekstart hops straight to the member
+            head = test.ReadFileDataWithContentToArray(fp, listonly=True, formatspecs=specs, lazy=True)
+            names = [m.fname for m in head["ffilelist"]] if head else []
+            pos = names.index(target) if target in names else 0
+            res = test.ReadFileDataWithContentToArray(fp, seekstart=pos, seekend=pos + 1, formatspecs=specs)
+        else:
+            raise ValueError(op)
+    return 0 if res else 1
+
+
+OPS = {"testdata": op_testdata, "data": op_data, "test": op_test}
+
+
+def rusage():
+    if resource is None:
+        return None, None, None
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    return r.ru_utime, r.ru_stime, r.ru_maxrss
+
+
+def run_case(reader, op, arc, fmt, work, target, runs, warmup):
+    """Child side: warmup + measured runs of one case; prints one JSON line."""
+    out_dir = os.path.join(work, f"out-{reader}-{op}")
+    # import outside the timed region
+    load_repo_module(reader)
+    samples = []
+    worst_exit = 0
+    for i in range(warmup + runs):
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir, exist_ok=True)
+        u0, s0, _ = rusage()
+        t0 = time.perf_counter()
+        sink = io.StringIO()
+        try:
+            with redirect_stdout(sink), redirect_stderr(sink):
+                code = OPS[reader](op, arc, fmt, out_dir, target) or 0
+        except Exception as e:
+            print(f"{reader} {op}: {e}", file=sys.stderr)
+            code = 1
+        real = time.perf_counter() - t0
+        u1, s1, _ = rusage()
+        worst_exit = code if code else worst_exit
+        if i >= warmup:
+            samples.append({"real": real,
+                            "user": None if u0 is None else u1 - u0,
+                            "sys": None if s0 is None else s1 - s0})
+    shutil.rmtree(out_dir, ignore_errors=True)
+    _, _, peak_kb = rusage()
+    print(json.dumps({"samples": samples, "peak_kb": peak_kb, "worst_exit": worst_exit}))
+
+
+# --- Parent side: summaries ---
+
+def mean_std(values):
+    vals = [v for v in values if v is not None]
+    if not vals:
+        return (None, None)
+    m = sum(vals) / len(vals)
+    if len(vals) > 1:
+        sd = math.sqrt(sum((x - m) ** 2 for x in vals) / (len(vals) - 1))
+    else:
+        sd = 0.0
+    return (m, sd)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def summarize(reader, op, child, opts, arc_bytes, records, commit, note):
+    real_mean, real_sd = mean_std([s["real"] for s in child["samples"]])
+    user_mean, user_sd = mean_std([s["user"] for s in child["samples"]])
+    sys_mean, sys_sd = mean_std([s["sys"] for s in child["samples"]])
+    peak_kb = child.get("peak_kb")
+    # index-lookup touches one member; throughput figures would be meaningless
+    whole = op != "index-lookup"
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "script": f"{reader}.py",
+        "args": [op],
+        "runs": opts.runs,
+        "warmup": opts.warmup,
+        "real_avg_s": real_mean,
+        "real_sd_s": real_sd,
+        "user_avg_s": user_mean,
+        "user_sd_s": user_sd,
+        "sys_avg_s": sys_mean,
+        "sys_sd_s": sys_sd,
+        "peak_mem_mb": None if peak_kb is None else peak_kb / 1024.0,
+        "worst_exit": child.get("worst_exit"),
+        "reader": reader,
+        "op": op,
+        "archive_bytes": arc_bytes,
+        "records": records,
+        "mb_per_s": arc_bytes / real_mean / (1024 * 1024) if whole and real_mean else None,
+        "records_per_s": records / real_mean if whole and real_mean else None,
+        "commit": commit,
+        "note": note,
+    }
+
+
+def _fmt(v, spec):
+    width = int(spec.split(".")[0]) if spec[0].isdigit() else 0
+    return "N/A".rjust(width) if v is None else format(v, spec)
+
+
+def print_table(results):
+    print(f"{'reader':<9} {'op':<13} {'real':>9} {'MB/s':>9} {'rec/s':>10} {'peak MB':>8} {'exit':>4}")
+    for r in results:
+        print(f"{r['reader']:<9} {r['op']:<13} {_fmt(r['real_avg_s'], '8.3f')}s {_fmt(r['mb_per_s'], '9.1f')} "
+              f"{_fmt(r['records_per_s'], '10.0f')} {_fmt(r['peak_mem_mb'], '8.1f')} {r['worst_exit']:>4}")
+
+
+def parse_args(argv):
+    ap = argparse.ArgumentParser(description="Benchmark testdata.py / data.py / test.py on synthetic archives.")
+    ap.add_argument("--archive", default=None, help="Bench this existing archive instead of generating one")
+    ap.add_argument("--members", type=int, default=500, help="Generated member count (default: 500)")
+    ap.add_argument("--size-dist", choices=("fixed", "uniform", "lognormal"), default="lognormal",
+                    help="Member size distribution (default: lognormal)")
+    ap.add_argument("--mean-kb", type=float, default=32.0, help="Mean member size in KiB (default: 32)")
+    ap.add_argument("--random-pct", type=float, default=20.0,
+                    help="Percent of content that is incompressible random bytes (default: 20)")
+    ap.add_argument("--mix", default="lzma:1,bzip2:1,zlib:1", help="Compression mix, codec:weight,... ")
+    ap.add_argument("--seed", type=int, default=1, help="Generator seed (default: 1)")
+    ap.add_argument("--pack-jobs", type=int, default=os.cpu_count() or 1, help="Threads used to pack the archive")
+    ap.add_argument("--readers", default="testdata,data,test", help="Comma-separated readers to bench")
+    ap.add_argument("--ops", default="list,extract,verify,index-lookup,headers",
+                    help="Comma-separated operations (headers: test.py header walk, records/s = headers/s)")
+    ap.add_argument("--runs", type=int, default=3, help="Measured runs per case (default: 3)")
+    ap.add_argument("--warmup", type=int, default=1, help="Warmup runs per case (default: 1)")
+    ap.add_argument("--out-dir", default="bench-results", help="Directory for per-case JSON (default: bench-results)")
+    ap.add_argument("--work-dir", default=None, help="Scratch directory (default: a temp dir, removed afterwards)")
+    ap.add_argument("--note", default=None, help="Free-form note stored in each JSON")
+    # internal: run one case in this (child) process
+    ap.add_argument("--run-case", nargs=2, metavar=("READER", "OP"), help=argparse.SUPPRESS)
+    ap.add_argument("--fmt", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--target", default="", help=argparse.SUPPRESS)
+    return ap.parse_args(argv)
+
+
+def main():
+    opts = parse_args(sys.argv[1:])
+
+    if opts.run_case:
+        reader, op = opts.run_case
+        run_case(reader, op, opts.archive, opts.fmt, opts.work_dir, opts.target, opts.runs, opts.warmup)
+        return 0
+
+    work = opts.work_dir or tempfile.mkdtemp(prefix="archive-bench-")
+    os.makedirs(work, exist_ok=True)
+    try:
+        fmt_path = os.path.join(work, "archivefile.json")
+        with open(fmt_path, "w", encoding="utf-8") as jf:
+            json.dump(FORMAT_JSON, jf)
+        opts.fmt = fmt_path
+
+        if opts.archive:
+            # work on a copy so the .arcidx sidecar lands in the scratch dir
+            arc_path = os.path.join(work, "bench.arc")
+            shutil.copyfile(opts.archive, arc_path)
+        else:
+            arc_path = build_archive(work, opts)
+        arc_bytes = os.path.getsize(arc_path)
+        records, files, target = count_records(arc_path, fmt_path)
+        print(f"Archive {arc_path}: {arc_bytes} bytes, {records} records, {files} file members")
+
+        # index-lookup cases read the sidecar; build it once, outside the timings
+        testdata = load_repo_module("testdata")
+        with redirect_stdout(io.StringIO()):
+            testdata.build_index(arc_path, fmt_path)
+
+        commit = git_commit()
+        stamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+        os.makedirs(opts.out_dir, exist_ok=True)
+        wanted_ops = [o.strip() for o in opts.ops.split(",") if o.strip()]
+        results = []
+        for reader in [r.strip() for r in opts.readers.split(",") if r.strip()]:
+            for op in CASES.get(reader, ()):
+                if op not in wanted_ops:
+                    continue
+                cmd = [sys.executable, os.path.abspath(__file__), "--run-case", reader, op,
+                       "--archive", arc_path, "--fmt", fmt_path, "--work-dir", work, "--target", target,
+                       "--runs", str(opts.runs), "--warmup", str(opts.warmup)]
+                proc = subprocess.run(cmd, capture_output=True, text=True)
+                lines = proc.stdout.strip().splitlines()
+                if proc.returncode != 0 or not lines:
+                    print(f"{reader} {op}: case failed\n{proc.stderr}")
+                    continue
+                summary = summarize(reader, op, json.loads(lines[-1]), opts, arc_bytes, records, commit, opts.note)
+                with open(os.path.join(opts.out_dir, f"{reader}-{op}-{stamp}.json"), "w") as jf:
+                    json.dump(summary, jf, indent=2, sort_keys=True)
+                results.append(summary)
+
+        print()
+        print_table(results)
+        print(f"\nWrote {len(results)} results to {opts.out_dir}/ (*-{stamp}.json)")
+    finally:
+        if opts.work_dir is None:
+            shutil.rmtree(work, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
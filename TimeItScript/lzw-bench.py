@@ -0,0 +1,172 @@
+"""
+lzw-bench.py - compare the LZW output formats of neozcompress.py
+
+Compresses a few corpora with each packing (the original fixed
+16-bit codes, the compress-style variable-width bit packing, and the same in
+block mode, which clears the table when the ratio drops) and reports the
+ratio plus compress / decompress throughput in MB/s of input data. Every
+result is checked to round-trip before it is timed. The "mixed" corpus
+switches between the others to show what block mode is for.
+
+  python lzw-bench.py                                  # built-in corpora, 512 KiB each
+  python lzw-bench.py --size-kb 2048 --runs 5 --table-size 65536
+  python lzw-bench.py --file ../data.arc --file ../testdata.py --json lzw.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from contextlib import redirect_stdout
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+MODULES = ("neozcompress",)   # altzcompress wraps the same code
+PACKINGS = {   # packing -> lzw_compress_bytes keyword arguments
+    "fixed16": {"fixed_width": True},
+    "variable": {"block_mode": False},
+    "block": {"block_mode": True},
+}
+
+WORDS = ("archive member header checksum delimiter payload stream record index "
+         "format magic offset buffer reader writer extract verify compress lzma "
+         "bzip2 zlib json field size block seek token").split()
+
+
+def load_repo_module(name):
+    """Import <repo>/<name>.py under a private name."""
+    mod_name = "bench_" + name
+    if mod_name in sys.modules:
+        return sys.modules[mod_name]
+    if str(REPO_DIR) not in sys.path:
+        sys.path.insert(0, str(REPO_DIR))   # altzcompress imports neozcompress
+    spec = importlib.util.spec_from_file_location(mod_name, REPO_DIR / (name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+# --- Corpora ---
+
+def builtin_corpora(size, seed):
+    """name -> bytes: word text, repo source code, JSON records, random bytes and a mix of them."""
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(WORDS) for _ in range(size // 4)).encode("ascii")[:size]
+
+    source = b""
+    for path in sorted(REPO_DIR.glob("*.py")):
+        source += path.read_bytes()
+        if len(source) >= size:
+            break
+
+    records = []
+    while sum(len(r) for r in records) < size:
+        records.append(json.dumps({"id": len(records), "name": rng.choice(WORDS),
+                                   "score": rng.randint(0, 1000), "tags": rng.sample(WORDS, 3)}).encode())
+    corpora = {
+        "text": text,
+        "source": source[:size],
+        "json": b"\n".join(records)[:size],
+        "random": rng.randbytes(size) if hasattr(rng, "randbytes") else os.urandom(size),
+    }
+    mixed = b""
+    for i in range(2):
+        for name in ("text", "random", "json", "source"):
+            mixed += corpora[name][i * size // 8:(i + 1) * size // 8]
+    corpora["mixed"] = mixed
+    return corpora
+
+
+# --- Timing ---
+
+def best_time(fn, runs):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_one(module, packing, data, table_size, runs):
+    kwargs = PACKINGS[packing]
+    packed = module.lzw_compress_bytes(data, table_size, **kwargs)
+    if module.lzw_decompress_bytes(packed, table_size) != data:
+        raise RuntimeError(f"{module.__name__} {packing}: round trip failed")
+    comp_s = best_time(lambda: module.lzw_compress_bytes(data, table_size, **kwargs), runs)
+    decomp_s = best_time(lambda: module.lzw_decompress_bytes(packed, table_size), runs)
+    mb = len(data) / (1024 * 1024)
+    return {
+        "bytes_in": len(data),
+        "bytes_out": len(packed),
+        "ratio": len(packed) / len(data) if data else None,
+        "compress_s": comp_s,
+        "decompress_s": decomp_s,
+        "compress_mb_per_s": mb / comp_s if comp_s else None,
+        "decompress_mb_per_s": mb / decomp_s if decomp_s else None,
+    }
+
+
+def _fmt(v, spec):
+    width = int(spec.split(".")[0]) if spec[0].isdigit() else 0
+    return "N/A".rjust(width) if v is None else format(v, spec)
+
+
+def print_table(results):
+    print(f"{'corpus':<12} {'module':<13} {'packing':<9} {'out KB':>9} {'ratio':>6} {'comp MB/s':>10} {'decomp MB/s':>12}")
+    for r in results:
+        print(f"{r['corpus']:<12} {r['module']:<13} {r['packing']:<9} {r['bytes_out'] / 1024:9.1f} "
+              f"{_fmt(r['ratio'], '6.3f')} {_fmt(r['compress_mb_per_s'], '10.2f')} "
+              f"{_fmt(r['decompress_mb_per_s'], '12.2f')}")
+
+
+def parse_args(argv):
+    ap = argparse.ArgumentParser(description="Compare fixed 16-bit, variable-width and block-mode LZW packing.")
+    ap.add_argument("--size-kb", type=int, default=512, help="Size of each built-in corpus in KiB (default: 512)")
+    ap.add_argument("--file", action="append", default=[], help="Bench this file too (repeatable)")
+    ap.add_argument("--no-builtin", action="store_true", help="Only bench the --file corpora")
+    ap.add_argument("--modules", default=",".join(MODULES), help="Comma-separated modules to bench")
+    ap.add_argument("--table-size", type=int, default=4096, help="max_table_size (default: 4096)")
+    ap.add_argument("--runs", type=int, default=3, help="Timed runs per case; the best is kept (default: 3)")
+    ap.add_argument("--seed", type=int, default=1, help="Corpus generator seed (default: 1)")
+    ap.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    return ap.parse_args(argv)
+
+
+def main():
+    opts = parse_args(sys.argv[1:])
+    corpora = {} if opts.no_builtin else builtin_corpora(opts.size_kb * 1024, opts.seed)
+    for path in opts.file:
+        with open(path, "rb") as f:
+            corpora[os.path.basename(path)] = f.read()
+
+    results = []
+    for name, data in corpora.items():
+        for mod_name in [m.strip() for m in opts.modules.split(",") if m.strip()]:
+            module = load_repo_module(mod_name)
+            for packing in PACKINGS:
+                r = bench_one(module, packing, data, opts.table_size, opts.runs)
+                r.update(corpus=name, module=mod_name, packing=packing)
+                results.append(r)
+
+    print_table(results)
+    if opts.json:
+        with open(opts.json, "w") as jf:
+            json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"),
+                       "table_size": opts.table_size, "runs": opts.runs, "results": results},
+                      jf, indent=2, sort_keys=True)
+        print(f"\nWrote {len(results)} results to {opts.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,29 @@
 import os
+import re
 import json
+import hashlib
 import argparse
 import bz2
 import lzma
 import zlib
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+try:
+    import neozcompress
+except ImportError:
+    neozcompress = None
 
 HEXBYTES = b"0123456789abcdefABCDEF"
+READ_BLOCK_SIZE = 256 * 1024
+HEX_BYTE_RE = re.compile(rb"[0-9a-fA-F]")
 
 # ----------------------------
 # Format detection (from *.json)
@@ -66,10 +84,113 @@ def parse_delimiter(delim_value) -> bytes:
         return delim_value.encode("utf-8")
     return b"\x00"
 
+class BufferedArchiveReader:
+    """
+    Block-buffered file wrapper: tokens are split with bytes.find() over large
+    blocks instead of read(1) per byte. read()/seek()/tell() keep working on
+    the logical position, so the scanning helpers below need no changes.
+    """
+
+    def __init__(self, raw, block_size=READ_BLOCK_SIZE):
+        self.raw = raw
+        self.block_size = block_size
+        self._buf = b""
+        self._pos = 0
+        self._base = raw.tell()  # file offset of _buf[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.raw.close()
+
+    def _drop_buffer(self, offset):
+        self._buf = b""
+        self._pos = 0
+        self._base = offset
+
+    def _fill(self):
+        chunk = self.raw.read(self.block_size)
+        if not chunk:
+            return False
+        self._base += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def tell(self):
+        return self._base + self._pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            target = self.tell() + offset
+        elif whence == 2:
+            target = self.raw.seek(offset, 2)
+            self._drop_buffer(target)
+            return target
+        else:
+            target = offset
+
+        if self._base <= target <= self._base + len(self._buf):
+            self._pos = target - self._base
+        else:
+            self.raw.seek(target, 0)
+            self._drop_buffer(target)
+        return target
+
+    def read(self, n=-1):
+        avail = len(self._buf) - self._pos
+        if 0 <= n <= avail:
+            data = self._buf[self._pos:self._pos + n]
+            self._pos += n
+            return data
+
+        head = self._buf[self._pos:]
+        rest = self.raw.read() if n < 0 else self.raw.read(n - avail)
+        self._drop_buffer(self._base + len(self._buf) + len(rest))
+        return head + rest if head else rest
+
+    def search(self, pattern, max_scan):
+        """
+        Move to the start of the next match of pattern (a compiled bytes regex)
+        within max_scan bytes, searching whole blocks. Returns the number of
+        bytes skipped, or None if there is no match (positioned at the end of
+        the data at EOF, or inside the file when max_scan ran out).
+        """
+        start = self.tell()
+        while True:
+            m = pattern.search(self._buf, self._pos)
+            if m is not None:
+                skipped = self.tell() - start + (m.start() - self._pos)
+                if skipped > max_scan:
+                    return None
+                self._pos = m.start()
+                return skipped
+            if self._base + len(self._buf) - start >= max_scan:
+                return None
+            # keep a short tail so a match spanning two blocks is still found
+            self._pos = max(self._pos, len(self._buf) - 64)
+            if not self._fill():
+                self._pos = len(self._buf)
+                return None
+
+    def read_token(self, delim):
+        while True:
+            i = self._buf.find(delim, self._pos)
+            if i != -1:
+                tok = self._buf[self._pos:i]
+                self._pos = i + len(delim)
+                return tok.decode("utf-8", errors="ignore")
+            if not self._fill():
+                tok = self._buf[self._pos:]
+                self._pos = len(self._buf)
+                return tok.decode("utf-8", errors="ignore")
+
 def make_token_reader(delim: bytes):
     """
     Token reader that preserves empty fields (important for this format).
     Delimiter is exactly one byte for your files (NUL), but this works for any single-byte delim.
+    BufferedArchiveReader inputs use its block-splitting read_token().
     """
     if len(delim) != 1:
         # If someone ever sets a multi-byte delimiter, we can add support;
@@ -78,6 +199,9 @@ def make_token_reader(delim: bytes):
     d = delim
 
     def read_token(f):
+        fast = getattr(f, "read_token", None)
+        if fast is not None:
+            return fast(d)
         buf = bytearray()
         while True:
             b = f.read(1)
@@ -96,8 +220,28 @@ def make_token_reader(delim: bytes):
 def is_hex_str(s: str) -> bool:
     return bool(s) and all(c in "0123456789abcdefABCDEF" for c in s)
 
-def scan_to_next_header(f, max_scan=2_000_000):
-    """Skip padding/garbage until we find an ASCII hex digit that can start a header token."""
+def scan_to_next_header(f, max_scan=2_000_000, pattern=None, stats=None):
+    """
+    Skip padding/garbage until we find an ASCII hex digit that can start a header token.
+    With pattern (recovery mode: a delimiter followed by a header-shaped
+    prefix, see header_candidate_re) skip to its next match instead and step
+    over the delimiter; stats, if given, counts resyncs and skipped bytes.
+    BufferedArchiveReader inputs are searched a block at a time.
+    """
+    search = getattr(f, "search", None)
+    if search is not None:
+        skipped = search(pattern or HEX_BYTE_RE, max_scan)
+        if skipped is None:
+            if pattern is not None or not f.read(1):
+                return False
+            raise RuntimeError("Could not find next header within scan limit")
+        if pattern is not None:
+            f.read(1)
+        if stats is not None and skipped:
+            stats["resyncs"] += 1
+            stats["skipped"] += skipped
+        return True
+
     scanned = 0
     while scanned < max_scan:
         b = f.read(1)
@@ -109,39 +253,193 @@ def scan_to_next_header(f, max_scan=2_000_000):
             return True
     raise RuntimeError("Could not find next header within scan limit")
 
-def find_content_start(f, compression, max_scan=4096):
+def header_candidate_re(delim: bytes):
+    """Delimiter, then hlen, field count and a short type token: what a member header starts with."""
+    d = re.escape(delim)
+    return re.compile(d + rb"(?=[0-9a-fA-F]{1,8}" + d + rb"[0-9a-fA-F]{1,4}" + d + rb"[0-9]{1,2}" + d + rb")")
+
+def header_checksum_ok(f, header_pos, header_end, fields):
+    """
+    Check a parsed header against its own checksum (fields[-4] names the
+    algorithm, fields[-2] holds it; it covers everything from hlen up to the
+    checksum itself). Headers without a usable checksum pass.
+    """
+    algo = fields[-4].lower() if len(fields) >= 4 else ""
+    if not algo or algo == "none" or algo not in hashlib.algorithms_available:
+        return True
+    here = f.tell()
+    f.seek(header_pos, 0)
+    raw = f.read(header_end - header_pos)
+    f.seek(here, 0)
+    covered = len(raw) - len(fields[-1].encode("utf-8")) - len(fields[-2].encode("utf-8")) - 2
+    digest = hashlib.new(algo, raw[:covered]).hexdigest()
+    return digest == fields[-2].strip().lower()
+
+# ----------------------------
+# Codecs: name -> payload magic / decompressor factory
+# ----------------------------
+
+CONTENT_MAGIC = {}
+DECOMPRESSORS = {}
+
+def register_codec(name, magic, new_decompressor):
+    """
+    Add a codec. new_decompressor() returns an object with the lzma/bz2 API
+    (decompress(data, max_length), eof, needs_input) or the zlib one
+    (unconsumed_tail, flush()). magic is None when the payload has no marker.
+    """
+    CONTENT_MAGIC[name] = magic
+    DECOMPRESSORS[name] = new_decompressor
+
+# Input handed to the zstandard backend per call; bounds what one call decodes.
+ZSTD_FEED_SIZE = 64 * 1024
+
+class _ZstdDecompressor:
+    """
+    zstandard decompressobj in the zlib API. Input goes to the backend in
+    ZSTD_FEED_SIZE slices and output past max_length is held for the next
+    call. Backends without eof end at flush().
+    """
+    def __init__(self):
+        self.d, self.unconsumed_tail = zstandard.ZstdDecompressor().decompressobj(), b""
+        self.pending, self.eof = b"", False
+
+    def _feed(self, data):
+        self.pending += self.d.decompress(bytes(data))
+        self.eof = getattr(self.d, "eof", False)
+
+    def decompress(self, data, max_length=-1):
+        data, pos = memoryview(data), 0
+        if max_length <= 0:
+            if not self.eof:
+                self._feed(data)
+            out, self.pending, self.unconsumed_tail = self.pending, b"", b""
+            return out
+        # Keep the last input byte back while output is held, so the caller's
+        # unconsumed_tail loop returns for it.
+        while not self.pending and pos < len(data) and not self.eof:
+            end = min(pos + ZSTD_FEED_SIZE, max(len(data) - 1, pos + 1))
+            self._feed(data[pos:end])
+            pos = end
+        out, self.pending = self.pending[:max_length], self.pending[max_length:]
+        self.unconsumed_tail = b"" if self.eof else bytes(data[pos:])
+        return out
+
+    def flush(self):
+        out, self.pending = self.pending + self.d.flush(), b""
+        if not hasattr(self.d, "eof"):
+            self.eof = True
+        return out
+
+register_codec("lzma", b"\x5d", lzma.LZMADecompressor)
+register_codec("bzip2", b"BZh", bz2.BZ2Decompressor)
+register_codec("zlib", b"\x78", zlib.decompressobj)
+if zstandard is not None:
+    register_codec("zstd", b"\x28\xb5\x2f\xfd", _ZstdDecompressor)
+if lz4frame is not None:
+    register_codec("lz4", b"\x04\x22\x4d\x18", lz4frame.LZ4FrameDecompressor)
+if neozcompress is not None:
+    register_codec("lzw", None, neozcompress.LZWDecompressor)
+
+def new_codec_stats():
+    return {"members": 0, "in": 0, "out": 0, "seconds": 0.0}
+
+def print_codec_stats(codec_stats):
+    """One line per codec, most decompression time first."""
+    total = sum(c["seconds"] for c in codec_stats.values()) or 1.0
+    for name, c in sorted(codec_stats.items(), key=lambda kv: kv[1]["seconds"], reverse=True):
+        rate = c["out"] / (1024 * 1024) / c["seconds"] if c["seconds"] > 0 else 0.0
+        print(f"Codec {name}: {c['members']} members, {c['in']} -> {c['out']} bytes, "
+              f"{c['seconds']:.3f}s ({rate:.1f} MB/s out, {100 * c['seconds'] / total:.1f}% of codec time)")
+
+def find_content_start(f, compression, max_scan=4096, expected=None):
     """
     After a record header there may be padding. Find the start of compressed payload.
     - lzma (alone) commonly starts with 0x5D
     - bzip2 starts with 'BZh'
     - zlib usually starts with 0x78
+    expected (where the header's JSON size puts the payload) is used when the
+    magic is there; a bare magic-byte search would also match inside the JSON
+    block (']' is 0x5D). Codecs without a magic always use expected.
     """
+    if compression not in CONTENT_MAGIC:
+        return None
+    magic = CONTENT_MAGIC[compression]
+    if magic is None:
+        return expected
+
     start = f.tell()
     data = f.read(max_scan)
     if not data:
         return None
 
-    if compression == "lzma":
-        i = data.find(b"\x5d")
-    elif compression == "bzip2":
-        i = data.find(b"BZh")
-    elif compression == "zlib":
-        i = data.find(b"\x78")
-    else:
-        return None
+    if expected is not None and 0 <= expected - start <= len(data) - len(magic):
+        if data.startswith(magic, expected - start):
+            return expected
 
+    i = data.find(magic)
     if i == -1:
         return None
     return start + i
 
-def decompress_payload(comp, payload: bytes) -> bytes:
-    if comp == "lzma":
-        return lzma.decompress(payload)
-    if comp == "bzip2":
-        return bz2.decompress(payload)
-    if comp == "zlib":
-        return zlib.decompress(payload)
-    return payload
+def new_decompressor(comp):
+    factory = DECOMPRESSORS.get(comp)
+    return factory() if factory is not None else None
+
+def decompress_stream(f, comp, csize, out, chunk_size=READ_BLOCK_SIZE, stats=None):
+    """
+    Read csize compressed bytes from f in chunk_size pieces and write the
+    decompressed data to out, never holding more than about one chunk of
+    input or output. Returns bytes written; raises EOFError on a short read.
+    stats (see new_codec_stats) is charged the bytes in/out and codec time.
+    """
+    d = new_decompressor(comp)
+    zlib_api = hasattr(d, "unconsumed_tail")
+    stats = stats if stats is not None else new_codec_stats()
+    stats["members"] += 1
+    written = 0
+    remaining = csize
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            raise EOFError(f"wanted {csize}, got {csize - remaining}")
+        remaining -= len(chunk)
+        stats["in"] += len(chunk)
+
+        if d is None:
+            out.write(chunk)
+            written += len(chunk)
+            continue
+
+        data = chunk
+        while True:
+            t0 = time.perf_counter()
+            piece = d.decompress(data, chunk_size)
+            stats["seconds"] += time.perf_counter() - t0
+            out.write(piece)
+            written += len(piece)
+            if zlib_api:
+                data = d.unconsumed_tail
+                if not data:
+                    break
+            elif d.eof or d.needs_input:
+                break
+            else:
+                data = b""
+        if d.eof:
+            break
+
+    if d is not None:
+        if zlib_api:
+            t0 = time.perf_counter()
+            piece = d.flush()
+            stats["seconds"] += time.perf_counter() - t0
+            out.write(piece)
+            written += len(piece)
+        if not d.eof:
+            raise ValueError("Compressed data ended before the end-of-stream marker was reached")
+    stats["out"] += written
+    return written
 
 def safe_join(base_dir: str, arc_path: str) -> str:
     """Prevent path traversal; always extract under base_dir."""
@@ -161,33 +459,41 @@ def safe_join(base_dir: str, arc_path: str) -> str:
 # Record iterator (layout-based)
 # ----------------------------
 
-def iter_records(f, read_token, fmt_name: str, fmt_meta: dict, fmt_magic_str: str):
+def iter_records(f, read_token, fmt_name: str, fmt_meta: dict, fmt_magic_str: str, recover=False, stats=None):
     """
     Yields dicts:
-      {type, name, usize, comp, csize, header_pos}
+      {type, name, usize, comp, csize, header_pos, header_end, jsonsize}
     Uses the field layout that worked for your ArchiveFile1 .arc.
     If future formats change indices, we can extend the JSON schema to include them.
+    With recover, damage does not end the scan: header candidates are found
+    with a block regex, and only those whose length and header checksum
+    check out are yielded (stats counts resyncs/skipped bytes/rejections).
     """
+    pattern = header_candidate_re(parse_delimiter(fmt_meta.get("delimiter", "\u0000"))) if recover else None
 
     # Signature token in file (often "ArchiveFile1"), allow prefix match with fmt_magic_str ("ArchiveFile")
     sig = read_token(f)
     if not sig.startswith(fmt_magic_str):
-        raise ValueError(f"Signature mismatch: got {sig!r}, expected prefix {fmt_magic_str!r}")
-    print(f"Archive Signature: {sig}")
-
-    # Global header
-    global_len_hex = read_token(f)
-    global_count_raw = read_token(f)
-    if not is_hex_str(global_count_raw):
-        raise ValueError(f"Bad global field_count: {global_count_raw!r}")
-    global_count = int(global_count_raw, 16)
-
-    _global_fields = [read_token(f) for _ in range(global_count)]
-    print(f"Global header: len={global_len_hex}, fields={global_count} (consumed)")
+        if not recover:
+            raise ValueError(f"Signature mismatch: got {sig!r}, expected prefix {fmt_magic_str!r}")
+        print(f"Signature damaged ({sig[:32]!r}); scanning for members")
+        f.seek(0, 0)
+    else:
+        print(f"Archive Signature: {sig}")
+
+        # Global header
+        global_len_hex = read_token(f)
+        global_count_raw = read_token(f)
+        if is_hex_str(global_count_raw):
+            global_count = int(global_count_raw, 16)
+            _global_fields = [read_token(f) for _ in range(global_count)]
+            print(f"Global header: len={global_len_hex}, fields={global_count} (consumed)")
+        elif not recover:
+            raise ValueError(f"Bad global field_count: {global_count_raw!r}")
 
     rec = 0
     while True:
-        if not scan_to_next_header(f):
+        if not scan_to_next_header(f, pattern=pattern, stats=stats):
             break
 
         header_pos = f.tell()
@@ -201,6 +507,15 @@ def iter_records(f, read_token, fmt_name: str, fmt_meta: dict, fmt_magic_str: st
 
         field_count = int(field_count_hex, 16)
         fields = [read_token(f) for _ in range(field_count)]
+        header_end = f.tell()
+
+        if recover:
+            expected_end = header_pos + len(header_len_hex) + 1 + int(header_len_hex, 16) + 1
+            if (field_count < 4 or header_end != expected_end
+                    or not header_checksum_ok(f, header_pos, header_end, fields)):
+                stats["rejected"] += 1
+                f.seek(header_pos, 0)  # rescan from inside the rejected candidate
+                continue
 
         # Layout (works for your provided format doc / files):
         # fields[0] = ftype ("0" file, "5" dir)
@@ -228,6 +543,8 @@ def iter_records(f, read_token, fmt_name: str, fmt_meta: dict, fmt_magic_str: st
             print(f"RECORD {rec} @ {header_pos}: hlen={header_len_hex} fcount={field_count_hex} type={ftype} name={fname}")
         rec += 1
 
+        jsonsize_hex = fields[29] if len(fields) > 29 else "0"
+
         yield {
             "type": ftype,
             "name": fname,
@@ -235,13 +552,16 @@ def iter_records(f, read_token, fmt_name: str, fmt_meta: dict, fmt_magic_str: st
             "comp": comp,
             "csize": csize,
             "header_pos": header_pos,
+            "header_end": header_end,
+            "jsonsize": int(jsonsize_hex, 16) if is_hex_str(jsonsize_hex) else 0,
         }
 
 # ----------------------------
 # Main extract/list
 # ----------------------------
 
-def process_archive(arc_path: str, fmt_json: str, out_dir: str, list_only: bool):
+def process_archive(arc_path: str, fmt_json: str, out_dir: str, list_only: bool, recover: bool = False,
+                    codec_stats: bool = False):
     fmt_name, fmt_meta, _magic_bytes = detect_format(arc_path, fmt_json)
     delim = parse_delimiter(fmt_meta.get("delimiter", "\u0000"))
     fmt_magic_str = fmt_meta.get("magic", fmt_name)  # e.g. "ArchiveFile"
@@ -255,12 +575,20 @@ def process_archive(arc_path: str, fmt_json: str, out_dir: str, list_only: bool)
 
     extracted = 0
     listed = 0
+    damaged = 0
+    stats = {"resyncs": 0, "skipped": 0, "rejected": 0}
+    per_codec = {}
 
-    with open(arc_path, "rb") as f:
-        for r in iter_records(f, read_token, fmt_name, fmt_meta, fmt_magic_str):
+    with BufferedArchiveReader(open(arc_path, "rb")) as f:
+        for r in iter_records(f, read_token, fmt_name, fmt_meta, fmt_magic_str, recover, stats):
             if r["name"]:
                 listed += 1
 
+            expected = r["header_end"] + r["jsonsize"] + len(delim)
+            if recover:
+                # the header is verified, so its sizes are trusted: skip whatever is not extracted
+                f.seek(expected + (r["csize"] or r["usize"]), 0)
+
             if list_only:
                 kind = "DIR " if r["type"] != "0" else "FILE"
                 print(f"{kind} {r['name']}  usize={r['usize']}  comp={r['comp']}  csize={r['csize']}")
@@ -269,36 +597,37 @@ def process_archive(arc_path: str, fmt_json: str, out_dir: str, list_only: bool)
             # extract only files with known compression and positive compressed size
             if r["type"] != "0":
                 continue
-            if not r["name"] or r["csize"] <= 0 or r["comp"] not in ("lzma", "bzip2", "zlib"):
+            if not r["name"] or r["csize"] <= 0 or r["comp"] not in DECOMPRESSORS:
                 continue
 
-            payload_start = find_content_start(f, r["comp"])
+            payload_start = expected if recover else find_content_start(f, r["comp"], expected=expected)
             if payload_start is None:
                 print(f"Could not locate content start for {r['name']} ({r['comp']}) after offset {f.tell()}")
                 continue
 
-            f.seek(payload_start, 0)
-            payload = f.read(r["csize"])
-            if len(payload) != r["csize"]:
-                print(f"Short read for {r['name']}: wanted {r['csize']}, got {len(payload)}")
-                break
-
-            try:
-                data = decompress_payload(r["comp"], payload)
-            except Exception as e:
-                print(f"Decompress failed for {r['name']} ({r['comp']}): {e}")
-                f.seek(payload_start + r["csize"], 0)
-                continue
-
             out_path = safe_join(out_dir, r["name"])
             out_subdir = os.path.dirname(out_path)
             if out_subdir:
                 os.makedirs(out_subdir, exist_ok=True)
 
-            with open(out_path, "wb") as w:
-                w.write(data)
+            f.seek(payload_start, 0)
+            try:
+                with open(out_path, "wb") as w:
+                    written = decompress_stream(f, r["comp"], r["csize"], w,
+                                                stats=per_codec.setdefault(r["comp"], new_codec_stats()))
+            except EOFError as e:
+                os.remove(out_path)
+                print(f"Short read for {r['name']}: {e}")
+                break
+            except Exception as e:
+                os.remove(out_path)
+                print(f"Decompress failed for {r['name']} ({r['comp']}): {e}")
+                damaged += 1
+                # the payload is damaged, so in recovery mode look for headers inside it too
+                f.seek(payload_start if recover else payload_start + r["csize"], 0)
+                continue
 
-            status = "OK" if (r["usize"] == 0 or len(data) == r["usize"]) else f"SIZE MISMATCH (got {len(data)}, expected {r['usize']})"
+            status = "OK" if (r["usize"] == 0 or written == r["usize"]) else f"SIZE MISMATCH (got {written}, expected {r['usize']})"
             print(f"Extracted {os.path.relpath(out_path, out_dir)} [{r['comp']}] {status}")
             extracted += 1
 
@@ -309,6 +638,11 @@ def process_archive(arc_path: str, fmt_json: str, out_dir: str, list_only: bool)
         print(f"Done. Listed {listed} records.")
     else:
         print(f"Done. Extracted {extracted} files into: {out_dir}")
+    if recover:
+        print(f"Recovery: {stats['resyncs']} resyncs, {stats['skipped']} bytes skipped, "
+              f"{stats['rejected']} header candidates rejected, {damaged} damaged members")
+    if codec_stats:
+        print_codec_stats(per_codec)
 
 def main():
     ap = argparse.ArgumentParser(description="Extract ArchiveFile/CatFile/FoxFile-style archives using a format JSON (e.g. archivefile.json).")
@@ -316,9 +650,13 @@ def main():
     ap.add_argument("--fmt", default="archivefile.json", help="Format JSON definition (default: archivefile.json)")
     ap.add_argument("--out", default="output", help="Output directory (default: output)")
     ap.add_argument("--list", action="store_true", help="List archive contents only (no extraction)")
+    ap.add_argument("--recover", action="store_true",
+                    help="Salvage a damaged archive: resync on checksum-validated headers instead of stopping")
+    ap.add_argument("--codec-stats", action="store_true",
+                    help="Print bytes in/out and decompression time per codec")
     args = ap.parse_args()
 
-    process_archive(args.archive, args.fmt, args.out, args.list)
+    process_archive(args.archive, args.fmt, args.out, args.list, args.recover, args.codec_stats)
 
 if __name__ == "__main__":
     main()
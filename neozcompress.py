@@ -1,90 +1,416 @@
+import sys
 import struct
-from typing import List
+from array import array
+from typing import List, Tuple
+
+# Header of the bit-packed format (same layout as Unix compress/.Z):
+# two magic bytes, then a flags byte holding the maximum code width in its
+# low 5 bits (and the block-mode flag in the high bit).
+MAGIC_BYTES = b'\x1f\x9d'
+FLAG_BITS_MASK = 0x1f
+FLAG_BLOCK_MODE = 0x80
+HEADER_SIZE = len(MAGIC_BYTES) + 1
+INIT_BITS = 9
+MAX_BITS = 16
+# Block mode reserves code 256 for CLEAR: the encoder empties its table and
+# the decoder follows. The first free entry is then 257 instead of 256.
+CLEAR = 256
+FIRST = 257
+# Input bytes between checks of the compression ratio once the table is full
+# (the same interval as compress).
+CHECK_GAP = 10000
+# Decoded table entries at least this long are kept as a span of the output
+# rather than as their own bytes object.
+LONG_ENTRY = 64
+_SINGLE_BYTES = [bytes((i,)) for i in range(256)]
 
 # =========================
 # Bytes-based LZW functions
 # =========================
 
-def lzw_compress_bytes_core(data: bytes, max_table_size: int = 4096) -> List[int]:
+def lzw_compress_bytes_core(data: bytes, max_table_size: int = 4096, block_mode: bool = False) -> List[int]:
     """
     Compress a bytes object into a list of integer codes using LZW.
     This function works directly on bytes.
     
+    In block mode the table is not kept forever once it is full: every
+    CHECK_GAP input bytes the compression ratio is checked (see _ClearPolicy),
+    and when it has dropped the current sequence is emitted, then CLEAR,
+    and the table starts over.
+    
     :param data: The input bytes to compress.
     :param max_table_size: Maximum size for the dictionary.
+    :param block_mode: Reserve CLEAR and reset the table when the ratio drops.
     :return: A list of integer codes.
     """
     if not data:
         return []
     
-    # Initialize the dictionary with single-byte entries.
-    dict_size = 256
-    # The keys are bytes objects of length 1.
-    dictionary = {bytes([i]): i for i in range(dict_size)}
+    # Single bytes are implicitly codes 0-255. Every longer sequence is keyed
+    # on its prefix's code and its last byte, (prefix_code << 8) | byte, so the
+    # loop never builds or hashes a bytes object.
+    first = FIRST if block_mode else 256
+    dict_size = first
+    dictionary = {}
+    get = dictionary.get
+    policy = _ClearPolicy(lzw_max_bits(max_table_size)) if block_mode else None
+    block = 0       # index in result where the current table's codes start
     
-    w = b""
+    w = data[0]     # code of the current sequence
+    start = 1
     result = []
-    for byte in data:
-        c = bytes([byte])
-        wc = w + c
-        if wc in dictionary:
-            w = wc
-        else:
-            result.append(dictionary[w])
-            if dict_size < max_table_size:
-                dictionary[wc] = dict_size
-                dict_size += 1
-            w = c
-    if w:
-        result.append(dictionary[w])
+    # The input goes in CHECK_GAP slices so the ratio can be checked in between.
+    for end in range(CHECK_GAP, len(data) + CHECK_GAP, CHECK_GAP):
+        for byte in data[start:end]:
+            key = w << 8 | byte
+            code = get(key)
+            if code is not None:
+                w = code
+            else:
+                result.append(w)
+                if dict_size < max_table_size:
+                    dictionary[key] = dict_size
+                    dict_size += 1
+                w = byte
+        start = end
+        if policy and dict_size >= max_table_size and end < len(data) and policy.check(end, len(result) - block):
+            result.append(w)
+            result.append(CLEAR)
+            dictionary.clear()
+            dict_size = first
+            block = len(result)
+            w = data[end]
+            start = end + 1
+    result.append(w)
     return result
 
-def lzw_decompress_bytes_core(codes: List[int], max_table_size: int = 4096) -> bytes:
+def lzw_decompress_bytes_core(codes: List[int], max_table_size: int = 4096, block_mode: bool = False) -> bytes:
     """
     Decompress a list of integer codes into a bytes object using LZW.
     
     :param codes: The list of integer codes.
     :param max_table_size: Maximum size for the dictionary.
+    :param block_mode: Code 256 is CLEAR, which starts a new table.
     :return: The decompressed bytes.
     """
     if not codes:
         return b""
     
-    dict_size = 256
-    dictionary = [bytes([i]) for i in range(dict_size)]
+    # Entries are kept as bytes objects, as long as they are short. Every
+    # entry is the previous sequence plus one byte, so the bytes of a longer
+    # one are already in the output where that sequence was written; for
+    # those the table holds None and spans[k] = (start, end) in out instead,
+    # which keeps the table from growing with the square of the phrase length.
+    table_size = min(max_table_size, 1 << MAX_BITS)
+    spans = [None] * table_size
     
-    result = []
-    # First code.
-    w = dictionary[codes[0]]
-    result.append(w)
-    
-    for k in codes[1:]:
-        if k < len(dictionary):
-            entry = dictionary[k]
-        elif k == dict_size:
-            # Special case: when the current code is exactly the next code to be assigned.
-            entry = w + w[:1]
-        else:
-            raise ValueError(f"Bad compressed code: {k}")
+    out = bytearray()
+    lo = 0
+    while lo < len(codes):
+        # Each CLEAR ends a block; the next code starts a fresh table.
+        hi = _find_clear(codes, lo) if block_mode else len(codes)
+        if lo == hi:
+            lo += 1
+            continue
+        table = _SINGLE_BYTES + [None] if block_mode else _SINGLE_BYTES[:]
+        add = table.append
+        dict_size = len(table)
+        w = codes[lo]
+        if w >= 256:
+            raise ValueError(f"Bad compressed code: {w}")
+        w = table[w]
+        out += w
         
-        result.append(entry)
-        if dict_size < max_table_size:
-            dictionary.append(w + entry[:1])
-            dict_size += 1
-        w = entry
+        for k in codes[lo + 1:hi]:
+            if k < dict_size:
+                entry = table[k]
+                if entry is None:
+                    start, end = spans[k]
+                    entry = out[start:end]
+            elif k == dict_size:
+                # Special case: when the current code is exactly the next code to be assigned.
+                entry = w + w[:1]
+            else:
+                raise ValueError(f"Bad compressed code: {k}")
+            out += entry
+            
+            if dict_size < table_size:
+                if len(w) < LONG_ENTRY:
+                    add(w + entry[:1])
+                else:
+                    # w was written just before entry.
+                    end = len(out) - len(entry)
+                    add(None)
+                    spans[dict_size] = (end - len(w), end + 1)
+                dict_size += 1
+            w = entry
+        lo = hi + 1
         
-    return b"".join(result)
+    return bytes(out)
+
+# ==========================================
+# Variable-width bit packing (compress style)
+# ==========================================
+
+def lzw_max_bits(max_table_size: int) -> int:
+    """
+    Code width limit for a table of max_table_size entries.
+
+    The bit-packed format stores only the width, so a table size that is not
+    a power of two is rounded up to one (the table itself still stops at
+    max_table_size; the decoder just never sees the top codes). The width is
+    kept between INIT_BITS and MAX_BITS.
+
+    :param max_table_size: Maximum size for the dictionary.
+    :return: The maximum code width in bits.
+    """
+    return min(max(INIT_BITS, (max_table_size - 1).bit_length()), MAX_BITS)
+
+def _top_width(maxbits: int) -> int:
+    return max(maxbits, INIT_BITS + 1)
+
+def _code_widths(num_codes: int, maxbits: int, first: int = 256, cleared: bool = False):
+    """
+    Yield (width, count, padded) runs for num_codes codes.
+
+    Codes start INIT_BITS wide and grow by one bit as soon as the next code
+    could reach 2**width, up to maxbits. Like compress, every run but the
+    last at maxbits ends on a group of 8 codes (width bytes), so a run that
+    is not full is padded with zero bits. compress also leaves its first
+    run at INIT_BITS when maxbits is INIT_BITS, so 9-bit tables widen once.
+
+    In block mode each table's codes are laid out on their own, starting
+    again at INIT_BITS after a CLEAR; the run ending in CLEAR is padded too.
+
+    :param num_codes: Number of codes to pack.
+    :param maxbits: Maximum code width.
+    :param first: First free table entry (257 when code 256 is reserved).
+    :param cleared: The codes end with CLEAR.
+    """
+    top = _top_width(maxbits)
+    width = INIT_BITS
+    start = 0
+    while start < num_codes:
+        # The encoder has added an entry after each code; free_ent is first + k
+        # when code k goes out, and the width grows once it passes 2**width - 1.
+        end = num_codes if width == top else min(num_codes, (1 << width) - first + 1)
+        padded = width < top and end == (1 << width) - first + 1 or cleared and end == num_codes
+        yield width, end - start, padded
+        start = end
+        width += 1
+
+def _packed_size(num_codes: int, maxbits: int, first: int = 256, cleared: bool = False) -> int:
+    # Only the last run can end mid-byte.
+    return sum(_run_size(count, width, padded)
+               for width, count, padded in _code_widths(num_codes, maxbits, first, cleared))
 
-def lzw_compress_bytes(data: bytes, max_table_size: int = 4096) -> bytes:
+def _find_clear(codes: List[int], start: int) -> int:
+    """Index of the first CLEAR in codes[start:], or len(codes)."""
+    try:
+        return codes.index(CLEAR, start)
+    except ValueError:
+        return len(codes)
+
+def _blocks(codes: List[int], block_mode: bool) -> List[Tuple[int, int]]:
+    """(start, end) of each table's codes; every block but the last ends with CLEAR."""
+    if not block_mode:
+        return [(0, len(codes))] if codes else []
+    blocks = []
+    start = 0
+    while start < len(codes):
+        end = min(_find_clear(codes, start) + 1, len(codes))
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+class _ClearPolicy:
+    """
+    When to clear a full table in block mode, as compress decides it.
+
+    At each check the compression ratio so far (input bytes per output byte,
+    in 1/256ths) is compared with the best one seen since the last clear.
+    While it holds up the table still fits the data; once it falls the
+    data has moved on, and a new table will adapt to it.
+
+    :param maxbits: Maximum code width, for sizing the output.
+    """
+
+    def __init__(self, maxbits: int):
+        self.maxbits = maxbits
+        self.ratio = 0
+        self.out_bytes = HEADER_SIZE    # output of the tables before the current one
+
+    def check(self, bytes_in: int, block_codes: int) -> bool:
+        """
+        Decide at a checkpoint whether to clear.
+
+        :param bytes_in: Input bytes consumed so far.
+        :param block_codes: Codes emitted since the last CLEAR.
+        :return: True if the caller should emit its sequence and CLEAR now.
+        """
+        out_bytes = self.out_bytes + _packed_size(block_codes, self.maxbits, FIRST)
+        ratio = (bytes_in << 8) // out_bytes
+        if ratio >= self.ratio:
+            self.ratio = ratio
+            return False
+        self.ratio = 0
+        self.out_bytes += _packed_size(block_codes + 2, self.maxbits, FIRST, cleared=True)
+        return True
+
+def lzw_pack_codes(codes: List[int], max_table_size: int = 4096, block_mode: bool = False) -> bytes:
+    """
+    Pack LZW codes into the variable-width format: a 3-byte header, then
+    the codes least significant bit first, 9 bits wide at the start and one
+    bit wider each time the table outgrows the current width.
+
+    The output is laid out like Unix compress (.Z), so `uncompress` and
+    `gzip -d` read it too.
+
+    :param codes: The integer codes from lzw_compress_bytes_core.
+    :param max_table_size: The table size the codes were produced with.
+    :param block_mode: The codes were produced in block mode (may hold CLEAR).
+    :return: The header followed by the packed codes.
+    """
+    maxbits = lzw_max_bits(max_table_size)
+    first = FIRST if block_mode else 256
+    blocks = []
+    for start, end in _blocks(codes, block_mode):
+        cleared = block_mode and codes[end - 1] == CLEAR
+        blocks.append((start, list(_code_widths(end - start, maxbits, first, cleared))))
+    out = bytearray(HEADER_SIZE + sum(_run_size(count, width, padded)
+                                      for _, runs in blocks for width, count, padded in runs))
+    out[:HEADER_SIZE] = MAGIC_BYTES + bytes([maxbits | (FLAG_BLOCK_MODE if block_mode else 0)])
+    pos = HEADER_SIZE
+    for start, runs in blocks:
+        for width, count, padded in runs:
+            pos = _pack_run(out, pos, codes, start, start + count, width, padded)
+            start += count
+    return bytes(out)
+
+def _run_size(count: int, width: int, padded: bool) -> int:
+    """Bytes taken by a run of count codes (see _code_widths)."""
+    if padded:
+        return width * ((count + 7) >> 3)
+    return (width * count + 7) >> 3
+
+def _pack_run(out: bytearray, pos: int, codes: List[int], start: int, end: int, width: int, padded: bool) -> int:
+    """Write codes[start:end] at out[pos:], all width bits wide; returns the new pos."""
+    # Eight codes make exactly width bytes, so the run goes out a group at a time.
+    s1, s2, s3, s4, s5, s6, s7 = (width * i for i in range(1, 8))
+    for g in range(start, end - 7, 8):
+        c0, c1, c2, c3, c4, c5, c6, c7 = codes[g:g + 8]
+        value = c0 | c1 << s1 | c2 << s2 | c3 << s3 | c4 << s4 | c5 << s5 | c6 << s6 | c7 << s7
+        out[pos:pos + width] = value.to_bytes(width, "little")
+        pos += width
+    tail = codes[end - ((end - start) & 7):end]
+    if tail:
+        value = 0
+        for i, code in enumerate(tail):
+            value |= code << (width * i)
+        # A padded run is zero-filled to the end of its last group.
+        size = _run_size(len(tail), width, padded)
+        out[pos:pos + size] = value.to_bytes(size, "little")
+        pos += size
+    return pos
+
+def _unpack_run(data, width: int, codes: List[int]) -> None:
+    mask = (1 << width) - 1
+    s1, s2, s3, s4, s5, s6, s7 = (width * i for i in range(1, 8))
+    from_bytes = int.from_bytes
+    extend = codes.extend
+    full = len(data) - len(data) % width
+    for pos in range(0, full, width):
+        value = from_bytes(data[pos:pos + width], "little")
+        extend((value & mask, value >> s1 & mask, value >> s2 & mask, value >> s3 & mask,
+                value >> s4 & mask, value >> s5 & mask, value >> s6 & mask, value >> s7))
+    if full < len(data):
+        value = from_bytes(data[full:], "little")
+        extend((value >> (width * i)) & mask for i in range((len(data) - full) * 8 // width))
+
+def _read_header(data: bytes) -> Tuple[int, bool]:
+    """Check the 3-byte header and return (maximum code width, block mode)."""
+    if len(data) < HEADER_SIZE or data[:len(MAGIC_BYTES)] != MAGIC_BYTES:
+        raise ValueError("Compressed data is missing the magic header 0x1f9d")
+    flags = data[len(MAGIC_BYTES)]
+    maxbits = flags & FLAG_BITS_MASK
+    if flags & ~(FLAG_BITS_MASK | FLAG_BLOCK_MODE) or not INIT_BITS <= maxbits <= MAX_BITS:
+        raise ValueError(f"Unsupported LZW header flags: {flags:#04x}")
+    return maxbits, bool(flags & FLAG_BLOCK_MODE)
+
+# Groups unpacked at a time in block mode, where a CLEAR can end any run early.
+CLEAR_SCAN_GROUPS = 1024
+
+def lzw_unpack_codes(data: bytes) -> Tuple[List[int], int, bool]:
+    """
+    Unpack the codes written by lzw_pack_codes.
+
+    :param data: The header followed by the packed codes.
+    :return: A tuple of (codes, max_table_size, block_mode) from the header.
+    :raises ValueError: If the header is missing or unsupported.
+    """
+    maxbits, block_mode = _read_header(data)
+    first = FIRST if block_mode else 256
+    view = memoryview(data)
+    end = len(data)
+    codes: List[int] = []
+    top = _top_width(maxbits)
+    pos = HEADER_SIZE
+    width = INIT_BITS
+    block = 0       # index in codes where the current table's codes start
+    while pos < end:
+        if width < top:
+            # Same runs as _code_widths: each full one ends on a group boundary.
+            count = (1 << width) - first + 1 - (len(codes) - block)
+            run_bytes = width * ((count + 7) >> 3)
+            used = min(end - pos, (count * width + 7) >> 3)
+        else:
+            run_bytes = used = end - pos
+        if not block_mode:
+            _unpack_run(view[pos:pos + used], width, codes)
+            pos += run_bytes
+            width += 1
+            continue
+        run_end = pos + run_bytes
+        used += pos
+        while pos < used:
+            mark = len(codes)
+            piece = min(used - pos, CLEAR_SCAN_GROUPS * width)
+            _unpack_run(view[pos:pos + piece], width, codes)
+            clear = _find_clear(codes, mark)
+            if clear < len(codes):
+                # The rest of CLEAR's group is padding; the next table starts at INIT_BITS.
+                del codes[clear + 1:]
+                pos += ((clear - mark) // 8 + 1) * width
+                width = INIT_BITS
+                block = len(codes)
+                break
+            pos += piece
+        else:
+            pos = run_end
+            width += 1
+    return codes, 1 << maxbits, block_mode
+
+def lzw_compress_bytes(data: bytes, max_table_size: int = 4096, fixed_width: bool = False,
+                       block_mode: bool = True) -> bytes:
     """
     Compress a bytes object using LZW and return a bytes object containing the packed codes.
     
-    Each integer code is stored as an unsigned 16-bit (2 bytes) big-endian value.
+    Codes are bit-packed at 9 to lzw_max_bits(max_table_size) bits (see lzw_pack_codes),
+    in block mode unless block_mode is False, so the table is cleared when the
+    ratio drops. With fixed_width, each integer code is instead stored as an
+    unsigned 16-bit (2 bytes) big-endian value, the original format of this
+    module, which has no block mode.
     
     :param data: The input bytes to compress.
     :param max_table_size: Maximum size for the dictionary.
+    :param fixed_width: Write the headerless 16-bit format.
+    :param block_mode: Clear the table when the ratio drops (bit-packed format only).
     :return: A bytes object with the packed compressed data.
     """
+    if not fixed_width:
+        max_table_size = min(max_table_size, 1 << lzw_max_bits(max_table_size))
+        codes = lzw_compress_bytes_core(data, max_table_size, block_mode)
+        return lzw_pack_codes(codes, max_table_size, block_mode)
     codes = lzw_compress_bytes_core(data, max_table_size)
     # Pack all codes into a bytes object. (2 bytes per code)
     return struct.pack('>' + 'H' * len(codes), *codes)
@@ -93,20 +419,415 @@ def lzw_decompress_bytes(compressed: bytes, max_table_size: int = 4096) -> bytes
     """
     Decompress a bytes object (packed codes) back into the original bytes.
     
-    The input should be in the format produced by lzw_compress_bytes.
+    The input should be in a format produced by lzw_compress_bytes. Bit-packed
+    data carries its own table size in the header; the 16-bit format starts
+    with a zero byte (the first code is a literal) and uses max_table_size.
     
     :param compressed: A bytes object with packed compressed codes.
-    :param max_table_size: Maximum size for the dictionary.
+    :param max_table_size: Maximum size for the dictionary (16-bit format).
     :return: The decompressed bytes.
     """
     if not compressed:
         return b""
     
+    if compressed.startswith(MAGIC_BYTES):
+        codes, max_table_size, block_mode = lzw_unpack_codes(compressed)
+        return lzw_decompress_bytes_core(codes, max_table_size, block_mode)
+    
     # Each code is stored as 2 bytes.
     num_codes = len(compressed) // 2
     codes = list(struct.unpack('>' + 'H' * num_codes, compressed))
     return lzw_decompress_bytes_core(codes, max_table_size)
 
+# ================================
+# Streaming objects
+# ================================
+
+# Whole groups decoded per step; bounds the output produced past max_length.
+STREAM_GROUPS = 64
+STREAM_CHUNK_SIZE = 256 * 1024
+# Decoded output kept after it is returned, so table entries can be copied
+# from it; older entries are rebuilt from the prefix table instead.
+STREAM_HISTORY = 1 << 20
+
+class LZWCompressor:
+    """
+    Incremental LZW compressor with the zlib.compressobj interface.
+
+    compress(data) returns the packed output completed so far and flush()
+    the rest. The dictionary and the phrase in progress carry over between
+    calls, so the result is the same as lzw_compress_bytes() of all the input
+    while memory stays bounded by the table size, whatever the input size.
+
+    :param max_table_size: Maximum size for the dictionary (see lzw_max_bits).
+    :param block_mode: Clear the table when the ratio drops (see lzw_compress_bytes_core).
+    """
+
+    def __init__(self, max_table_size: int = 4096, block_mode: bool = True):
+        self.maxbits = lzw_max_bits(max_table_size)
+        self.max_table_size = min(max_table_size, 1 << self.maxbits)
+        self.block_mode = block_mode
+        self._first = FIRST if block_mode else 256
+        self._dictionary = {}           # (prefix_code << 8) | byte -> code
+        self._dict_size = self._first
+        self._w = -1                    # code of the sequence in progress, -1 before any input
+        self._policy = _ClearPolicy(self.maxbits) if block_mode else None
+        self._in_count = 0              # input bytes so far; the ratio is checked every CHECK_GAP
+        self._block_codes = 0           # codes since the last CLEAR
+        self._codes: List[int] = []     # codes not yet written (a partial group)
+        self._count = 0                 # codes of this table written so far; they fix the width
+        self._width = INIT_BITS
+        self._top = _top_width(self.maxbits)
+        self._header = MAGIC_BYTES + bytes([self.maxbits | (FLAG_BLOCK_MODE if block_mode else 0)])
+        self._finished = False
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress data, returning whatever output is complete.
+
+        :param data: The next chunk of input.
+        :return: Packed bytes (possibly empty).
+        """
+        if self._finished:
+            raise ValueError("compress() called after flush()")
+        out = bytearray()
+        pos = 0
+        while pos < len(data):
+            # Check where lzw_compress_bytes_core does: at each CHECK_GAP, if more input follows.
+            if self._policy and self._in_count % CHECK_GAP == 0 and self._in_count:
+                if self._dict_size >= self.max_table_size and self._policy.check(self._in_count, self._block_codes):
+                    self._codes += (self._w, CLEAR)
+                    out += self._write(final=False, cleared=True)
+                    self._dictionary.clear()
+                    self._dict_size = self._first
+                    self._block_codes = 0
+                    self._w = -1
+            if self._w < 0:
+                self._w = data[pos]     # the first byte starts the first sequence
+                pos += 1
+                self._in_count += 1
+            end = min(len(data), pos + CHECK_GAP - self._in_count % CHECK_GAP)
+            self._compress_run(data[pos:end])
+            self._in_count += end - pos
+            pos = end
+        return bytes(out + self._write(final=False))
+
+    def _compress_run(self, data: bytes) -> None:
+        dictionary = self._dictionary
+        get = dictionary.get
+        dict_size = self._dict_size
+        max_table_size = self.max_table_size
+        result = self._codes
+        emitted = len(result)
+        w = self._w
+        for byte in data:
+            key = w << 8 | byte
+            code = get(key)
+            if code is not None:
+                w = code
+            else:
+                result.append(w)
+                if dict_size < max_table_size:
+                    dictionary[key] = dict_size
+                    dict_size += 1
+                w = byte
+        self._block_codes += len(result) - emitted
+        self._w = w
+        self._dict_size = dict_size
+
+    def flush(self) -> bytes:
+        """
+        Finish the stream: emit the last phrase and any partial group.
+
+        :return: The remaining packed bytes.
+        """
+        if self._finished:
+            return b""
+        if self._w >= 0:
+            self._codes.append(self._w)
+            self._w = -1
+        self._finished = True
+        return self._write(final=True)
+
+    def _write(self, final: bool, cleared: bool = False) -> bytes:
+        codes = self._codes
+        runs = []
+        start = 0
+        # Cut the pending codes into runs the way _code_widths does for a whole stream.
+        while True:
+            width = self._width
+            run_left = (1 << width) - self._first + 1 - self._count if width < self._top else None
+            if run_left is not None and len(codes) - start >= run_left:
+                runs.append((start, start + run_left, width, True))
+                start += run_left
+                self._count += run_left
+                self._width += 1
+                continue
+            end = len(codes) if final or cleared else start + ((len(codes) - start) & ~7)
+            if end > start:
+                runs.append((start, end, width, cleared))
+                self._count += end - start
+            start = end
+            break
+        if cleared:
+            # The codes ended with CLEAR; the next table starts over at INIT_BITS.
+            self._count = 0
+            self._width = INIT_BITS
+
+        out = bytearray(len(self._header) + sum(_run_size(e - s, w, p) for s, e, w, p in runs))
+        out[:len(self._header)] = self._header
+        pos = len(self._header)
+        self._header = b""
+        for s, e, w, p in runs:
+            pos = _pack_run(out, pos, codes, s, e, w, p)
+        del codes[:start]
+        return bytes(out)
+
+class LZWDecompressor:
+    """
+    Incremental LZW decompressor with the zlib.decompressobj interface.
+
+    decompress(data, max_length) returns at most max_length bytes (0 means
+    no limit); input it did not get to is left in unconsumed_tail for the
+    next call. The bit-packed format has no end marker, so flush() decodes
+    the final partial group and sets eof. Input that does not start with
+    the 0x1f9d header is read as the headerless 16-bit format.
+
+    :param max_table_size: Maximum size for the dictionary (16-bit format only;
+                           bit-packed data carries its own).
+    """
+
+    def __init__(self, max_table_size: int = 4096):
+        self.max_table_size = max_table_size
+        self.unconsumed_tail = b""
+        self.eof = False
+        self._buf = b""                 # a partial group (or header) waiting for more input
+        self._width = 0                 # 0 until the first bytes
+        self._top = INIT_BITS + 1
+        self._legacy = False            # headerless 16-bit codes
+        self._block_mode = False
+        self._first = 256
+        self._count = 0                 # codes of this table read so far
+        # Output history: _hist[0] is output byte number _base, and bytes
+        # before number _sent have been returned already.
+        self._hist = bytearray()
+        self._base = 0
+        self._sent = 0
+        # The table, sized once the header is read: entry k is the sequence
+        # prefix[k] plus the byte last[k], last written at output bytes
+        # start[k]:end[k].
+        self._prefix = self._last = self._start = self._end = None
+        self._scratch = None            # reused to spell out an entry from the prefix table
+        self._dict_size = 256
+        self._w = -1                    # previous code, -1 before the first
+        self._w_start = self._w_end = 0
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        """
+        Decompress data, returning the output decoded so far.
+
+        :param data: The next chunk of compressed input.
+        :param max_length: Upper bound on the returned bytes (0 for none).
+        :return: Decompressed bytes (possibly empty).
+        """
+        if self.eof:
+            raise EOFError("decompress() called after flush()")
+        buf = self._buf + bytes(data) if self._buf else bytes(data)
+        pos = self._read_header(buf)
+        view = memoryview(buf)
+        while pos < len(buf) and self._width and not (max_length and self._pending() >= max_length):
+            width = self._width
+            if self._legacy:
+                n = min((len(buf) - pos) >> 1, STREAM_GROUPS * 8)
+                if not n:
+                    break
+                self._decode(struct.unpack_from('>' + 'H' * n, buf, pos))
+                pos += 2 * n
+                continue
+            run_left = (1 << width) - self._first + 1 - self._count if width < self._top else None
+            groups = min((len(buf) - pos) // width, STREAM_GROUPS)
+            if run_left is not None:
+                groups = min(groups, (run_left + 7) >> 3)
+            if not groups:
+                break
+            codes: List[int] = []
+            _unpack_run(view[pos:pos + groups * width], width, codes)
+            clear = _find_clear(codes, 0) if self._block_mode else len(codes)
+            if clear < len(codes):
+                # The rest of CLEAR's group is padding; the next table starts at INIT_BITS.
+                del codes[clear + 1:]
+                pos += (clear // 8 + 1) * width
+                self._count = 0
+                self._width = INIT_BITS
+            else:
+                pos += groups * width
+                if run_left is not None and len(codes) >= run_left:
+                    del codes[run_left:]    # the zero fill that ends the run
+                    self._width += 1
+                self._count += len(codes)
+            self._decode(codes)
+
+        if max_length and self._pending() >= max_length:
+            self.unconsumed_tail = buf[pos:]
+            self._buf = b""
+        else:
+            self.unconsumed_tail = b""
+            self._buf = buf[pos:]
+        return self._take(max_length)
+
+    def flush(self) -> bytes:
+        """
+        End the stream, decoding the codes in the final partial group.
+
+        :return: All remaining output.
+        """
+        buf = self._buf + self.unconsumed_tail
+        self._buf = self.unconsumed_tail = b""
+        pos = self._read_header(buf)
+        if self._width and pos < len(buf) and not self._legacy:
+            codes: List[int] = []
+            _unpack_run(memoryview(buf)[pos:], self._width, codes)
+            self._count += len(codes)
+            self._decode(codes)
+        self.eof = True
+        return self._take(0)
+
+    def _read_header(self, buf: bytes) -> int:
+        """Set up the format from the first bytes; returns where codes start."""
+        if self._width or not buf:
+            return 0
+        if buf[0] != MAGIC_BYTES[0]:
+            # The first 16-bit code is a literal, so its high byte is zero.
+            self._legacy = True
+            self._width = 16
+            self._new_table()
+            return 0
+        if len(buf) < HEADER_SIZE:
+            return 0
+        maxbits, self._block_mode = _read_header(buf)
+        self._first = self._dict_size = FIRST if self._block_mode else 256
+        self.max_table_size = 1 << maxbits
+        self._width = INIT_BITS
+        self._top = _top_width(maxbits)
+        self._new_table()
+        return HEADER_SIZE
+
+    def _new_table(self) -> None:
+        table_size = min(self.max_table_size, 1 << MAX_BITS)
+        self._prefix = array('H', bytes(2 * table_size))
+        self._last = array('B', bytes(table_size))
+        self._start = array('Q', bytes(8 * table_size))
+        self._end = array('Q', bytes(8 * table_size))
+        self._scratch = bytearray(table_size)
+
+    def _pending(self) -> int:
+        """Decoded bytes not returned yet."""
+        return self._base + len(self._hist) - self._sent
+
+    def _decode(self, codes) -> None:
+        # Same as lzw_decompress_bytes_core, except that the history is
+        # trimmed, so an entry written too long ago is spelled out backwards
+        # from the prefix table instead.
+        hist = self._hist
+        base = self._base
+        prefix, last, start, end = self._prefix, self._last, self._start, self._end
+        table_size = len(start)
+        dict_size = self._dict_size
+        clear = CLEAR if self._block_mode else -1
+        w, w_start, w_end = self._w, self._w_start, self._w_end
+        for k in codes:
+            pos = base + len(hist)
+            if k < 256:
+                hist.append(k)
+            elif k == clear:
+                dict_size = FIRST
+                w = -1
+                continue
+            elif k < dict_size:
+                if start[k] >= base:
+                    hist += hist[start[k] - base:end[k] - base]
+                else:
+                    scratch = self._scratch
+                    i = len(scratch)
+                    code = k
+                    while code >= 256:
+                        i -= 1
+                        scratch[i] = last[code]
+                        code = prefix[code]
+                    i -= 1
+                    scratch[i] = code
+                    hist += scratch[i:]
+                # Point the entry at this newer copy.
+                start[k], end[k] = pos, base + len(hist)
+            elif k == dict_size and w >= 0:
+                # Special case: when the current code is exactly the next code to be assigned.
+                hist += hist[w_start - base:w_end - base]
+                hist.append(hist[pos - base])
+            else:
+                raise ValueError(f"Bad compressed code: {k}")
+            if w >= 0 and dict_size < table_size:
+                prefix[dict_size] = w
+                last[dict_size] = hist[pos - base]
+                start[dict_size] = w_start
+                end[dict_size] = w_end + 1
+                dict_size += 1
+            w, w_start, w_end = k, pos, base + len(hist)
+        self._dict_size = dict_size
+        self._w, self._w_start, self._w_end = w, w_start, w_end
+
+    def _take(self, max_length: int) -> bytes:
+        hist = self._hist
+        begin = self._sent - self._base
+        stop = len(hist) if not max_length else min(len(hist), begin + max_length)
+        result = bytes(hist[begin:stop])
+        self._sent = self._base + stop
+        if stop > 2 * STREAM_HISTORY:
+            # Only returned bytes go; the last sequence is always well within the window.
+            cut = stop - STREAM_HISTORY
+            del hist[:cut]
+            self._base += cut
+        return result
+
+def lzw_compress_file(fin, fout, max_table_size: int = 4096, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+    """
+    Compress binary file object fin into fout a chunk at a time.
+
+    :param fin: Readable binary file (e.g. sys.stdin.buffer).
+    :param fout: Writable binary file.
+    :param max_table_size: Maximum size for the dictionary.
+    :param chunk_size: Bytes read per step.
+    :return: The number of bytes written.
+    """
+    comp = LZWCompressor(max_table_size)
+    written = 0
+    while True:
+        chunk = fin.read(chunk_size)
+        if not chunk:
+            break
+        written += fout.write(comp.compress(chunk))
+    return written + fout.write(comp.flush())
+
+def lzw_decompress_file(fin, fout, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+    """
+    Decompress binary file object fin into fout, holding about one chunk
+    of input and of output at a time.
+
+    :param fin: Readable binary file with LZW data.
+    :param fout: Writable binary file.
+    :param chunk_size: Bytes read, and at most written, per step.
+    :return: The number of bytes written.
+    """
+    decomp = LZWDecompressor()
+    written = 0
+    while True:
+        data = fin.read(chunk_size)
+        if not data:
+            break
+        while data:
+            written += fout.write(decomp.decompress(data, chunk_size))
+            data = decomp.unconsumed_tail
+    return written + fout.write(decomp.flush())
+
 # ================================
 # Wrapper functions for Unicode
 # ================================
@@ -144,22 +865,32 @@ def decompress_bytes_to_str(compressed: bytes, max_table_size: int = 4096) -> st
 
 
 # Example usage:
+#   python neozcompress.py -c < big.bin > big.bin.lzw
+#   python neozcompress.py -d < big.bin.lzw > big.bin
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-c", "-d"):
+        # Pipe mode: stream stdin to stdout with bounded memory.
+        if sys.argv[1] == "-c":
+            lzw_compress_file(sys.stdin.buffer, sys.stdout.buffer)
+        else:
+            lzw_decompress_file(sys.stdin.buffer, sys.stdout.buffer)
+        sys.exit(0)
+
     sample_text = "TOBEORNOTTOBEORTOBEORNOT"
     print("Original Text:   ", sample_text)
     
     # Compress to a list of integer codes.
-    codes = lzw_compress(sample_text)
+    codes = lzw_compress_bytes_core(sample_text.encode('utf-8'))
     print("Compressed Codes:", codes)
     
     # Compress to bytes.
-    compressed_bytes = lzw_compress_bytes(sample_text)
+    compressed_bytes = compress_str_to_bytes(sample_text)
     print("Compressed Bytes:", compressed_bytes)
     
     # Decompress from list of integer codes.
-    decompressed_text = lzw_decompress(codes)
+    decompressed_text = lzw_decompress_bytes_core(codes).decode('utf-8')
     print("Decompressed Text (from codes):", decompressed_text)
     
     # Decompress from bytes.
-    decompressed_text_bytes = lzw_decompress_bytes(compressed_bytes)
+    decompressed_text_bytes = decompress_bytes_to_str(compressed_bytes)
     print("Decompressed Text (from bytes):", decompressed_text_bytes)
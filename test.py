@@ -3,15 +3,31 @@
 import io
 import os
 import re
+import bz2
 import hmac
+import lzma
+import zlib
 import json
 import stat
+import time
 import shutil
 import hashlib
 import inspect
 import tempfile
 import configparser
 from io import open
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+try:
+    import neozcompress
+except ImportError:
+    neozcompress = None
 
 def get_importing_script_path():
     """Best-effort path of the importing (caller) script, or None."""
@@ -63,6 +79,8 @@ __spoolfile_size__ = DEFAULT_SPOOL_MAX
 # Buffer: bigger than stdlib default (16 KiB), but still modest
 DEFAULT_BUFFER_MAX = 256 * BYTES_PER_KiB   # 256 KiB copy buffer
 __filebuff_size__ = DEFAULT_BUFFER_MAX
+# Bytes read up front by ReadFileHeaderDataBySize; covers typical member headers.
+__header_probe_size__ = 512
 __program_name__ = "Py"+__file_format_default__
 __use_env_file__ = True
 __use_ini_file__ = True
@@ -391,6 +409,41 @@ def GetFileChecksum(inbytes, checksumtype="md5", formatspecs=None, saltkey=None)
 
     return "0"
 
+def GetChecksumHasher(checksumtype="md5", saltkey=None):
+    """hashlib/hmac object for checksumtype (salted like GetFileChecksum), or None if unsupported."""
+    algo_key = (checksumtype or "md5").lower()
+    if not CheckSumSupport(algo_key, hashlib_guaranteed):
+        return None
+    saltkeyval = None
+    if(isinstance(saltkey, (bytes, ))):
+        saltkeyval = saltkey
+    elif(saltkey is not None and os.path.exists(saltkey)):
+        with open(saltkey, "rb") as skfp:
+            saltkeyval = skfp.read()
+    if(saltkeyval is None):
+        return hashlib.new(algo_key)
+    return hmac.new(saltkeyval, digestmod=algo_key)
+
+def ReadFileContentWithChecksum(fp, outfp, size, checksumtype="md5", formatspecs=None, saltkey=None):
+    """
+    Copy size bytes from fp to outfp in __filebuff_size__ chunks, updating the
+    checksum with each chunk on the way, so content is read and hashed in a
+    single pass. Returns the lowercase hex digest ("0" if unsupported).
+    """
+    h = GetChecksumHasher(checksumtype, saltkey)
+    remaining = size
+    while remaining > 0:
+        chunk = fp.read(min(__filebuff_size__, remaining))
+        if not chunk:
+            break
+        outfp.write(chunk)
+        if h is not None:
+            h.update(chunk)
+        remaining -= len(chunk)
+    if h is None:
+        return "0"
+    return h.hexdigest().lower()
+
 def ValidateHeaderChecksum(inlist=None, checksumtype="md5", inchecksum="0", formatspecs=None, saltkey=None):
     calc = GetHeaderChecksum(inlist, checksumtype, formatspecs, saltkey)
     want = (inchecksum or "0").strip().lower()
@@ -433,40 +486,97 @@ def AppendNullBytes(indata=None, delimiter=None):
     return delimiter.join(parts) + delimiter
 
 def ReadFileHeaderDataBySize(fp, delimiter="\x00"):
-    bytesize = 0
-    oldseek = fp.tell()
-    while True:
-        if(not fp.read(1).decode("UTF-8").isprintable()):
-            break;
-        bytesize += 1
-    fp.seek(oldseek, 0)
-    numhex = fp.read(bytesize).decode("UTF-8")
+    """
+    Read one "hexlen<delim>field<delim>...field<delim>" header and return
+    [hexlen, field, ...]. The length prefix and (usually) the whole header
+    come from one bounded read of __header_probe_size__ bytes; the header is
+    decoded and split once. Returns [] at end of file.
+    """
+    delim = delimiter.encode("UTF-8")
+    probe = fp.read(__header_probe_size__)
+    numend = probe.find(delim)
+    if(numend < 0):
+        if(len(probe) == 0):
+            return []
+        # no delimiter in the probe window: keep reading byte by byte onto
+        # the probe, so this path needs no tell() or seek back either
+        numend = len(probe)
+        while True:
+            c = fp.read(1)
+            if(not c or c == delim[:1]):
+                break
+            numend += 1
+            probe += c
+        if(c):
+            probe += c + fp.read(len(delim) - 1)
+    numhex = probe[:numend].decode("UTF-8")
     numdec = int(numhex, 16)
-    fp.seek(len(delimiter), 1)
-    headerdata = fp.read(numdec).decode("UTF-8")
-    headerdatasplit = headerdata.split(delimiter)
+    headerstart = numend + len(delim)
+    headerend = headerstart + numdec + len(delim)
+    if(headerend <= len(probe)):
+        headerdata = probe[headerstart:headerend - len(delim)]
+        # hand back the over-read bytes with a relative seek (no tell())
+        fp.seek(headerend - len(probe), 1)
+    else:
+        headerdata = probe[headerstart:] + fp.read(numdec - (len(probe) - headerstart))
+        fp.seek(len(delim), 1)
+    headerdatasplit = headerdata.decode("UTF-8").split(delimiter)
     headerdatasplit.insert(0, numhex)
-    fp.seek(len(delimiter), 1)
     return headerdatasplit
 
+# id(formatspecs) -> (formatspecs, trie, longest signature); see GetMagicTrie()
+__magic_trie_cache__ = {}
+
+def GetMagicTrie(formatspecs):
+    """
+    Prefix trie over every format's signature (magic bytes + version digits)
+    in a multi-format dict, cached per dict. Terminal nodes hold the format
+    key under None. Returns (trie, longest signature length).
+    """
+    cached = __magic_trie_cache__.get(id(formatspecs))
+    if(cached is not None and cached[0] is formatspecs):
+        return cached[1], cached[2]
+    trie = {}
+    maxlen = 0
+    for key, value in formatspecs.items():
+        signature = bytes.fromhex(value['format_hex']) + str(int(value['format_ver'])).encode("UTF-8")
+        node = trie
+        for b in signature:
+            node = node.setdefault(b, {})
+        node.setdefault(None, key)
+        maxlen = max(maxlen, len(signature))
+    __magic_trie_cache__[id(formatspecs)] = (formatspecs, trie, maxlen)
+    return trie, maxlen
+
+def MatchMagicTrie(trie, head):
+    """Longest signature at the start of head: (format key, length) or (None, 0)."""
+    node = trie
+    matchkey = None
+    matchlen = 0
+    for i, b in enumerate(head):
+        node = node.get(b)
+        if(node is None):
+            break
+        if(None in node):
+            matchkey = node[None]
+            matchlen = i + 1
+    return matchkey, matchlen
+
 def ReadFileHeaderData(fp, skipchecksum=False, formatspecs=None, saltkey=None):
     if(formatspecs is None):
         formatspecs = __file_format_multi_dict__
-    filespec = None
-    delimiter = None
-    for key, value in formatspecs.items():
-        oldseek = fp.tell()
-        filetype = fp.read(value['format_len'])
-        formatver = str(int(value['format_ver']))
-        filever = fp.read(len(formatver)).decode("UTF-8")
-        if(filetype.hex()==value['format_hex'] and formatver==filever):
-            filespec = formatspecs[key]
-            delimiter = filespec['format_delimiter']
-            filetypefull = filetype.decode("UTF-8")+filever
-            break
-        fp.seek(oldseek, 1)
-    if(filespec is None or delimiter is None):
+    # one read of the longest signature, matched against every format at once
+    trie, maxlen = GetMagicTrie(formatspecs)
+    oldseek = fp.tell()
+    head = fp.read(maxlen)
+    key, matchlen = MatchMagicTrie(trie, head)
+    if(key is None):
+        fp.seek(oldseek, 0)
         return False
+    filespec = formatspecs[key]
+    delimiter = filespec['format_delimiter']
+    filetypefull = head[:matchlen].decode("UTF-8")
+    fp.seek(oldseek + matchlen, 0)
     fp.seek(len(delimiter), 1)
     outlist = ReadFileHeaderDataBySize(fp, delimiter)
     outlist.insert(0, filetypefull)
@@ -610,11 +720,12 @@ def ReadFileHeaderDataWithContent(fp, listonly=False, contentasfile=False, uncom
     fcontentstart = fp.tell()
     fcontents = io.BytesIO()
     pyhascontents = False
+    newfccs = None
     if(fsize > 0 and not listonly):
         if(fcompression == "none" or fcompression == "" or fcompression == "auto"):
-            fcontents.write(fp.read(fsize))
+            newfccs = ReadFileContentWithChecksum(fp, fcontents, fsize, HeaderOut[-3].lower(), formatspecs, saltkey)
         else:
-            fcontents.write(fp.read(fcsize))
+            newfccs = ReadFileContentWithChecksum(fp, fcontents, fcsize, HeaderOut[-3].lower(), formatspecs, saltkey)
         pyhascontents = True
     elif(fsize > 0 and listonly):
         if(fcompression == "none" or fcompression == "" or fcompression == "auto"):
@@ -623,8 +734,9 @@ def ReadFileHeaderDataWithContent(fp, listonly=False, contentasfile=False, uncom
             fp.seek(fcsize, 1)
         pyhascontents = False
     fcontents.seek(0, 0)
-    newfccs = GetFileChecksum(fcontents, HeaderOut[-3].lower(), formatspecs, saltkey)
-    fcontents.seek(0, 0)
+    if(newfccs is None):
+        newfccs = GetFileChecksum(fcontents, HeaderOut[-3].lower(), formatspecs, saltkey)
+        fcontents.seek(0, 0)
     if(not CheckChecksums(fccs, newfccs) and not skipchecksum and not listonly):
         VerbosePrintOut("File Content Checksum Error with file " +
                         fname + " at offset " + str(fcontentstart))
@@ -667,6 +779,47 @@ def ReadFileHeaderDataWithContent(fp, listonly=False, contentasfile=False, uncom
     HeaderOut.append(fcontents)
     return HeaderOut
 
+def SeekNextFile(fp, fseeknextfile):
+    """Apply a member's fseeknextfile directive (+N / -N relative, N absolute). False if malformed."""
+    if(re.findall("^\\+([0-9]+)", fseeknextfile)):
+        fp.seek(int(fseeknextfile.replace("+", "")), 1)
+    elif(re.findall("^\\-([0-9]+)", fseeknextfile)):
+        fp.seek(int(fseeknextfile), 1)
+    elif(re.findall("^([0-9]+)", fseeknextfile)):
+        fp.seek(int(fseeknextfile), 0)
+    else:
+        return False
+    return True
+
+def SkipFileHeaderDataWithContent(fp, formatspecs=__file_format_dict__):
+    """
+    Hop over one member without reading its JSON block or content: parse the
+    header fields only, seek past the stored data and apply fseeknextfile.
+    No checksums are computed. Returns the raw header list, or False.
+    """
+    if(not hasattr(fp, "read")):
+        return False
+    delimiter = formatspecs['format_delimiter']
+    HeaderOut = ReadFileHeaderDataBySize(fp, delimiter)
+    if(len(HeaderOut) < 32):
+        return False
+    fsize = int(HeaderOut[7], 16)
+    fcompression = HeaderOut[17]
+    fcsize = int(HeaderOut[18], 16)
+    fseeknextfile = HeaderOut[28]
+    fjsonsize = int(HeaderOut[31], 16)
+    # JSON block, its trailing delimiter, then the stored content
+    fskip = fjsonsize + len(delimiter)
+    if(fsize > 0):
+        if(fcompression == "none" or fcompression == "" or fcompression == "auto"):
+            fskip += fsize
+        else:
+            fskip += fcsize
+    fp.seek(fskip, 1)
+    if(not SeekNextFile(fp, fseeknextfile)):
+        return False
+    return HeaderOut
+
 def ReadFileHeaderDataWithContentToArray(fp, listonly=False, contentasfile=True, uncompress=True, skipchecksum=False, formatspecs=__file_format_dict__, saltkey=None):
     if(not hasattr(fp, "read")):
         return False
@@ -827,11 +980,12 @@ def ReadFileHeaderDataWithContentToArray(fp, listonly=False, contentasfile=True,
     fcontentstart = fp.tell()
     fcontents = io.BytesIO()
     pyhascontents = False
+    newfccs = None
     if(fsize > 0 and not listonly):
         if(fcompression == "none" or fcompression == "" or fcompression == "auto"):
-            fcontents.write(fp.read(fsize))
+            newfccs = ReadFileContentWithChecksum(fp, fcontents, fsize, HeaderOut[-3].lower(), formatspecs, saltkey)
         else:
-            fcontents.write(fp.read(fcsize))
+            newfccs = ReadFileContentWithChecksum(fp, fcontents, fcsize, HeaderOut[-3].lower(), formatspecs, saltkey)
         pyhascontents = True
     elif(fsize > 0 and listonly):
         if(fcompression == "none" or fcompression == "" or fcompression == "auto"):
@@ -840,8 +994,9 @@ def ReadFileHeaderDataWithContentToArray(fp, listonly=False, contentasfile=True,
             fp.seek(fcsize, 1)
         pyhascontents = False
     fcontents.seek(0, 0)
-    newfccs = GetFileChecksum(fcontents, HeaderOut[-3].lower(), formatspecs, saltkey)
-    fcontents.seek(0, 0)
+    if(newfccs is None):
+        newfccs = GetFileChecksum(fcontents, HeaderOut[-3].lower(), formatspecs, saltkey)
+        fcontents.seek(0, 0)
     if(not CheckChecksums(fccs, newfccs) and not skipchecksum and not listonly):
         VerbosePrintOut("File Content Checksum Error with file " +
                         fname + " at offset " + str(fcontentstart))
@@ -885,6 +1040,110 @@ def ReadFileHeaderDataWithContentToArray(fp, listonly=False, contentasfile=True,
                'fdev': fdev, 'frdev': frdev, 'fseeknextfile': fseeknextfile, 'fheaderchecksumtype': HeaderOut[-4], 'fjsonchecksumtype': fjsonchecksumtype, 'fcontentchecksumtype': HeaderOut[-3], 'fnumfields': fnumfields + 2, 'frawheader': HeaderOut, 'fvendorfields': fvendorfields, 'fvendordata': fvendorfieldslist, 'fextrafields': fextrafields, 'fextrafieldsize': fextrasize, 'fextradata': fextrafieldslist, 'fjsontype': fjsontype, 'fjsonlen': fjsonlen, 'fjsonsize': fjsonsize, 'fjsonrawdata': fjsonrawcontent, 'fjsondata': fjsoncontent, 'fjstart': fjstart, 'fjend': fjend, 'fheaderchecksum': fcs, 'fjsonchecksum': fjsonchecksum, 'fcontentchecksum': fccs, 'fhascontents': pyhascontents, 'fcontentstart': fcontentstart, 'fcontentend': fcontentend, 'fcontentasfile': contentasfile, 'fcontents': fcontents}
     return outlist
 
+class ArchiveMember(object):
+    """
+    Lazily loaded member: header fields plus the offsets of its JSON block and
+    stored content. Nothing past the header is read until read()/open().
+    """
+    __slots__ = ('fp', 'formatspecs', 'saltkey', 'fid', 'fhstart', 'fjstart', 'fcontentstart',
+                 'frawheader', 'ftype', 'fname', 'fsize', 'fmtime', 'fmode', 'fcompression', 'fcsize',
+                 'fcontentchecksumtype', 'fcontentchecksum')
+
+    def __init__(self, fp, formatspecs, saltkey, fhstart, fjstart, fcontentstart, HeaderOut):
+        self.fp = fp
+        self.formatspecs = formatspecs
+        self.saltkey = saltkey
+        self.fid = 0
+        self.fhstart = fhstart
+        self.fjstart = fjstart
+        self.fcontentstart = fcontentstart
+        self.frawheader = HeaderOut
+        self.ftype = int(HeaderOut[2], 16)
+        if(re.findall("^[.|/]", HeaderOut[5])):
+            self.fname = HeaderOut[5]
+        else:
+            self.fname = "./"+HeaderOut[5]
+        self.fsize = int(HeaderOut[7], 16)
+        self.fmtime = int(HeaderOut[12], 16)
+        self.fmode = int(HeaderOut[15], 16)
+        self.fcompression = HeaderOut[17]
+        self.fcsize = int(HeaderOut[18], 16)
+        self.fcontentchecksumtype = HeaderOut[-3].lower()
+        self.fcontentchecksum = HeaderOut[-1].lower()
+
+    def __repr__(self):
+        return "<ArchiveMember fid=%d fname=%r fsize=%d>" % (self.fid, self.fname, self.fsize)
+
+    @property
+    def fstoredsize(self):
+        """Bytes of content in the archive (compressed size unless stored raw)."""
+        if(self.fsize <= 0):
+            return 0
+        if(self.fcompression == "none" or self.fcompression == "" or self.fcompression == "auto"):
+            return self.fsize
+        return self.fcsize
+
+    def open(self, uncompress=True, skipchecksum=False):
+        """Read the stored content now; returns a file object (decompressed unless uncompress=False)."""
+        oldseek = self.fp.tell()
+        self.fp.seek(self.fcontentstart, 0)
+        fcontents = tempfile.SpooledTemporaryFile(max_size=__spoolfile_size__)
+        newfccs = ReadFileContentWithChecksum(self.fp, fcontents, self.fstoredsize, self.fcontentchecksumtype, self.formatspecs, self.saltkey)
+        self.fp.seek(oldseek, 0)
+        if(self.fstoredsize > 0 and not CheckChecksums(self.fcontentchecksum, newfccs) and not skipchecksum):
+            fcontents.close()
+            raise ValueError("File Content Checksum Error with file " + self.fname +
+                             " at offset " + str(self.fcontentstart))
+        fcontents.seek(0, 0)
+        if(uncompress):
+            return UncompressFileAlt(fcontents, self.formatspecs, self.fcompression)
+        return fcontents
+
+    def read(self, uncompress=True, skipchecksum=False):
+        fcontents = self.open(uncompress, skipchecksum)
+        try:
+            return fcontents.read()
+        finally:
+            fcontents.close()
+
+    def to_dict(self, listonly=False, contentasfile=True, uncompress=True, skipchecksum=False):
+        """Adapter to the eager ReadFileHeaderDataWithContentToArray() dict for this member."""
+        oldseek = self.fp.tell()
+        self.fp.seek(self.fhstart, 0)
+        outlist = ReadFileHeaderDataWithContentToArray(self.fp, listonly, contentasfile, uncompress, skipchecksum, self.formatspecs, self.saltkey)
+        self.fp.seek(oldseek, 0)
+        if(outlist):
+            outlist.update({'fid': self.fid, 'fidalt': self.fid})
+        return outlist
+
+def ReadFileHeaderDataToMember(fp, skipchecksum=False, formatspecs=__file_format_dict__, saltkey=None):
+    """
+    Parse one member header into an ArchiveMember and hop past its JSON block
+    and content. Only the header checksum is checked (unless skipchecksum).
+    """
+    if(not hasattr(fp, "read")):
+        return False
+    delimiter = formatspecs['format_delimiter']
+    fheaderstart = fp.tell()
+    HeaderOut = ReadFileHeaderDataBySize(fp, delimiter)
+    if(len(HeaderOut) < 32):
+        return False
+    if(not skipchecksum):
+        fcs = HeaderOut[-2].lower()
+        newfcs = GetHeaderChecksum(HeaderOut[:-2], HeaderOut[-4].lower(), formatspecs, saltkey)
+        if(fcs != newfcs):
+            VerbosePrintOut("File Header Checksum Error with file " +
+                            HeaderOut[5] + " at offset " + str(fheaderstart))
+            VerbosePrintOut("'" + fcs + "' != " + "'" + newfcs + "'")
+            return False
+    fjstart = fp.tell()
+    fjsonsize = int(HeaderOut[31], 16)
+    member = ArchiveMember(fp, formatspecs, saltkey, fheaderstart, fjstart, fjstart + fjsonsize + len(delimiter), HeaderOut)
+    fp.seek(member.fcontentstart + member.fstoredsize, 0)
+    if(not SeekNextFile(fp, HeaderOut[28])):
+        return False
+    return member
+
 def ReadFileDataWithContent(fp, filestart=0, listonly=False, contentasfile=False, uncompress=True, skipchecksum=False, formatspecs=None, saltkey=None):
     if(not hasattr(fp, "read")):
         return False
@@ -951,7 +1210,15 @@ def ReadFileDataWithContent(fp, filestart=0, listonly=False, contentasfile=False
         countnum = countnum + 1
     return flist
 
-def ReadFileDataWithContentToArray(fp, filestart=0, seekstart=0, seekend=0, listonly=False, contentasfile=True, uncompress=True, skipchecksum=False, formatspecs=__file_format_dict__, saltkey=None, seektoend=False):
+def ReadFileDataWithContentToArray(fp, filestart=0, seekstart=0, seekend=0, listonly=False, contentasfile=True, uncompress=True, skipchecksum=False, formatspecs=__file_format_dict__, saltkey=None, seektoend=False, seekverify=False, lazy=False):
+    """
+    Read the archive header and members [seekstart, seekend) into a dict.
+    Members before seekstart are hopped over with SkipFileHeaderDataWithContent
+    (header lengths + fseeknextfile, no reads or checksums) unless seekverify
+    asks for them to be fully read and checked.
+    With lazy=True, 'ffilelist' holds ArchiveMember objects whose content is
+    only read on .read()/.open(); ArchiveMember.to_dict() gives the usual dict.
+    """
     if(not hasattr(fp, "read")):
         return False
     delimiter = formatspecs['format_delimiter']
@@ -1129,76 +1396,26 @@ def ReadFileDataWithContentToArray(fp, filestart=0, seekstart=0, seekend=0, list
     if(seekstart > 0):
         il = 0
         while(il < seekstart):
-            prefhstart = fp.tell()
-            preheaderdata = ReadFileHeaderDataBySize(
-                fp, formatspecs['format_delimiter'])
-            if(len(preheaderdata) == 0):
-                break
-            prefsize = int(preheaderdata[5], 16)
-            if(re.findall("^[.|/]", preheaderdata[5])):
-                prefname = preheaderdata[5]
-            else:
-                prefname = "./"+preheaderdata[5]
-            prefseeknextfile = preheaderdata[26]
-            prefjsonlen = int(preheaderdata[28], 16)
-            prefjsonsize = int(preheaderdata[29], 16)
-            prefjsonchecksumtype = preheaderdata[30]
-            prefjsonchecksum = preheaderdata[31]
-            prejsoncontent = fp.read(prefjsonsize).decode("UTF-8")
-            fp.seek(len(delimiter), 1)
-            prejsonfcs = GetFileChecksum(prejsoncontent, prefjsonchecksumtype, formatspecs, saltkey)
-            if(not CheckChecksums(prefjsonchecksum, prejsonfcs) and not skipchecksum):
-                VerbosePrintOut("File JSON Data Checksum Error with file " +
-                                prefname + " at offset " + str(prefhstart))
-                VerbosePrintOut("'" + prefjsonchecksum + "' != " + "'" + prejsonfcs + "'")
-                return False
-            prenewfcs = GetHeaderChecksum(preheaderdata[:-2], preheaderdata[-4].lower(), formatspecs, saltkey)
-            prefcs = preheaderdata[-2]
-            if(not CheckChecksums(prefcs, prenewfcs) and not skipchecksum):
-                VerbosePrintOut("File Header Checksum Error with file " +
-                                 prefname + " at offset " + str(prefhstart))
-                VerbosePrintOut("'" + prefcs + "' != " +
-                                "'" + prenewfcs + "'")
-                return False
-                valid_archive = False
-                invalid_archive = True
-            prefhend = fp.tell() - 1
-            prefcontentstart = fp.tell()
-            prefcontents = io.BytesIO()
-            pyhascontents = False
-            if(prefsize > 0):
-                prefcontents.write(fp.read(prefsize))
-                prefcontents.seek(0, 0)
-                prenewfccs = GetFileChecksum(prefcontents, preheaderdata[-3].lower(), formatspecs, saltkey)
-                prefccs = preheaderdata[-1]
-                pyhascontents = True
-                if(not CheckChecksums(prefccs, prenewfccs) and not skipchecksum):
-                    VerbosePrintOut("File Content Checksum Error with file " +
-                                    prefname + " at offset " + str(prefcontentstart))
-                    VerbosePrintOut("'" + prefccs +
-                                    "' != " + "'" + prenewfccs + "'")
-                    return False
-            if(re.findall("^\\+([0-9]+)", prefseeknextfile)):
-                fseeknextasnum = int(prefseeknextfile.replace("+", ""))
-                if(abs(fseeknextasnum) == 0):
-                    pass
-                fp.seek(fseeknextasnum, 1)
-            elif(re.findall("^\\-([0-9]+)", prefseeknextfile)):
-                fseeknextasnum = int(prefseeknextfile)
-                if(abs(fseeknextasnum) == 0):
-                    pass
-                fp.seek(fseeknextasnum, 1)
-            elif(re.findall("^([0-9]+)", prefseeknextfile)):
-                fseeknextasnum = int(prefseeknextfile)
-                if(abs(fseeknextasnum) == 0):
-                    pass
-                fp.seek(fseeknextasnum, 0)
+            if(seekverify):
+                # Full read of the skipped member: header, JSON and content checksums.
+                preheaderdata = ReadFileHeaderDataWithContentToArray(fp, False, True, False, skipchecksum, formatspecs, saltkey)
             else:
+                preheaderdata = SkipFileHeaderDataWithContent(fp, formatspecs)
+            if(not preheaderdata):
                 return False
             il = il + 1
     realidnum = 0
     countnum = seekstart
     while (fp.tell() < CatSizeEnd) if seektoend else (countnum < seekend):
+        if(lazy):
+            HeaderOut = ReadFileHeaderDataToMember(fp, skipchecksum, formatspecs, saltkey)
+            if(not HeaderOut):
+                break
+            HeaderOut.fid = realidnum
+            outlist['ffilelist'].append(HeaderOut)
+            countnum = countnum + 1
+            realidnum = realidnum + 1
+            continue
         HeaderOut = ReadFileHeaderDataWithContentToArray(fp, listonly, contentasfile, uncompress, skipchecksum, formatspecs, saltkey)
         if(len(HeaderOut) == 0):
             break
@@ -1209,42 +1426,137 @@ def ReadFileDataWithContentToArray(fp, filestart=0, seekstart=0, seekend=0, list
     outlist.update({'fp': fp})
     return outlist
 
+# Compressed bytes handed to zstandard per call; bounds what one call decodes.
+__zstd_feed_size__ = 65536
+
+class ZstdDecompressor(object):
+    """zstandard decompressobj with the zlib-style interface. Input is fed in
+    __zstd_feed_size__ slices and output past max_length is held for the next
+    call; a backend without eof ends at flush()."""
+    def __init__(self):
+        self.decomp = zstandard.ZstdDecompressor().decompressobj()
+        self.pending = b""
+        self.unconsumed_tail = b""
+        self.eof = False
+
+    def feed(self, data):
+        self.pending += self.decomp.decompress(bytes(data))
+        self.eof = getattr(self.decomp, "eof", False)
+
+    def decompress(self, data, max_length=0):
+        data = memoryview(data)
+        pos = 0
+        if(max_length <= 0):
+            if(not self.eof):
+                self.feed(data)
+            out, self.pending, self.unconsumed_tail = self.pending, b"", b""
+            return out
+        # The last input byte waits while output is held, so a caller looping
+        # on unconsumed_tail comes back for it.
+        while(not self.pending and pos < len(data) and not self.eof):
+            end = min(pos + __zstd_feed_size__, max(len(data) - 1, pos + 1))
+            self.feed(data[pos:end])
+            pos = end
+        out, self.pending = self.pending[:max_length], self.pending[max_length:]
+        self.unconsumed_tail = b"" if self.eof else bytes(data[pos:])
+        return out
+
+    def flush(self):
+        out, self.pending = self.pending + self.decomp.flush(), b""
+        if(not hasattr(self.decomp, "eof")):
+            self.eof = True
+        return out
+
+# compression_type -> factory for an incremental decompressor with the
+# lzma/bz2 interface (eof, needs_input) or the zlib one (unconsumed_tail, flush).
+__decompressor_registry__ = {}
+# compression_type -> {"members", "bytes_in", "bytes_out", "seconds"}
+__codec_stats__ = {}
+
+def RegisterDecompressor(compression_types, factory):
+    """Make UncompressFileAlt handle compression_types (a name or a list) with factory()."""
+    if isinstance(compression_types, str):
+        compression_types = [compression_types]
+    for compression_type in compression_types:
+        __decompressor_registry__[compression_type] = factory
+
+def GetCodecStats(reset=False):
+    """Per-codec bytes in/out and seconds spent decompressing since the last reset."""
+    stats = dict((k, dict(v)) for k, v in __codec_stats__.items())
+    if reset:
+        __codec_stats__.clear()
+    return stats
+
+RegisterDecompressor(["bz2", "bzip2"], bz2.BZ2Decompressor)
+RegisterDecompressor("lzma", lzma.LZMADecompressor)
+RegisterDecompressor("zlib", zlib.decompressobj)
+if zstandard is not None:
+    RegisterDecompressor(["zstd", "zstandard"], ZstdDecompressor)
+if lz4frame is not None:
+    RegisterDecompressor("lz4", lz4frame.LZ4FrameDecompressor)
+if neozcompress is not None:
+    RegisterDecompressor("lzw", neozcompress.LZWDecompressor)
+
 def UncompressFileAlt(infile, formatspecs, compression_type="none"):
     """
     Decompresses the content buffer based on the compression_type field.
-    Returns a BytesIO object with the raw data.
+    Streams __filebuff_size__ chunks through an incremental decompressor into
+    a spooled temp file, so peak memory is bounded by the chunk/spool size
+    instead of the whole member. Returns a file object with the raw data.
+    The decompressor comes from __decompressor_registry__ (see
+    RegisterDecompressor); bytes in/out and time go to __codec_stats__.
     """
     if not hasattr(infile, "read"):
         return infile
-    
+
+    factory = __decompressor_registry__.get(compression_type)
+    if factory is None:
+        # 'none', 'auto', or unknown
+        infile.seek(0)
+        return infile
+    decomp = factory()
+    zlibstyle = hasattr(decomp, "unconsumed_tail")
+    stats = __codec_stats__.setdefault(compression_type, {"members": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0})
+    stats['members'] += 1
+
     # Ensure we are at the start of the buffer
     infile.seek(0)
-    data = infile.read()
-    
-    # Reset for safety
-    infile.seek(0)
-    
-    out_data = None
-    
+    outfile = tempfile.SpooledTemporaryFile(max_size=__spoolfile_size__)
+    starttime = time.perf_counter()
     try:
-        if compression_type in ["bz2", "bzip2"]:
-            out_data = bz2.decompress(data)
-        elif compression_type == "lzma":
-            out_data = lzma.decompress(data)
-        elif compression_type == "zlib":
-            out_data = zlib.decompress(data)
-        else:
-            # 'none', 'auto', or unknown
-            return infile
-            
-        return io.BytesIO(out_data)
-        
+        while not decomp.eof:
+            chunk = infile.read(__filebuff_size__)
+            if not chunk:
+                break
+            stats['bytes_in'] += len(chunk)
+            while chunk:
+                outfile.write(decomp.decompress(chunk, __filebuff_size__))
+                if zlibstyle:
+                    chunk = decomp.unconsumed_tail
+                else:
+                    chunk = b""
+                    while not decomp.eof and not decomp.needs_input:
+                        outfile.write(decomp.decompress(b"", __filebuff_size__))
+        if zlibstyle:
+            outfile.write(decomp.flush())
+        if not decomp.eof:
+            raise EOFError("Compressed data ended before the end-of-stream marker was reached")
     except Exception as e:
         # In a robust tool, you might want to log this error
         print(f"Decompression error ({compression_type}): {e}")
+        stats['seconds'] += time.perf_counter() - starttime
+        outfile.close()
+        infile.seek(0)
         return infile
 
-test = open("./test.arc", "rb")
-headerdata = ReadFileDataWithContentToArray(test, formatspecs=__file_format_dict__)
-print(headerdata)
-test.close()
+    stats['seconds'] += time.perf_counter() - starttime
+    stats['bytes_out'] += outfile.tell()
+    infile.seek(0)
+    outfile.seek(0)
+    return outfile
+
+if __name__ == "__main__":
+    test = open("./test.arc", "rb")
+    headerdata = ReadFileDataWithContentToArray(test, formatspecs=__file_format_dict__)
+    print(headerdata)
+    test.close()
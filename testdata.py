@@ -9,24 +9,85 @@ Best of:
 Usage:
   python archive_tool.py list   path/to/archive.arc --fmt archivefile.json
   python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --out output_dir
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --mmap
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --jobs 8
+  python archive_tool.py build-index path/to/archive.arc --fmt archivefile.ini
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --member ./data/file.json
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --out output_dir --resume
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --include '*.json' --exclude 're:draft'
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --dedup
+  python archive_tool.py extract path/to/archive.arc --fmt archivefile.ini --codec-stats
+  python archive_tool.py export  path/to/archive.arc --fmt archivefile.ini --to tar > archive.tar
+  python archive_tool.py export  path/to/archive.arc --fmt archivefile.ini --to zip --out archive.zip
+  python archive_tool.py salvage damaged.arc --fmt archivefile.ini --out recovered --report salvage.json
+  python archive_tool.py batch "archives/**/*.arc" --fmt archivefile.ini --op extract --jobs 8 --report report.json
+  python archive_tool.py create  path/to/archive.arc --fmt archivefile.ini --jobs 8 data/
 """
 
 from __future__ import annotations
 
+import io
 import os
 import re
+import glob
+import fnmatch
 import json
+import tarfile
+import zipfile
 import bz2
 import lzma
 import zlib
 import hmac
+import mmap
 import argparse
 import hashlib
+import time
+import bisect
+import random
+import struct
+import pickle
+import platform
 import configparser
-from dataclasses import dataclass
+import contextlib
+import stat
+import sys
+import threading
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from dataclasses import dataclass, field
 from typing import Dict, Tuple, List, Optional, Iterable, Any, Callable
 
+try:
+    import pwd
+    import grp
+except ImportError:   # not available on Windows
+    pwd = None
+    grp = None
+
+# Optional codecs: registered only when importable (see "Codecs" below).
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+
+try:
+    import neozcompress   # this repo's LZW, when run from the source tree
+except ImportError:
+    neozcompress = None
+
 HEXBYTES = b"0123456789abcdefABCDEF"
+READ_BLOCK_SIZE = 256 * 1024
+SCAN_BLOCK_SIZE = 64 * 1024
+# Upper bound on compressed + uncompressed bytes queued to extraction workers.
+DEFAULT_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+HEX_BYTE_RE = re.compile(rb"[0-9a-fA-F]")
 
 
 # ----------------------------
@@ -80,19 +141,24 @@ def checksum_supported(algo_key: str) -> bool:
         return False
 
 
+def new_checksum_hasher(algo: str = "md5", salt: Optional[bytes] = None):
+    """Hashlib (or HMAC when salted) object for algo, or None if unsupported."""
+    algo_key = (algo or "md5").lower()
+    if not checksum_supported(algo_key):
+        return None
+    if salt:
+        return hmac.new(salt, digestmod=algo_key)
+    return hashlib.new(algo_key)
+
+
 def file_checksum(data_or_file, algo: str = "md5", salt: Optional[bytes] = None, chunk_size: int = 256 * 1024) -> str:
     """Compute checksum for bytes/str/file-like."""
     algo_key = (algo or "md5").lower()
 
-    def _new_hasher():
-        if salt:
-            return hmac.new(salt, digestmod=algo_key)
-        return hashlib.new(algo_key)
-
     if not checksum_supported(algo_key):
         return "0"
 
-    h = _new_hasher()
+    h = new_checksum_hasher(algo_key, salt)
 
     if hasattr(data_or_file, "read"):
         while True:
@@ -125,6 +191,156 @@ def checksums_equal(a: str, b: str) -> bool:
     return hmac.compare_digest(a.encode("utf-8"), b.encode("utf-8"))
 
 
+# ----------------------------
+# Codecs (pluggable registry)
+# ----------------------------
+
+@dataclass(frozen=True)
+class Codec:
+    """
+    One member compression. new_decompressor() returns an object with the
+    lzma/bz2 API (decompress(data, max_length), eof, needs_input) or the zlib
+    one (unconsumed_tail, flush()); new_compressor(level) one with
+    compress(data)/flush(). magic matches the payload's first bytes (re works
+    on bytes and memoryview alike); None means the payload has no marker and
+    starts right after the header's JSON block.
+    """
+    name: str
+    magic: Optional[re.Pattern]
+    new_decompressor: Callable[[], Any]
+    new_compressor: Optional[Callable[[Optional[int]], Any]] = None
+
+
+CODECS: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec, *aliases: str) -> Codec:
+    """Make codec available to extraction (and to create, if it can compress)."""
+    for name in (codec.name,) + aliases:
+        CODECS[name] = codec
+    return codec
+
+
+def writable_codecs() -> Tuple[str, ...]:
+    """Registered codec names (not aliases) that can also compress."""
+    return tuple(name for name, c in CODECS.items() if name == c.name and c.new_compressor is not None)
+
+
+@dataclass
+class CodecStats:
+    """Decompression work for one codec: members, bytes in/out and seconds spent."""
+    members: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+
+    def add(self, other: "CodecStats") -> None:
+        self.members += other.members
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.seconds += other.seconds
+
+
+def codec_summary(codecs: Dict[str, CodecStats]) -> str:
+    """Per-codec table, most expensive first, so formats can be chosen on data."""
+    total = sum(c.seconds for c in codecs.values()) or 1.0
+    lines = [f"{'codec':<8} {'members':>8} {'in MB':>9} {'out MB':>9} {'ratio':>6} {'seconds':>8} {'MB/s out':>9} {'time':>6}"]
+    for name, c in sorted(codecs.items(), key=lambda kv: kv[1].seconds, reverse=True):
+        mb_in = c.bytes_in / (1024 * 1024)
+        mb_out = c.bytes_out / (1024 * 1024)
+        ratio = f"{c.bytes_out / c.bytes_in:.2f}" if c.bytes_in else "n/a"
+        rate = f"{mb_out / c.seconds:.1f}" if c.seconds > 0 else "n/a"
+        lines.append(f"{name:<8} {c.members:>8} {mb_in:>9.2f} {mb_out:>9.2f} {ratio:>6} {c.seconds:>8.3f} "
+                     f"{rate:>9} {100 * c.seconds / total:>5.1f}%")
+    return "\n".join(lines)
+
+
+# Input handed to the zstandard backend per call; bounds what one call decodes.
+ZSTD_FEED_SIZE = 64 * 1024
+
+
+class _ZstdDecompressor:
+    """
+    zstandard decompressobj in the zlib API. The backend returns all it can
+    decode, so input goes in ZSTD_FEED_SIZE slices and output past max_length
+    is held for the next call. Backends without eof end at flush().
+    """
+
+    def __init__(self):
+        self._d = zstandard.ZstdDecompressor().decompressobj()
+        self._pending = b""
+        self.unconsumed_tail = b""
+        self.eof = False
+
+    def _feed(self, data) -> None:
+        self._pending += self._d.decompress(bytes(data))
+        self.eof = getattr(self._d, "eof", False)
+
+    def decompress(self, data, max_length: int = 0) -> bytes:
+        data = memoryview(data)
+        pos = 0
+        if max_length <= 0:
+            if not self.eof:
+                self._feed(data)
+            out, self._pending = self._pending, b""
+            self.unconsumed_tail = b""
+            return out
+        # The last input byte waits until held output is handed out, so the
+        # caller's unconsumed_tail loop comes back for the rest.
+        while not self._pending and pos < len(data) and not self.eof:
+            end = min(pos + ZSTD_FEED_SIZE, max(len(data) - 1, pos + 1))
+            self._feed(data[pos:end])
+            pos = end
+        out, self._pending = self._pending[:max_length], self._pending[max_length:]
+        self.unconsumed_tail = b"" if self.eof else bytes(data[pos:])
+        return out
+
+    def flush(self) -> bytes:
+        out, self._pending = self._pending + self._d.flush(), b""
+        if not hasattr(self._d, "eof"):
+            self.eof = True
+        return out
+
+
+class _Lz4Compressor:
+    """LZ4FrameCompressor that emits its frame header with the first output."""
+
+    def __init__(self, level: Optional[int] = None):
+        self._c = lz4frame.LZ4FrameCompressor(compression_level=0 if level is None else level)
+        self._header = self._c.begin()
+
+    def compress(self, data) -> bytes:
+        out, self._header = self._header + self._c.compress(data), b""
+        return out
+
+    def flush(self) -> bytes:
+        out, self._header = self._header + self._c.flush(), b""
+        return out
+
+
+register_codec(Codec(
+    "lzma", re.compile(rb"\x5d"), lzma.LZMADecompressor,
+    # FORMAT_ALONE matches existing archives (payload starts with 0x5d)
+    lambda level: lzma.LZMACompressor(format=lzma.FORMAT_ALONE, preset=6 if level is None else level)))
+register_codec(Codec(
+    "bzip2", re.compile(rb"BZh"), bz2.BZ2Decompressor,
+    lambda level: bz2.BZ2Compressor(9 if level is None else level)), "bz2")
+register_codec(Codec(
+    "zlib", re.compile(rb"\x78"), zlib.decompressobj,
+    lambda level: zlib.compressobj(-1 if level is None else level)))
+if zstandard is not None:
+    register_codec(Codec(
+        "zstd", re.compile(rb"\x28\xb5\x2f\xfd"), _ZstdDecompressor,
+        lambda level: zstandard.ZstdCompressor(3 if level is None else level).compressobj()), "zstandard")
+if lz4frame is not None:
+    register_codec(Codec("lz4", re.compile(rb"\x04\x22\x4d\x18"), lz4frame.LZ4FrameDecompressor, _Lz4Compressor))
+if neozcompress is not None:
+    register_codec(Codec(
+        "lzw", None, neozcompress.LZWDecompressor,
+        # level is the maximum code width in bits, as in compress -b
+        lambda level: neozcompress.LZWCompressor(4096 if level is None else 1 << level)))
+
+
 # ----------------------------
 # Format config loading (INI or JSON)
 # ----------------------------
@@ -144,18 +360,83 @@ class FormatSpec:
     idx_usize: int = 5
     idx_comp: int = 15
     idx_csize: int = 16
+    # Metadata carried into exports (ArchiveFile layout)
+    idx_linkname: int = 4
+    idx_mtime: int = 10
+    idx_mode: int = 13
+    idx_uid: int = 17
+    idx_uname: int = 18
+    idx_gid: int = 19
+    idx_gname: int = 20
+    idx_jsonsize: int = 29     # size of the JSON block after the header (recovery scan)
+
 
+FORMAT_META_INDICES = ("idx_linkname", "idx_mtime", "idx_mode", "idx_uid", "idx_uname", "idx_gid", "idx_gname",
+                       "idx_jsonsize")
 
-def load_formats(fmt_path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]:
+
+# Parsed registries: in-process by absolute path, and pickled on disk so
+# separate invocations skip INI/JSON parsing too. Both are keyed by the
+# config's (size, mtime_ns) and rebuilt when it changes.
+FORMAT_CACHE_VERSION = 3
+_FORMAT_CACHE: Dict[str, Tuple[Tuple[int, int], Optional[str], Dict[str, FormatSpec]]] = {}
+
+
+def format_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "archive_tool")
+
+
+def _format_cache_file(abs_path: str) -> str:
+    digest = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()
+    return os.path.join(format_cache_dir(), f"formats-{digest}.pickle")
+
+
+def load_formats(fmt_path: str, use_cache: bool = True) -> Tuple[Optional[str], Dict[str, FormatSpec]]:
     """
     Load formats from either:
       - JSON like data.py
       - INI like test.py
-    Returns (default_key, registry)
+    Returns (default_key, registry). Results are cached (memory + pickle)
+    against the config file's size and mtime.
     """
     if not os.path.exists(fmt_path):
         raise FileNotFoundError(f"Format config not found: {fmt_path}")
+    if not use_cache:
+        return _parse_formats(fmt_path)
+
+    abs_path = os.path.abspath(fmt_path)
+    st = os.stat(abs_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+
+    hit = _FORMAT_CACHE.get(abs_path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1], hit[2]
+
+    cache_file = _format_cache_file(abs_path)
+    try:
+        with open(cache_file, "rb") as cf:
+            version, cached_stamp, default_key, registry = pickle.load(cf)
+        if version == FORMAT_CACHE_VERSION and tuple(cached_stamp) == stamp:
+            _FORMAT_CACHE[abs_path] = (stamp, default_key, registry)
+            return default_key, registry
+    except Exception:
+        pass  # missing, stale or unreadable cache: reparse
+
+    default_key, registry = _parse_formats(abs_path)
+    _FORMAT_CACHE[abs_path] = (stamp, default_key, registry)
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as cf:
+            pickle.dump((FORMAT_CACHE_VERSION, stamp, default_key, registry), cf, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass  # read-only home etc.: the in-process cache still applies
+    return default_key, registry
 
+
+def _parse_formats(fmt_path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]:
     _, ext = os.path.splitext(fmt_path.lower())
 
     if ext in (".ini", ".cfg"):
@@ -211,6 +492,7 @@ def _load_formats_ini(path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]:
         idx_usize = int(cp.get(section, "idx_usize", fallback="5"))
         idx_comp = int(cp.get(section, "idx_comp", fallback="15"))
         idx_csize = int(cp.get(section, "idx_csize", fallback="16"))
+        meta_idx = {k: int(cp.get(section, k)) for k in FORMAT_META_INDICES if cp.has_option(section, k)}
 
         registry[section] = FormatSpec(
             key=section,
@@ -225,6 +507,7 @@ def _load_formats_ini(path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]:
             idx_usize=idx_usize,
             idx_comp=idx_comp,
             idx_csize=idx_csize,
+            **meta_idx,
         )
 
     if not registry:
@@ -274,6 +557,7 @@ def _load_formats_json(path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]
         idx_usize = int(meta.get("idx_usize", 5))
         idx_comp = int(meta.get("idx_comp", 15))
         idx_csize = int(meta.get("idx_csize", 16))
+        meta_idx = {k: int(meta[k]) for k in FORMAT_META_INDICES if k in meta}
 
         registry[key] = FormatSpec(
             key=key,
@@ -288,6 +572,7 @@ def _load_formats_json(path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]
             idx_usize=idx_usize,
             idx_comp=idx_comp,
             idx_csize=idx_csize,
+            **meta_idx,
         )
 
     if not registry:
@@ -308,31 +593,68 @@ def _load_formats_json(path: str) -> Tuple[Optional[str], Dict[str, FormatSpec]]
     return default_key, registry
 
 
-def detect_format(file_path: str, fmt_registry: Dict[str, FormatSpec], default_key: Optional[str]) -> FormatSpec:
-    """Detect by matching the longest magic hex prefix; fallback to default."""
-    candidates: List[Tuple[int, FormatSpec, bytes]] = []
-    for spec in fmt_registry.values():
-        hx = spec.magic_hex or ""
-        try:
-            mb = bytes.fromhex(hx)
-        except Exception:
-            continue
-        candidates.append((len(mb), spec, mb))
+class MagicMatcher:
+    """
+    Prefix trie over the registry's magic bytes. match() walks one file head
+    and returns the longest registered magic it starts with.
+    """
+
+    _END = None  # trie key marking "a magic ends here"
+
+    def __init__(self, registry: Dict[str, FormatSpec]):
+        self.root: Dict[Any, Any] = {}
+        self.max_len = 0
+        for spec in registry.values():
+            try:
+                mb = bytes.fromhex(spec.magic_hex or "")
+            except ValueError:
+                continue
+            if not mb:
+                continue
+            node = self.root
+            for b in mb:
+                node = node.setdefault(b, {})
+            # first definition wins for duplicate magics, as registry order did
+            node.setdefault(self._END, spec)
+            self.max_len = max(self.max_len, len(mb))
+
+    def __bool__(self) -> bool:
+        return self.max_len > 0
+
+    def match(self, head: bytes) -> Optional[FormatSpec]:
+        node = self.root
+        best = None
+        for b in head:
+            node = node.get(b)
+            if node is None:
+                break
+            best = node.get(self._END, best)
+        return best
+
+
+# registry id -> (registry, matcher); the identity check guards against id reuse
+_MATCHERS: Dict[int, Tuple[Dict[str, FormatSpec], MagicMatcher]] = {}
 
-    if not candidates:
+
+def magic_matcher(fmt_registry: Dict[str, FormatSpec]) -> MagicMatcher:
+    hit = _MATCHERS.get(id(fmt_registry))
+    if hit is None or hit[0] is not fmt_registry:
+        hit = (fmt_registry, MagicMatcher(fmt_registry))
+        _MATCHERS[id(fmt_registry)] = hit
+    return hit[1]
+
+
+def detect_format_head(head: bytes, fmt_registry: Dict[str, FormatSpec], default_key: Optional[str]) -> FormatSpec:
+    """detect_format() on bytes already read from the start of an archive."""
+    matcher = magic_matcher(fmt_registry)
+    if not matcher:
         if default_key and default_key in fmt_registry:
             return fmt_registry[default_key]
         raise ValueError("No valid magic hex entries in config.")
 
-    max_len = max(n for n, _, _ in candidates)
-    with open(file_path, "rb") as f:
-        head = f.read(max_len)
-
-    # longest match first
-    candidates.sort(key=lambda t: t[0], reverse=True)
-    for _, spec, mb in candidates:
-        if mb and head.startswith(mb):
-            return spec
+    spec = matcher.match(head)
+    if spec is not None:
+        return spec
 
     if default_key and default_key in fmt_registry:
         return fmt_registry[default_key]
@@ -341,17 +663,191 @@ def detect_format(file_path: str, fmt_registry: Dict[str, FormatSpec], default_k
     return next(iter(fmt_registry.values()))
 
 
+def detect_format(file_path: str, fmt_registry: Dict[str, FormatSpec], default_key: Optional[str]) -> FormatSpec:
+    """Detect by the longest matching magic prefix (one read per file); fallback to default."""
+    matcher = magic_matcher(fmt_registry)
+    head = b""
+    if matcher:
+        with open(file_path, "rb") as f:
+            head = f.read(matcher.max_len)
+    return detect_format_head(head, fmt_registry, default_key)
+
+
 # ----------------------------
 # Token reader + record scanning (data.py best bits)
 # ----------------------------
 
+class BufferedArchiveReader:
+    """
+    Block-buffered wrapper around a binary file.
+
+    Tokens are split with bytes.find() over READ_BLOCK_SIZE blocks instead of
+    one read(1) call per byte. read()/seek()/tell() are passed through so the
+    helpers below keep working on the logical position.
+    """
+
+    def __init__(self, raw, block_size: int = READ_BLOCK_SIZE):
+        self.raw = raw
+        self.block_size = block_size
+        self._buf = b""
+        self._pos = 0
+        self._base = raw.tell()  # file offset of _buf[0]
+
+    def __enter__(self) -> "BufferedArchiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.raw.close()
+
+    def _drop_buffer(self, offset: int) -> None:
+        self._buf = b""
+        self._pos = 0
+        self._base = offset
+
+    def _fill(self) -> bool:
+        """Append one block to the unread tail of the buffer. False at EOF."""
+        chunk = self.raw.read(self.block_size)
+        if not chunk:
+            return False
+        self._base += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def tell(self) -> int:
+        return self._base + self._pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            target = self.tell() + offset
+        elif whence == 2:
+            target = self.raw.seek(offset, 2)
+            self._drop_buffer(target)
+            return target
+        else:
+            target = offset
+
+        if self._base <= target <= self._base + len(self._buf):
+            self._pos = target - self._base
+        else:
+            self.raw.seek(target, 0)
+            self._drop_buffer(target)
+        return target
+
+    def read(self, n: int = -1) -> bytes:
+        avail = len(self._buf) - self._pos
+        if 0 <= n <= avail:
+            data = self._buf[self._pos:self._pos + n]
+            self._pos += n
+            return data
+
+        # Large or unbounded read: drain the buffer, then read straight through.
+        head = self._buf[self._pos:]
+        rest = self.raw.read() if n < 0 else self.raw.read(n - avail)
+        self._drop_buffer(self._base + len(self._buf) + len(rest))
+        return head + rest if head else rest
+
+    def read_token(self, delim: bytes) -> str:
+        """Return the next token and consume its delimiter (rest of file at EOF)."""
+        while True:
+            i = self._buf.find(delim, self._pos)
+            if i != -1:
+                tok = self._buf[self._pos:i]
+                self._pos = i + len(delim)
+                return tok.decode("utf-8", errors="ignore")
+            if not self._fill():
+                tok = self._buf[self._pos:]
+                self._pos = len(self._buf)
+                return tok.decode("utf-8", errors="ignore")
+
+
+class MmapArchiveReader:
+    """
+    Read-only memory map of the whole archive with the same read/seek/tell/
+    read_token interface as BufferedArchiveReader. read() returns memoryview
+    slices of the map, so payloads reach the decompressor without a copy.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._mm = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        self._size = len(self._mm)
+        self._pos = 0
+
+    def __enter__(self) -> "MmapArchiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # A caller still holds a payload slice; the map is unmapped once it is dropped.
+            pass
+        self.raw.close()
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, n: int = -1) -> memoryview:
+        start = min(self._pos, self._size)
+        end = self._size if n < 0 else min(start + n, self._size)
+        self._pos = end
+        return self._view[start:end]
+
+    def read_token(self, delim: bytes) -> str:
+        """Return the next token and consume its delimiter (rest of file at EOF)."""
+        start = self._pos
+        i = self._mm.find(delim, start)
+        if i == -1:
+            i = self._size
+            self._pos = i
+        else:
+            self._pos = i + len(delim)
+        return self._mm[start:i].decode("utf-8", errors="ignore")
+
+
+def open_archive(arc_path: str, use_mmap: bool = False):
+    """Open arc_path with the buffered reader, or memory-mapped when use_mmap is set."""
+    raw = open(arc_path, "rb")
+    if use_mmap:
+        try:
+            return MmapArchiveReader(raw)
+        except (ValueError, OSError):
+            # empty files and some special files cannot be mapped
+            raw.seek(0, 0)
+    return BufferedArchiveReader(raw)
+
+
 def make_token_reader(delim: bytes) -> Callable:
-    """Read UTF-8 tokens separated by exactly one byte delimiter (commonly NUL)."""
+    """
+    Read UTF-8 tokens separated by exactly one byte delimiter (commonly NUL).
+    Readers exposing read_token() (BufferedArchiveReader) split whole blocks;
+    plain file objects fall back to byte-at-a-time reads.
+    """
     if len(delim) != 1:
         raise ValueError("Delimiter must be exactly 1 byte for this tool.")
     d = delim
 
     def read_token(f) -> str:
+        fast = getattr(f, "read_token", None)
+        if fast is not None:
+            return fast(d)
         buf = bytearray()
         while True:
             b = f.read(1)
@@ -366,52 +862,140 @@ def make_token_reader(delim: bytes) -> Callable:
 
 def scan_to_next_header(f, max_scan: int = 2_000_000) -> bool:
     """Skip padding/garbage until we find an ASCII hex digit that can start a header token."""
-    scanned = 0
+    start = f.tell()
+    probe = f.read(1)
+    if not probe:
+        return False
+    if probe in HEXBYTES:
+        f.seek(start, 0)
+        return True
+
+    # Garbage: search whole blocks (bytes or memoryview) instead of byte-by-byte.
+    scanned = 1
     while scanned < max_scan:
-        b = f.read(1)
-        if not b:
+        block = f.read(min(SCAN_BLOCK_SIZE, max_scan - scanned))
+        if not block:
             return False
-        scanned += 1
-        if b in HEXBYTES:
-            f.seek(-1, 1)
+        m = HEX_BYTE_RE.search(block)
+        if m:
+            f.seek(start + scanned + m.start(), 0)
             return True
+        scanned += len(block)
     raise RuntimeError("Could not find next header within scan limit")
 
 
-def find_content_start(f, compression: str, max_scan: int = 4096) -> Optional[int]:
+def find_content_start(f, compression: str, max_scan: int = 4096, expected: Optional[int] = None) -> Optional[int]:
     """
-    After a record header there may be padding. Find the start of compressed payload.
-    - lzma often starts with 0x5D
-    - bzip2 starts with 'BZh'
-    - zlib usually starts with 0x78
+    After a record header there may be padding. Find the start of compressed payload
+    by the codec's magic (lzma 0x5D, bzip2 'BZh', zlib 0x78, ...). expected (where
+    the header's JSON size puts the payload) wins when the magic is there, and is
+    the answer for codecs without one.
     """
+    codec = CODECS.get(compression)
+    if codec is None:
+        return None
+    if codec.magic is None:
+        return expected
+
     start = f.tell()
     data = f.read(max_scan)
     if not data:
         return None
 
-    if compression == "lzma":
-        i = data.find(b"\x5d")
-    elif compression == "bzip2":
-        i = data.find(b"BZh")
-    elif compression == "zlib":
-        i = data.find(b"\x78")
-    else:
-        return None
+    if expected is not None and 0 <= expected - start < len(data):
+        if codec.magic.match(data, expected - start):
+            return expected
 
-    if i == -1:
+    m = codec.magic.search(data)
+    if m is None:
         return None
-    return start + i
+    return start + m.start()
+
+
+def decompress_payload(comp: str, payload, stats: Optional[CodecStats] = None) -> bytes:
+    """Decompress a bytes-like payload (bytes or a memoryview slice of the map)."""
+    if comp not in CODECS:
+        return payload
+    return b"".join(iter_decompress(comp, (payload,), stats=stats))
+
+
+class ShortReadError(EOFError):
+    """The archive ended before a member's compressed payload did."""
+
 
+def iter_payload(f, offset: int, csize: int, chunk_size: int = READ_BLOCK_SIZE) -> Iterable[Any]:
+    """Yield the csize payload bytes at offset in chunks of at most chunk_size."""
+    f.seek(offset, 0)
+    remaining = csize
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            raise ShortReadError(f"wanted {csize}, got {csize - remaining}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def new_decompressor(comp: str):
+    """Incremental decompressor for comp, or None for stored/unknown data."""
+    codec = CODECS.get(comp)
+    return codec.new_decompressor() if codec is not None else None
+
+
+def iter_decompress(comp: str, chunks: Iterable[Any], chunk_size: int = READ_BLOCK_SIZE,
+                    stats: Optional[CodecStats] = None) -> Iterable[bytes]:
+    """
+    Stream-decompress compressed chunks, yielding pieces of at most chunk_size
+    bytes, so memory per member stays bounded however large it is. stats, if
+    given, is charged the bytes in/out and the time spent inside the codec.
+    """
+    d = new_decompressor(comp)
+    if d is None:
+        for chunk in chunks:
+            yield bytes(chunk)
+        return
+
+    stats = stats if stats is not None else CodecStats()
+    stats.members += 1
+    clock = time.perf_counter
+    zlib_api = hasattr(d, "unconsumed_tail")
+    for chunk in chunks:
+        stats.bytes_in += len(chunk)
+        if zlib_api:
+            data = chunk
+            while data:
+                t0 = clock()
+                out = d.decompress(data, chunk_size)
+                data = d.unconsumed_tail
+                stats.seconds += clock() - t0
+                if out:
+                    stats.bytes_out += len(out)
+                    yield out
+        else:
+            t0 = clock()
+            out = d.decompress(chunk, chunk_size)
+            stats.seconds += clock() - t0
+            if out:
+                stats.bytes_out += len(out)
+                yield out
+            while not d.eof and not d.needs_input:
+                t0 = clock()
+                out = d.decompress(b"", chunk_size)
+                stats.seconds += clock() - t0
+                if out:
+                    stats.bytes_out += len(out)
+                    yield out
+        if d.eof:
+            break
 
-def decompress_payload(comp: str, payload: bytes) -> bytes:
-    if comp == "lzma":
-        return lzma.decompress(payload)
-    if comp == "bzip2":
-        return bz2.decompress(payload)
-    if comp == "zlib":
-        return zlib.decompress(payload)
-    return payload
+    if zlib_api:
+        t0 = clock()
+        out = d.flush()
+        stats.seconds += clock() - t0
+        if out:
+            stats.bytes_out += len(out)
+            yield out
+    if not d.eof:
+        raise EOFError("Compressed data ended before the end-of-stream marker was reached")
 
 
 @dataclass
@@ -422,14 +1006,42 @@ class Record:
     comp: str
     csize: int
     header_pos: int
+    # trailing header fields: header/content checksum types, then the checksums
+    hchecksum_type: str = ""
+    cchecksum_type: str = ""
+    hchecksum: str = ""
+    cchecksum: str = ""
+    # metadata (used by export)
+    linkname: str = ""
+    mtime_ns: int = 0
+    mode: int = 0
+    uid: int = 0
+    uname: str = ""
+    gid: int = 0
+    gname: str = ""
+    jsonsize: int = 0   # JSON block between the header and the payload
+
+
+@dataclass(frozen=True)
+class MemberLocation:
+    """Where a member's payload lives; enough to extract it without re-scanning."""
+    name: str
+    comp: str
+    offset: int   # payload start
+    csize: int
+    usize: int
+    cchecksum_type: str = ""
+    cchecksum: str = ""
 
 
-def iter_records(f, read_token, fmt: FormatSpec) -> Iterable[Record]:
+def iter_records(f, read_token, fmt: FormatSpec, start: int = 0) -> Iterable[Record]:
     """
     Tokenized ArchiveFile-style iterator (resilient).
     Assumes:
       signature token first (e.g. 'ArchiveFile1') then global header then records.
     Field indices are configurable in FormatSpec, default matches data.py.
+    start, if past the global header, is where the record scan begins
+    (e.g. the end of the last payload a resumed extraction finished).
     """
     sig = read_token(f)
     # allow prefix match (data.py style)
@@ -444,6 +1056,9 @@ def iter_records(f, read_token, fmt: FormatSpec) -> Iterable[Record]:
         _ = [read_token(f) for _ in range(global_count)]
     # If not hex, continue anyway—some variants exist.
 
+    if start > f.tell():
+        f.seek(start, 0)
+
     rec = 0
     while True:
         if not scan_to_next_header(f):
@@ -460,38 +1075,405 @@ def iter_records(f, read_token, fmt: FormatSpec) -> Iterable[Record]:
 
         field_count = int(field_count_hex, 16)
         fields = [read_token(f) for _ in range(field_count)]
+        r = record_from_fields(fields, fmt, header_pos)
 
-        def _get(idx: int) -> str:
-            return fields[idx] if 0 <= idx < len(fields) else ""
+        if rec < 4:
+            print(f"RECORD {rec} @ {header_pos}: hlen={header_len_hex} fcount={field_count_hex} type={r.ftype} name={r.name}")
+        rec += 1
 
-        ftype = _get(fmt.idx_type)
-        fname = _get(fmt.idx_name)
-        fsize_hex = _get(fmt.idx_usize) or "0"
-        comp = _get(fmt.idx_comp)
-        csize_hex = _get(fmt.idx_csize) or "0"
+        yield r
+
+
+def record_from_fields(fields: List[str], fmt: FormatSpec, header_pos: int) -> Record:
+    """Build a Record from a header's fields (the tokens after hlen and fcount)."""
+    def _get(idx: int) -> str:
+        return fields[idx] if 0 <= idx < len(fields) else ""
+
+    def _get_int(idx: int) -> int:
+        value = _get(idx)
+        return int(value, 16) if is_hex_str(value) else 0
+
+    checksums = fields[-4:] if len(fields) >= 4 else ["", "", "", ""]
+
+    return Record(ftype=_get(fmt.idx_type), name=_get(fmt.idx_name), usize=_get_int(fmt.idx_usize),
+                  comp=_get(fmt.idx_comp), csize=_get_int(fmt.idx_csize), header_pos=header_pos,
+                  hchecksum_type=checksums[0], cchecksum_type=checksums[1],
+                  hchecksum=checksums[2], cchecksum=checksums[3],
+                  linkname=_get(fmt.idx_linkname), mtime_ns=_get_int(fmt.idx_mtime), mode=_get_int(fmt.idx_mode),
+                  uid=_get_int(fmt.idx_uid), uname=_get(fmt.idx_uname),
+                  gid=_get_int(fmt.idx_gid), gname=_get(fmt.idx_gname), jsonsize=_get_int(fmt.idx_jsonsize))
+
+
+def is_extractable(r: Record) -> bool:
+    """Only files with known compression and positive compressed size are extracted."""
+    return r.ftype == "0" and bool(r.name) and r.csize > 0 and r.comp in CODECS
+
+
+def locate_payload(f, r: Record, delim_len: int = 1) -> Optional[MemberLocation]:
+    """Find the payload of the record just parsed; leaves f positioned after it."""
+    payload_start = find_content_start(f, r.comp, expected=f.tell() + r.jsonsize + delim_len)
+    if payload_start is None:
+        print(f"Could not locate content start for {r.name} ({r.comp}) after offset {f.tell()}")
+        return None
+    # jump to end of payload for next scan
+    f.seek(payload_start + r.csize, 0)
+    return MemberLocation(name=r.name, comp=r.comp, offset=payload_start, csize=r.csize, usize=r.usize,
+                          cchecksum_type=r.cchecksum_type, cchecksum=r.cchecksum)
+
+
+def iter_members(f, read_token, fmt: FormatSpec, start: int = 0) -> Iterable[Tuple[Record, Optional[MemberLocation]]]:
+    """
+    iter_records() plus payload location: extractable records are paired with
+    their MemberLocation and f is moved past the payload before the next scan.
+    """
+    for r in iter_records(f, read_token, fmt, start):
+        loc = locate_payload(f, r, len(fmt.delimiter)) if is_extractable(r) else None
+        yield r, loc
+
+
+def locate_members(f, read_token, fmt: FormatSpec, start: int = 0) -> List[MemberLocation]:
+    """First extraction phase: one header-only pass recording every extractable payload."""
+    return [loc for _, loc in iter_members(f, read_token, fmt, start) if loc is not None]
+
+
+# ----------------------------
+# Sidecar index (.arcidx)
+# ----------------------------
+
+INDEX_SUFFIX = ".arcidx"
+INDEX_MAGIC = b"ARCIDX1\x00"
+INDEX_HEADER = struct.Struct("<QqI")     # archive size, archive mtime (ns), entry count
+INDEX_ENTRY = struct.Struct("<qqQQ")     # header_pos, payload offset (-1 = none), csize, usize
+INDEX_STR = struct.Struct("<H")
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    name: str
+    ftype: str
+    comp: str
+    header_pos: int
+    offset: int
+    csize: int
+    usize: int
+    hchecksum_type: str = ""
+    hchecksum: str = ""
+    cchecksum_type: str = ""
+    cchecksum: str = ""
+
+    def location(self) -> Optional[MemberLocation]:
+        if self.offset < 0:
+            return None
+        return MemberLocation(name=self.name, comp=self.comp, offset=self.offset, csize=self.csize, usize=self.usize,
+                              cchecksum_type=self.cchecksum_type, cchecksum=self.cchecksum)
+
+
+def index_path_for(arc_path: str) -> str:
+    return arc_path + INDEX_SUFFIX
+
+
+def member_key(name: str) -> str:
+    """Normalize archive member names so './a/b', '/a/b' and 'a/b' look up alike."""
+    name = name.replace("\\", "/")
+    while name.startswith("./") or name.startswith("/"):
+        name = name[1:] if name.startswith("/") else name[2:]
+    return name
+
+
+def last_per_path(members: List[MemberLocation]) -> List[MemberLocation]:
+    """Members in archive order, minus any whose path is written again by a later member."""
+    last = {member_key(loc.name): i for i, loc in enumerate(members)}
+    return [loc for i, loc in enumerate(members) if last[member_key(loc.name)] == i]
+
+
+def _archive_stamp(arc_path: str) -> Tuple[int, int]:
+    st = os.stat(arc_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return INDEX_STR.pack(len(raw)) + raw
+
+
+def _unpack_str(buf: bytes, pos: int) -> Tuple[str, int]:
+    (n,) = INDEX_STR.unpack_from(buf, pos)
+    pos += INDEX_STR.size
+    return buf[pos:pos + n].decode("utf-8"), pos + n
+
+
+class ArchiveIndex:
+    """Loaded .arcidx: entries sorted by member_key(name), then archive order, for bisect lookups."""
+
+    def __init__(self, entries: List[IndexEntry]):
+        self.entries = sorted(entries, key=lambda e: (member_key(e.name), e.header_pos))
+        self._keys = [member_key(e.name) for e in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, name: str) -> Optional[IndexEntry]:
+        """The entry for name; of several, the last in the archive, which is the one extraction leaves."""
+        key = member_key(name)
+        i = bisect.bisect_right(self._keys, key) - 1
+        if i >= 0 and self._keys[i] == key:
+            return self.entries[i]
+        return None
+
+    def in_archive_order(self) -> List[IndexEntry]:
+        return sorted(self.entries, key=lambda e: e.header_pos)
+
+
+def write_index(arc_path: str, entries: List[IndexEntry], index_path: Optional[str] = None) -> str:
+    """Write entries (any order) as a sidecar index stamped with the archive's size and mtime."""
+    index_path = index_path or index_path_for(arc_path)
+    size, mtime_ns = _archive_stamp(arc_path)
+    idx = ArchiveIndex(entries)
+
+    parts = [INDEX_MAGIC, INDEX_HEADER.pack(size, mtime_ns, len(idx))]
+    for e in idx.entries:
+        parts.append(INDEX_ENTRY.pack(e.header_pos, e.offset, e.csize, e.usize))
+        for value in (e.name, e.ftype, e.comp, e.hchecksum_type, e.hchecksum, e.cchecksum_type, e.cchecksum):
+            parts.append(_pack_str(value))
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as w:
+        w.write(b"".join(parts))
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def load_index(arc_path: str, index_path: Optional[str] = None) -> Optional[ArchiveIndex]:
+    """Return the sidecar index, or None if missing, unreadable or stale (size/mtime changed)."""
+    index_path = index_path or index_path_for(arc_path)
+    try:
+        with open(index_path, "rb") as fh:
+            buf = fh.read()
+        if not buf.startswith(INDEX_MAGIC):
+            return None
+        pos = len(INDEX_MAGIC)
+        size, mtime_ns, count = INDEX_HEADER.unpack_from(buf, pos)
+        if (size, mtime_ns) != _archive_stamp(arc_path):
+            return None
+        pos += INDEX_HEADER.size
+
+        entries: List[IndexEntry] = []
+        for _ in range(count):
+            header_pos, offset, csize, usize = INDEX_ENTRY.unpack_from(buf, pos)
+            pos += INDEX_ENTRY.size
+            strs = []
+            for _ in range(7):
+                value, pos = _unpack_str(buf, pos)
+                strs.append(value)
+            name, ftype, comp, hct, hck, cct, cck = strs
+            entries.append(IndexEntry(name=name, ftype=ftype, comp=comp, header_pos=header_pos, offset=offset,
+                                      csize=csize, usize=usize, hchecksum_type=hct, hchecksum=hck,
+                                      cchecksum_type=cct, cchecksum=cck))
+    except (OSError, struct.error, UnicodeDecodeError):
+        return None
+    return ArchiveIndex(entries)
+
+
+def scan_index_entries(f, read_token, fmt: FormatSpec) -> List[IndexEntry]:
+    entries: List[IndexEntry] = []
+    for r, loc in iter_members(f, read_token, fmt):
+        entries.append(IndexEntry(
+            name=r.name, ftype=r.ftype, comp=r.comp, header_pos=r.header_pos,
+            offset=loc.offset if loc is not None else -1, csize=r.csize, usize=r.usize,
+            hchecksum_type=r.hchecksum_type, hchecksum=r.hchecksum,
+            cchecksum_type=r.cchecksum_type, cchecksum=r.cchecksum,
+        ))
+    return entries
+
+
+# ----------------------------
+# Resume journal
+# ----------------------------
+
+JOURNAL_NAME = ".arcextract-journal"
+JOURNAL_VERSION = 1
+JOURNAL_DIGEST = "md5"            # digest of the extracted (output) bytes
+JOURNAL_SYNC_EVERY = 64           # fsync after this many records...
+JOURNAL_SYNC_SECONDS = 1.0        # ...or this long since the last fsync
+RESUME_CHECK_TAIL = 8             # newest entries always re-hashed on resume
+RESUME_CHECK_SAMPLE = 8           # plus this many random older ones
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    name: str
+    offset: int      # payload offset in the archive
+    csize: int
+    usize: int       # bytes written to disk
+    digest: str
+    ok: bool = True  # False: extraction failed, retry on resume
 
-        try:
-            usize = int(fsize_hex, 16) if is_hex_str(fsize_hex) else 0
-        except Exception:
-            usize = 0
 
+def journal_path_for(out_dir: str) -> str:
+    return os.path.join(out_dir, JOURNAL_NAME)
+
+
+def load_journal(arc_path: str, out_dir: str) -> List[JournalEntry]:
+    """
+    Completed members recorded by a previous --resume run, in archive order.
+    Returns [] if there is no journal or it belongs to a different archive;
+    a torn last line (crash mid-write) is ignored.
+    """
+    path = journal_path_for(out_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as jf:
+            lines = jf.read().split("\n")
+    except OSError:
+        return []
+
+    try:
+        head = json.loads(lines[0])
+    except ValueError:
+        return []
+    size, mtime_ns = _archive_stamp(arc_path)
+    if (head.get("version") != JOURNAL_VERSION or head.get("size") != size
+            or head.get("mtime_ns") != mtime_ns or head.get("digest") != JOURNAL_DIGEST):
+        print(f"Ignoring journal {path}: written for a different archive")
+        return []
+
+    entries: List[JournalEntry] = []
+    for line in lines[1:]:
+        if not line:
+            continue
         try:
-            csize = int(csize_hex, 16) if is_hex_str(csize_hex) else 0
-        except Exception:
-            csize = 0
+            entries.append(JournalEntry(**json.loads(line)))
+        except (ValueError, TypeError):
+            break
+    return entries
 
-        if rec < 4:
-            print(f"RECORD {rec} @ {header_pos}: hlen={header_len_hex} fcount={field_count_hex} type={ftype} name={fname}")
-        rec += 1
 
-        yield Record(ftype=ftype, name=fname, usize=usize, comp=comp, csize=csize, header_pos=header_pos)
+def _journal_entry_ok(e: JournalEntry, out_dir: str) -> bool:
+    path = safe_join(out_dir, e.name)
+    try:
+        if os.path.getsize(path) != e.usize:
+            return False
+        with open(path, "rb") as fin:
+            return checksums_equal(file_checksum(fin, JOURNAL_DIGEST), e.digest)
+    except OSError:
+        return False
+
+
+def validate_journal(entries: List[JournalEntry], out_dir: str) -> Tuple[List[JournalEntry], int]:
+    """
+    Re-hash the newest entries plus a random sample of older ones. The kept
+    prefix ends before the first bad entry; if a bad one turns up outside the
+    tail, every entry is checked. Returns (kept entries, entries checked).
+    """
+    n = len(entries)
+    tail_start = max(0, n - RESUME_CHECK_TAIL)
+    check = set(range(tail_start, n))
+    check.update(random.sample(range(tail_start), min(RESUME_CHECK_SAMPLE, tail_start)))
+
+    def _bad(i: int) -> bool:
+        return entries[i].ok and not _journal_entry_ok(entries[i], out_dir)
+
+    bad = [i for i in sorted(check) if _bad(i)]
+    if bad and bad[0] < tail_start:
+        check = set(range(n))
+        bad = [i for i in range(n) if _bad(i)]
+    cut = bad[0] if bad else n
+    return entries[:cut], len(check)
+
+
+def resume_start(entries: List[JournalEntry]) -> int:
+    """
+    Archive offset a resumed scan can seek to: the end of the last payload in
+    the leading run of successful, in-order entries (0 if there is none).
+    """
+    end = 0
+    for e in entries:
+        if not e.ok or e.offset < end:
+            break
+        end = e.offset + e.csize
+    return end
+
+
+class ExtractJournal:
+    """
+    Append-only list of extracted members (JSON lines after a header naming
+    the archive). Records are flushed immediately but fsynced in batches, so
+    a crash loses at most the last batch, which is simply extracted again.
+    """
+
+    def __init__(self, arc_path: str, out_dir: str, kept: List[JournalEntry],
+                 sync_every: int = JOURNAL_SYNC_EVERY, sync_seconds: float = JOURNAL_SYNC_SECONDS):
+        self.path = journal_path_for(out_dir)
+        self.out_dir = out_dir
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        size, mtime_ns = _archive_stamp(arc_path)
+        head = {"version": JOURNAL_VERSION, "archive": os.path.basename(arc_path), "size": size,
+                "mtime_ns": mtime_ns, "digest": JOURNAL_DIGEST}
+
+        # Rewrite header + kept prefix atomically, then append from there.
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as jf:
+            jf.write(json.dumps(head) + "\n")
+            for e in kept:
+                jf.write(json.dumps(e.__dict__) + "\n")
+            jf.flush()
+            os.fsync(jf.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, loc: MemberLocation, digest: str, ok: bool = True) -> None:
+        usize = os.path.getsize(safe_join(self.out_dir, loc.name)) if ok else 0
+        entry = JournalEntry(name=loc.name, offset=loc.offset, csize=loc.csize, usize=usize,
+                             digest=digest if ok else "", ok=ok)
+        self._fh.write(json.dumps(entry.__dict__) + "\n")
+        self._fh.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_seconds:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._unsynced:
+            os.fsync(self._fh.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self.sync()
+            self._fh.close()
+            self._fh = None
 
 
 # ----------------------------
 # High-level operations
 # ----------------------------
 
-def list_archive(arc_path: str, fmt_path: str) -> int:
+def _print_list_line(ftype: str, name: str, usize: int, comp: str, csize: int) -> None:
+    kind = "DIR " if ftype != "0" else "FILE"
+    print(f"{kind} {name}  usize={usize}  comp={comp}  csize={csize}")
+
+
+def list_archive(arc_path: str, fmt_path: str, use_mmap: bool = False, use_index: bool = True) -> int:
+    index = load_index(arc_path) if use_index else None
+    if index is not None:
+        print(f"Using index: {index_path_for(arc_path)} ({len(index)} records)")
+        listed = 0
+        for e in index.in_archive_order():
+            if e.name:
+                listed += 1
+            _print_list_line(e.ftype, e.name, e.usize, e.comp, e.csize)
+        print(f"Done. Listed {listed} records.")
+        return 0
+
     default_key, registry = load_formats(fmt_path)
     fmt = detect_format(arc_path, registry, default_key)
 
@@ -500,73 +1482,1743 @@ def list_archive(arc_path: str, fmt_path: str) -> int:
     read_token = make_token_reader(fmt.delimiter)
 
     listed = 0
-    with open(arc_path, "rb") as f:
-        for r in iter_records(f, read_token, fmt):
+    with open_archive(arc_path, use_mmap) as f:
+        # iter_members skips located payloads so compressed data is not scanned as headers
+        for r, _ in iter_members(f, read_token, fmt):
             if r.name:
                 listed += 1
-            kind = "DIR " if r.ftype != "0" else "FILE"
-            print(f"{kind} {r.name}  usize={r.usize}  comp={r.comp}  csize={r.csize}")
+            _print_list_line(r.ftype, r.name, r.usize, r.comp, r.csize)
 
     print(f"Done. Listed {listed} records.")
     return 0
 
 
-def extract_archive(arc_path: str, fmt_path: str, out_dir: str, verify_sizes: bool = True) -> int:
+def build_index(arc_path: str, fmt_path: str, use_mmap: bool = False) -> int:
+    """Scan the archive once and write its .arcidx sidecar."""
     default_key, registry = load_formats(fmt_path)
     fmt = detect_format(arc_path, registry, default_key)
 
     print(f"Detected format: {fmt.key} (magic='{fmt.magic_str}', delimiter={fmt.delimiter!r})")
 
-    out_dir = os.path.abspath(out_dir)
-    os.makedirs(out_dir, exist_ok=True)
-
     read_token = make_token_reader(fmt.delimiter)
+    with open_archive(arc_path, use_mmap) as f:
+        entries = scan_index_entries(f, read_token, fmt)
 
-    extracted = 0
-    with open(arc_path, "rb") as f:
-        for r in iter_records(f, read_token, fmt):
-            # extract only files with known compression and positive compressed size
-            if r.ftype != "0":
-                continue
-            if not r.name or r.csize <= 0 or r.comp not in ("lzma", "bzip2", "zlib"):
-                continue
+    index_path = write_index(arc_path, entries)
+    print(f"Wrote index {index_path} ({len(entries)} records)")
+    return 0
 
-            payload_start = find_content_start(f, r.comp)
-            if payload_start is None:
-                print(f"Could not locate content start for {r.name} ({r.comp}) after offset {f.tell()}")
-                continue
 
-            f.seek(payload_start, 0)
-            payload = f.read(r.csize)
-            if len(payload) != r.csize:
-                print(f"Short read for {r.name}: wanted {r.csize}, got {len(payload)}")
-                break
+@dataclass
+class VerifyStats:
+    """
+    Content-checksum work done while extracting (hashing time only), plus the
+    per-codec decompression work in codecs.
+    """
+    members: int = 0
+    hashed_bytes: int = 0
+    seconds: float = 0.0
+    codecs: Dict[str, CodecStats] = field(default_factory=dict)
+
+    def codec(self, name: str) -> CodecStats:
+        return self.codecs.setdefault(name, CodecStats())
+
+    def add(self, other: "VerifyStats") -> None:
+        self.members += other.members
+        self.hashed_bytes += other.hashed_bytes
+        self.seconds += other.seconds
+        for name, c in other.codecs.items():
+            self.codec(name).add(c)
+
+    def summary(self) -> str:
+        mb = self.hashed_bytes / (1024 * 1024)
+        rate = f"{mb / self.seconds:.1f} MB/s" if self.seconds > 0 else "n/a"
+        return f"Verified {self.members} members: {mb:.2f} MB hashed in {self.seconds:.3f}s ({rate})"
+
+
+def _hash_chunks(chunks: Iterable[Any], hasher, stats: VerifyStats) -> Iterable[Any]:
+    """Pass chunks through unchanged, feeding each to hasher on the way."""
+    for chunk in chunks:
+        t0 = time.perf_counter()
+        hasher.update(chunk)
+        stats.seconds += time.perf_counter() - t0
+        stats.hashed_bytes += len(chunk)
+        yield chunk
+
 
+# Write-behind defaults for single-process extraction (see WriteBehind).
+WRITE_BEHIND_THREADS = 2
+WRITE_BEHIND_MAX_BYTES = 64 * 1024 * 1024     # decoded bytes queued for writing
+WRITE_BEHIND_MAX_MEMBER = 8 * 1024 * 1024     # larger members are written as they decode
+# Small members are handed over in batches: one thread wake-up per batch keeps
+# the writers from fighting the decompressing thread for the GIL per file.
+WRITE_BEHIND_BATCH_BYTES = 1024 * 1024
+WRITE_BEHIND_BATCH_FILES = 64
+
+
+class _WriteBatch:
+    __slots__ = ("items", "size", "future")
+
+    def __init__(self):
+        self.items: List[Tuple[str, List[bytes]]] = []
+        self.size = 0
+        self.future = None
+
+
+class WriteBehind:
+    """
+    Write-behind stage for single-process extraction: decoded members are
+    queued as buffer lists and written by a small thread pool, so disk writes
+    overlap decompression of the following members. Members are handed to
+    the pool in batches, queued bytes are bounded by max_bytes (submit()
+    blocks until there is room), directories already created are cached,
+    and completions are reported in submission order from the caller's
+    thread, so printing, journaling and dedup stay sequential. A callback
+    never runs inside the submit()/done() that queued it, only from a later
+    call or close(). Files are written to a temp name and renamed.
+    """
+
+    def __init__(self, threads: int = WRITE_BEHIND_THREADS, max_bytes: int = WRITE_BEHIND_MAX_BYTES,
+                 max_member: int = WRITE_BEHIND_MAX_MEMBER, batch_bytes: int = WRITE_BEHIND_BATCH_BYTES,
+                 batch_files: int = WRITE_BEHIND_BATCH_FILES):
+        self.max_bytes = max_bytes
+        self.max_member = max_member
+        self.batch_bytes = batch_bytes
+        self.batch_files = batch_files
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="write-behind")
+        self._cond = threading.Condition()
+        self._queued = 0                        # bytes handed to the pool and not yet written
+        self._batch = _WriteBatch()
+        self._order: deque = deque()            # (batch or None, path, callback) in submission order
+        self._pending: Dict[str, _WriteBatch] = {}   # path -> batch holding its latest write
+        self._dirs: set = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def makedirs(self, path: str) -> None:
+        if path not in self._dirs:
+            os.makedirs(path, exist_ok=True)
+            self._dirs.add(path)
+
+    def settle(self, path: str) -> None:
+        """Wait for a queued write to path, before anything else touches it."""
+        batch = self._pending.get(path)
+        if batch is not None:
+            if batch.future is None:
+                self._flush()
+            wait([batch.future])
+
+    def submit(self, path: str, pieces: List[bytes], size: int,
+               callback: Callable[[Optional[BaseException]], None]) -> None:
+        """Queue pieces to be written as path; callback(error or None) runs once it is on disk."""
+        self.settle(path)
+        self.poll()
+        batch = self._batch
+        batch.items.append((path, pieces))
+        batch.size += size
+        self._pending[path] = batch
+        self._order.append((batch, path, callback))
+        if batch.size >= self.batch_bytes or len(batch.items) >= self.batch_files:
+            self._flush()
+
+    def done(self, callback: Callable[[Optional[BaseException]], None]) -> None:
+        """Report a member finished without the pool, in order behind the queued writes."""
+        self.poll()
+        self._order.append((None, None, callback))
+
+    def _flush(self) -> None:
+        batch = self._batch
+        if not batch.items:
+            return
+        with self._cond:
+            while self._queued and self._queued + batch.size > self.max_bytes:
+                self._cond.wait()
+            self._queued += batch.size
+        self._batch = _WriteBatch()
+        batch.future = self._pool.submit(self._write, batch)
+
+    def _write(self, batch: _WriteBatch) -> Dict[str, BaseException]:
+        errors: Dict[str, BaseException] = {}
+        try:
+            for path, pieces in batch.items:
+                tmp = f"{path}.part-{threading.get_ident()}"
+                try:
+                    with open(tmp, "wb") as w:
+                        for piece in pieces:
+                            w.write(piece)
+                    os.replace(tmp, path)
+                except Exception as e:
+                    errors[path] = e
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp)
+        finally:
+            with self._cond:
+                self._queued -= batch.size
+                self._cond.notify_all()
+        return errors
+
+    def poll(self, block: bool = False) -> None:
+        """Run callbacks of finished writes, oldest first (all of them if block)."""
+        while self._step(block):
+            pass
+
+    def drain(self, path: str) -> None:
+        """Wait until the queued write to path has been reported (with everything queued before it)."""
+        batch = self._pending.get(path)
+        while batch is not None and self._pending.get(path) is batch and self._step(True):
+            pass
+
+    def _step(self, block: bool) -> bool:
+        if not self._order:
+            return False
+        batch, path, callback = self._order[0]
+        err = None
+        if batch is not None:
+            if batch.future is None:
+                if not block:
+                    return False
+                self._flush()
+            if not block and not batch.future.done():
+                return False
             try:
-                data = decompress_payload(r.comp, payload)
-            except Exception as e:
-                print(f"Decompress failed for {r.name} ({r.comp}): {e}")
-                f.seek(payload_start + r.csize, 0)
+                err = batch.future.result().get(path)
+            except Exception as e:   # the batch as a whole failed
+                err = e
+            if self._pending.get(path) is batch:
+                del self._pending[path]
+        self._order.popleft()
+        callback(err)
+        return True
+
+    def close(self) -> None:
+        self._flush()
+        self.poll(block=True)
+        self._pool.shutdown()
+
+
+def extract_member(f, loc: MemberLocation, out_dir: str, verify_sizes: bool = True,
+                   verify: bool = False, stats: Optional[VerifyStats] = None,
+                   out_hasher=None, writer: Optional[WriteBehind] = None,
+                   on_written: Optional[Callable[[Optional[BaseException]], None]] = None) -> Tuple[bool, str]:
+    """
+    Stream one located payload from reader f into out_dir. Returns (ok, message).
+    With verify, the stored content checksum (taken over the compressed bytes)
+    is computed inside the same read/decompress/write loop. out_hasher, if
+    given, is fed the decompressed bytes as they are written. With writer, a
+    successful member is handed to it and on_written(error) runs once the
+    bytes are on disk; members over writer.max_member are written here.
+    """
+    out_path = safe_join(out_dir, loc.name)
+    if writer is not None:
+        writer.makedirs(os.path.dirname(out_path))
+        writer.settle(out_path)
+    else:
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    hasher = None
+    if verify and loc.cchecksum_type and loc.cchecksum_type.lower() != "none":
+        hasher = new_checksum_hasher(loc.cchecksum_type)
+        if hasher is None:
+            return False, f"Unsupported checksum {loc.cchecksum_type!r} for {loc.name}"
+
+    stats = stats if stats is not None else VerifyStats()
+    chunks = iter_payload(f, loc.offset, loc.csize)
+    if hasher is not None:
+        chunks = _hash_chunks(chunks, hasher, stats)
+
+    written = 0
+    buffered: Optional[List[bytes]] = [] if writer is not None else None
+    w = None
+    try:
+        if buffered is None:
+            w = _open_output(out_path)
+        for piece in iter_decompress(loc.comp, chunks, stats=stats.codec(loc.comp)):
+            if buffered is not None:
+                buffered.append(piece)
+                if written + len(piece) > writer.max_member:
+                    # Too big to hold in the queue: write it out as it decodes.
+                    w = _open_output(out_path)
+                    for p in buffered:
+                        w.write(p)
+                    buffered = None
+            else:
+                w.write(piece)
+            written += len(piece)
+            if out_hasher is not None:
+                out_hasher.update(piece)
+        if hasher is not None:
+            for _ in chunks:
+                pass  # hash any bytes after the end-of-stream marker too
+    except ShortReadError as e:
+        _discard_output(w, out_path)
+        return False, f"Short read for {loc.name}: {e}"
+    except Exception as e:
+        _discard_output(w, out_path)
+        return False, f"Decompress failed for {loc.name} ({loc.comp}): {e}"
+    if w is not None:
+        w.close()
+
+    if hasher is not None:
+        stats.members += 1
+        digest = hasher.hexdigest().lower()
+        if not checksums_equal(digest, loc.cchecksum):
+            _discard_output(None, out_path)
+            return False, (f"CHECKSUM MISMATCH for {loc.name} ({loc.cchecksum_type}): "
+                           f"got {digest}, expected {loc.cchecksum}")
+
+    if verify_sizes and loc.usize and written != loc.usize:
+        status = f"SIZE MISMATCH (got {written}, expected {loc.usize})"
+    elif hasher is not None:
+        status = "OK (verified)"
+    else:
+        status = "OK"
+
+    if writer is not None:
+        if buffered is not None:
+            writer.submit(out_path, buffered, written, on_written)
+        else:
+            writer.done(on_written)
+    return True, f"Extracted {os.path.relpath(out_path, out_dir)} [{loc.comp}] {status}"
+
+
+def _open_output(out_path: str):
+    try:
+        if os.stat(out_path).st_nlink > 1:
+            os.remove(out_path)   # don't rewrite the other names of a (dedup) hardlink
+    except FileNotFoundError:
+        pass
+    return open(out_path, "wb")
+
+
+def _discard_output(w, out_path: str) -> None:
+    """Drop a failed member's output (as if it had been written and removed)."""
+    if w is not None:
+        w.close()
+    with contextlib.suppress(OSError):
+        os.remove(out_path)
+
+
+# Digest of the extracted bytes used to spot duplicates whose stored checksums differ.
+DEDUP_DIGEST = "sha256"
+DEDUP_MODES = ("hardlink", "reflink")
+FICLONE = 0x40049409   # Linux ioctl: share src's extents with dst (btrfs, XFS, ...)
+
+try:
+    import fcntl
+except ImportError:   # not available on Windows
+    fcntl = None
+
+
+class _HasherTee:
+    """update() fan-out so one write loop can feed several output digests."""
+    __slots__ = ("hashers",)
+
+    def __init__(self, hashers: Iterable[Any]):
+        self.hashers = list(hashers)
+
+    def update(self, data) -> None:
+        for h in self.hashers:
+            h.update(data)
+
+
+def _output_hashers(algos: Iterable[str]) -> Tuple[Dict[str, Any], Any]:
+    """({algo: hasher}, the single object to hand extract_member as out_hasher)."""
+    hashers = {a: new_checksum_hasher(a) for a in algos}
+    if len(hashers) > 1:
+        return hashers, _HasherTee(hashers.values())
+    return hashers, next(iter(hashers.values()), None)
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Copy src to dst sharing its data blocks (copy-on-write); OSError if unsupported."""
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as r, open(dst, "wb") as w:
+        fcntl.ioctl(w.fileno(), FICLONE, r.fileno())
+
+
+class ExtractDedup:
+    """
+    Hardlink-on-extract for archives with many identical members.
+
+    A member is recognised as a repeat before its payload is read when its
+    stored content checksum, compression and sizes match one already written
+    (link_known), and otherwise after it is written by the DEDUP_DIGEST of
+    its output bytes (after_write). Repeats become hardlinks (or reflinks)
+    to the first copy; if the filesystem refuses, the bytes are written/kept.
+    """
+
+    def __init__(self, mode: str = "hardlink"):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode {mode!r} (expected one of {', '.join(DEDUP_MODES)})")
+        self.mode = mode
+        self.by_stored: Dict[tuple, str] = {}
+        self.by_digest: Dict[Tuple[str, int], str] = {}
+        self.expected: Dict[tuple, str] = {}          # stored key -> path still being written
+        self.digests: Dict[str, Dict[str, str]] = {}   # path -> output digests of the copy there
+        self.linked = 0
+        self.saved_bytes = 0        # output bytes not written
+        self.skipped_bytes = 0      # payload bytes never read/decompressed
+        self.failed_links = 0
+
+    @staticmethod
+    def stored_key(loc: MemberLocation) -> Optional[tuple]:
+        ctype = (loc.cchecksum_type or "").lower()
+        digits = loc.cchecksum or ""
+        digits = digits[2:] if digits.lower().startswith("0x") else digits
+        # An empty or all-zero checksum is a placeholder, not a content key.
+        if not ctype or ctype == "none" or not digits or set(digits) == {"0"}:
+            return None
+        return loc.comp, loc.csize, loc.usize, ctype, loc.cchecksum.lower()
+
+    def split(self, members: List[MemberLocation]) -> Tuple[List[MemberLocation], List[MemberLocation]]:
+        """
+        (originals, duplicates) for a located member list: duplicates repeat an
+        earlier original's stored key and can be linked once the originals are
+        extracted. Members whose output path is written again later in the
+        list are never linked to, nor deferred, so the last copy still wins.
+        """
+        last = {}
+        for i, loc in enumerate(members):
+            last[member_key(loc.name)] = i
+        originals: List[MemberLocation] = []
+        dups: List[MemberLocation] = []
+        seen = set()
+        for i, loc in enumerate(members):
+            key = self.stored_key(loc)
+            is_last = last[member_key(loc.name)] == i
+            if key is not None and is_last and key in seen:
+                dups.append(loc)
                 continue
+            if key is not None and is_last:
+                seen.add(key)
+            originals.append(loc)
+        return originals, dups
+
+    def _forget(self, path: str) -> None:
+        """Drop path as a link source; its content is about to change."""
+        if self.digests.pop(path, None) is not None:
+            for table in (self.by_stored, self.by_digest):
+                for k in [k for k, v in table.items() if v == path]:
+                    del table[k]
+
+    def _link(self, src: str, dst: str, copy: bool = False) -> bool:
+        """Link dst to src (atomically replacing dst); with copy, fall back to copying the bytes."""
+        tmp = f"{dst}.dedup-{os.getpid()}"
+        try:
+            if self.mode == "reflink":
+                _reflink(src, tmp)
+            else:
+                os.link(src, tmp)
+            os.replace(tmp, dst)
+            return True
+        except OSError:
+            self.failed_links += 1
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+        if copy:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)
+        return False
 
-            out_path = safe_join(out_dir, r.name)
+    def expect(self, loc: MemberLocation, out_path: str) -> None:
+        """Note that loc is queued to be written as out_path (see link_known's wait_for)."""
+        key = self.stored_key(loc)
+        if key is not None:
+            self.expected.setdefault(key, out_path)
+
+    def link_known(self, loc: MemberLocation, out_dir: str,
+                   wait_for: Optional[Callable[[str], None]] = None) -> Optional[Tuple[bool, str, Dict[str, str]]]:
+        """
+        Link loc to an earlier member with the same stored key (copying it if
+        links are refused); None if there is no such member and loc must be
+        extracted. wait_for(path), if given, is used to let an expected copy
+        still being written land (and be recorded) first.
+        """
+        key = self.stored_key(loc)
+        if key is None:
+            return None
+        pending = self.expected.pop(key, None)
+        if key not in self.by_stored and pending is not None and wait_for is not None:
+            wait_for(pending)
+        src = self.by_stored.get(key)
+        if src is None:
+            return None
+        out_path = safe_join(out_dir, loc.name)
+        how = self.mode
+        if out_path != src:
             os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            self._forget(out_path)
+            if not self._link(src, out_path, copy=True):
+                how = "copy"
+        if how != "copy":
+            self.linked += 1
+            self.saved_bytes += loc.usize
+        self.skipped_bytes += loc.csize
+        rel = os.path.relpath(out_path, out_dir)
+        return True, f"Linked {rel} -> {os.path.relpath(src, out_dir)} [{how}]", dict(self.digests[src])
+
+    def after_write(self, loc: MemberLocation, out_path: str, digests: Dict[str, str], msg: str) -> str:
+        """Record a freshly written member, replacing it by a link if its bytes were seen before."""
+        self._forget(out_path)
+        digest = digests.get(DEDUP_DIGEST)
+        size = os.path.getsize(out_path)
+        src = self.by_digest.get((digest, size)) if digest else None
+        if src is not None and src != out_path and self._link(src, out_path):
+            self.linked += 1
+            self.saved_bytes += size
+            msg = f"{msg} (deduplicated: {self.mode} to {os.path.basename(src)})"
+            out_path = src
+        else:
+            if digest:
+                self.by_digest.setdefault((digest, size), out_path)
+            self.digests[out_path] = dict(digests)
+        key = self.stored_key(loc)
+        if key is not None and size == loc.usize:
+            self.by_stored.setdefault(key, out_path)
+        return msg
 
-            with open(out_path, "wb") as w:
-                w.write(data)
+    def summary(self) -> str:
+        mb = self.saved_bytes / (1024 * 1024)
+        line = (f"Dedup: {self.linked} members {self.mode}ed, {mb:.2f} MB not written, "
+                f"{self.skipped_bytes / (1024 * 1024):.2f} MB of payload not read")
+        if self.failed_links:
+            line += f" ({self.failed_links} links refused; copied instead)"
+        return line
+
+
+# Per-process archive handle for extraction workers (set by _pool_init).
+_POOL_ARCHIVE = None
+
+
+def _pool_init(arc_path: str, use_mmap: bool) -> None:
+    global _POOL_ARCHIVE
+    _POOL_ARCHIVE = open_archive(arc_path, use_mmap)
+
+
+def _pool_extract(index: int, loc: MemberLocation, out_dir: str, verify_sizes: bool,
+                  verify: bool, digest_algos: Tuple[str, ...] = ()
+                  ) -> Tuple[int, bool, str, VerifyStats, Dict[str, str]]:
+    stats = VerifyStats()
+    hashers, out_hasher = _output_hashers(digest_algos)
+    try:
+        ok, msg = extract_member(_POOL_ARCHIVE, loc, out_dir, verify_sizes, verify, stats, out_hasher)
+    except Exception as e:
+        ok, msg = False, f"Extract failed for {loc.name}: {e}"
+    return index, ok, msg, stats, {a: h.hexdigest().lower() for a, h in hashers.items()}
+
+
+def _extract_parallel(arc_path: str, members: List[MemberLocation], out_dir: str, verify_sizes: bool,
+                      use_mmap: bool, jobs: int, max_inflight_bytes: int,
+                      verify: bool = False, stats: Optional[VerifyStats] = None,
+                      journal: Optional[ExtractJournal] = None,
+                      dedup: Optional[ExtractDedup] = None) -> Tuple[int, int]:
+    """
+    Second extraction phase: decompress/write located members on a process pool.
+    Submission stops while queued members exceed max_inflight_bytes (at least one
+    is always in flight); results are printed (and journaled) in archive order.
+    With verify, the first failure stops further submissions. Returns (ok, failed).
+    """
+    results: Dict[int, Tuple[bool, str, Dict[str, str]]] = {}
+    pending: Dict[Any, int] = {}
+    inflight = 0
+    next_submit = 0
+    next_report = 0
+    extracted = failed = 0
+    abort = False
+    algos = _digest_algos(journal, dedup)
+
+    def _cost(loc: MemberLocation) -> int:
+        return loc.csize + loc.usize
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_pool_init, initargs=(arc_path, use_mmap)) as pool:
+        while pending or (next_submit < len(members) and not abort):
+            while (not abort and next_submit < len(members) and len(pending) < jobs * 2
+                   and (not pending or inflight + _cost(members[next_submit]) <= max_inflight_bytes)):
+                loc = members[next_submit]
+                fut = pool.submit(_pool_extract, next_submit, loc, out_dir, verify_sizes, verify, algos)
+                pending[fut] = next_submit
+                inflight += _cost(loc)
+                next_submit += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                index = pending.pop(fut)
+                inflight -= _cost(members[index])
+                _, ok, msg, member_stats, digests = fut.result()
+                results[index] = (ok, msg, digests)
+                if stats is not None:
+                    stats.add(member_stats)
+
+            while next_report in results:
+                ok, msg, digests = results.pop(next_report)
+                print(_finish_member(members[next_report], ok, msg, digests, out_dir, journal, dedup))
+                if ok:
+                    extracted += 1
+                else:
+                    failed += 1
+                    abort = abort or verify
+                next_report += 1
+
+    return extracted, failed
+
+
+def _digest_algos(journal: Optional[ExtractJournal], dedup: Optional[ExtractDedup]) -> Tuple[str, ...]:
+    """Output digests the journal and/or dedup index need for each extracted member."""
+    algos = []
+    if journal is not None:
+        algos.append(JOURNAL_DIGEST)
+    if dedup is not None and DEDUP_DIGEST not in algos:
+        algos.append(DEDUP_DIGEST)
+    return tuple(algos)
+
+
+def _finish_member(loc: MemberLocation, ok: bool, msg: str, digests: Dict[str, str], out_dir: str,
+                   journal: Optional[ExtractJournal], dedup: Optional[ExtractDedup]) -> str:
+    """Post-write bookkeeping for one member: dedup link/remember, then journal. Returns the message."""
+    if ok and dedup is not None:
+        msg = dedup.after_write(loc, safe_join(out_dir, loc.name), digests, msg)
+    if journal is not None:
+        journal.record(loc, digests.get(JOURNAL_DIGEST, ""), ok)
+    return msg
+
+
+@dataclass
+class ExtractTally:
+    """Results of single-process extraction, printed as each member is reported."""
+    extracted: int = 0
+    failed: int = 0
+
+    def report(self, ok: bool, msg: str) -> None:
+        print(msg)
+        if ok:
+            self.extracted += 1
+        else:
+            self.failed += 1
 
-            if verify_sizes and r.usize and len(data) != r.usize:
-                status = f"SIZE MISMATCH (got {len(data)}, expected {r.usize})"
-            else:
-                status = "OK"
 
-            print(f"Extracted {os.path.relpath(out_path, out_dir)} [{r.comp}] {status}")
+def _extract_one(f, loc: MemberLocation, out_dir: str, verify_sizes: bool, verify: bool,
+                 stats: Optional[VerifyStats], journal: Optional[ExtractJournal],
+                 dedup: Optional[ExtractDedup], writer: Optional[WriteBehind], tally: ExtractTally) -> bool:
+    """
+    extract_member() that also journals the outcome (and links duplicates when
+    deduplicating), then reports it to tally: at once, or with a writer, in
+    archive order once the member is on disk. Returns False if the member
+    failed before reaching the write stage (so a verify run can stop).
+    """
+    def _finish(ok: bool, msg: str, digests: Dict[str, str], member_dedup: Optional[ExtractDedup]) -> None:
+        tally.report(ok, _finish_member(loc, ok, msg, digests, out_dir, journal, member_dedup))
+
+    def _later(ok: bool, msg: str, digests: Dict[str, str], member_dedup: Optional[ExtractDedup]) -> None:
+        if writer is None:
+            _finish(ok, msg, digests, member_dedup)
+        else:
+            writer.done(lambda err: _finish(ok, msg, digests, member_dedup))
+
+    if dedup is not None and not verify:
+        if writer is not None:
+            writer.settle(safe_join(out_dir, loc.name))
+        linked = dedup.link_known(loc, out_dir, writer.drain if writer is not None else None)
+        if linked is not None:
+            _later(*linked, None)
+            return True
+
+    hashers, out_hasher = _output_hashers(_digest_algos(journal, dedup))
+    result = ["", {}]
+
+    def _written(err: Optional[BaseException]) -> None:
+        if err is not None:
+            _finish(False, f"Write failed for {loc.name}: {err}", {}, None)
+        else:
+            _finish(True, result[0], result[1], dedup)
+
+    ok, msg = extract_member(f, loc, out_dir, verify_sizes, verify, stats, out_hasher, writer, _written)
+    digests = {a: h.hexdigest().lower() for a, h in hashers.items()}
+    if writer is not None and ok:
+        result[:] = [msg, digests]   # _written runs from a later poll(), never inside extract_member
+        if dedup is not None:
+            dedup.expect(loc, safe_join(out_dir, loc.name))
+    else:
+        _later(ok, msg, digests, dedup)
+    return ok
+
+
+def _extract_serial(arc_path: str, members: List[MemberLocation], out_dir: str, verify_sizes: bool,
+                    use_mmap: bool, verify: bool = False, stats: Optional[VerifyStats] = None,
+                    journal: Optional[ExtractJournal] = None, dedup: Optional[ExtractDedup] = None,
+                    write_threads: int = WRITE_BEHIND_THREADS) -> Tuple[int, int]:
+    tally = ExtractTally()
+    writer = WriteBehind(write_threads) if write_threads > 0 else None
+    try:
+        with open_archive(arc_path, use_mmap) as f:
+            for loc in members:
+                if not _extract_one(f, loc, out_dir, verify_sizes, verify, stats, journal, dedup, writer, tally):
+                    if verify:
+                        break
+    finally:
+        if writer is not None:
+            writer.close()
+    return tally.extracted, tally.failed
+
+
+def _link_duplicates(dups: List[MemberLocation], out_dir: str, journal: Optional[ExtractJournal],
+                     dedup: ExtractDedup) -> Tuple[int, int]:
+    """Materialize members held back by ExtractDedup.split() once their originals are on disk."""
+    extracted = failed = 0
+    for loc in dups:
+        linked = dedup.link_known(loc, out_dir)
+        if linked is None:
+            # The original failed; nothing to link to, so report it the same way.
+            ok, msg, digests = False, f"Not extracted {loc.name}: duplicate of a member that failed", {}
+        else:
+            ok, msg, digests = linked
+        print(_finish_member(loc, ok, msg, digests, out_dir, journal, None))
+        if ok:
             extracted += 1
+        else:
+            failed += 1
+    return extracted, failed
+
+
+class MemberFilter:
+    """
+    --include/--exclude selection on normalized member names (see member_key).
+    Patterns are globs (fnmatch; '*' also matches '/') unless prefixed with
+    're:', in which case they are regexes searched in the name. A member is
+    selected if it matches any include (or there are none) and no exclude.
+    Each side is compiled into a single regex.
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None):
+        self.include = self._compile(include)
+        self.exclude = self._compile(exclude)
+
+    @staticmethod
+    def _compile(patterns: Optional[List[str]]):
+        parts = []
+        for p in patterns or []:
+            if p.startswith("re:"):
+                parts.append(f"(?:.*?(?:{p[3:]}))")
+            else:
+                parts.append(f"(?:{fnmatch.translate(member_key(p))})")
+        return re.compile("|".join(parts), re.DOTALL) if parts else None
+
+    def __bool__(self) -> bool:
+        return self.include is not None or self.exclude is not None
+
+    def __call__(self, name: str) -> bool:
+        key = member_key(name)
+        if self.include is not None and not self.include.match(key):
+            return False
+        return self.exclude is None or not self.exclude.match(key)
 
-            # jump to end of payload for next scan
-            f.seek(payload_start + r.csize, 0)
+
+def _index_members(index: ArchiveIndex, names: Optional[List[str]]) -> Tuple[List[MemberLocation], List[str]]:
+    """Resolve requested names (all extractable members if None) to locations; returns (found, missing)."""
+    if not names:
+        return [loc for loc in (e.location() for e in index.in_archive_order()) if loc is not None], []
+
+    found: List[MemberLocation] = []
+    missing: List[str] = []
+    for name in names:
+        e = index.lookup(name)
+        loc = e.location() if e is not None else None
+        if loc is None:
+            missing.append(name)
+        else:
+            found.append(loc)
+    return found, missing
+
+
+def extract_archive(arc_path: str, fmt_path: str, out_dir: str, verify_sizes: bool = True,
+                    use_mmap: bool = False, jobs: int = 1,
+                    max_inflight_bytes: int = DEFAULT_INFLIGHT_BYTES,
+                    names: Optional[List[str]] = None, use_index: bool = True,
+                    verify: bool = False, resume: bool = False,
+                    member_filter: Optional[MemberFilter] = None, dedup: Optional[str] = None,
+                    write_threads: int = WRITE_BEHIND_THREADS, codec_stats: bool = False) -> int:
+    """
+    Extract members (all, or only names, narrowed by member_filter) into
+    out_dir. Filtered-out members are decided from the header (or the index)
+    and their payloads are seeked over, never read. With verify, content
+    checksums are checked while streaming and the first failure ends the run.
+    With resume, every member is recorded in a journal in out_dir; a later
+    resume run re-checks a sample of the recorded files, seeks past the
+    finished prefix and skips anything else already done. With dedup
+    ("hardlink" or "reflink"), repeated content is linked to its first copy
+    instead of being written again (see ExtractDedup). Single-process runs
+    write through a WriteBehind stage with write_threads threads (0 writes
+    inline). codec_stats prints bytes in/out and decompression time per codec.
+    """
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    extracted = failed = skipped = filtered = superseded = 0
+    stats = VerifyStats()
+    members: Optional[List[MemberLocation]] = None
+    wanted = {member_key(n) for n in names} if names else None
+    if member_filter is not None and not member_filter:
+        member_filter = None
+    deduper = ExtractDedup(dedup) if dedup else None
+
+    journal: Optional[ExtractJournal] = None
+    done: set = set()
+    start = 0
+    if resume:
+        kept, checked = validate_journal(load_journal(arc_path, out_dir), out_dir)
+        done = {e.offset for e in kept if e.ok}
+        start = resume_start(kept)
+        if kept:
+            print(f"Resuming: {len(done)} members already extracted ({checked} re-checked), "
+                  f"scanning from offset {start}")
+        journal = ExtractJournal(arc_path, out_dir, kept)
+
+    try:
+        index = load_index(arc_path) if use_index else None
+        if index is not None:
+            print(f"Using index: {index_path_for(arc_path)} ({len(index)} records)")
+            members, missing = _index_members(index, names)
+            for name in missing:
+                print(f"Member not found: {name}")
+            failed += len(missing)
+            if member_filter is not None:
+                selected = [loc for loc in members if member_filter(loc.name)]
+                filtered += len(members) - len(selected)
+                members = selected
+        else:
+            default_key, registry = load_formats(fmt_path)
+            fmt = detect_format(arc_path, registry, default_key)
+
+            print(f"Detected format: {fmt.key} (magic='{fmt.magic_str}', delimiter={fmt.delimiter!r})")
+
+            read_token = make_token_reader(fmt.delimiter)
+
+            with open_archive(arc_path, use_mmap) as f:
+                if jobs > 1:
+                    members = []
+                    for loc in locate_members(f, read_token, fmt, start):
+                        if wanted is not None and member_key(loc.name) not in wanted:
+                            continue
+                        if member_filter is not None and not member_filter(loc.name):
+                            filtered += 1
+                            continue
+                        members.append(loc)
+                else:
+                    tally = ExtractTally()
+                    writer = WriteBehind(write_threads) if write_threads > 0 else None
+                    try:
+                        # iter_members has already moved f past each located payload,
+                        # so a member that is skipped here is never read.
+                        for r, loc in iter_members(f, read_token, fmt, start):
+                            if loc is None or (wanted is not None and member_key(loc.name) not in wanted):
+                                continue
+                            if member_filter is not None and not member_filter(loc.name):
+                                filtered += 1
+                                continue
+                            if loc.offset in done:
+                                skipped += 1
+                                continue
+                            if not _extract_one(f, loc, out_dir, verify_sizes, verify, stats, journal,
+                                                deduper, writer, tally) and verify:
+                                break
+                            f.seek(loc.offset + loc.csize, 0)
+                    finally:
+                        if writer is not None:
+                            writer.close()
+                    extracted += tally.extracted
+                    failed += tally.failed
+
+        if members is not None:
+            if jobs > 1:
+                # Workers write concurrently, so a path that occurs twice is
+                # only extracted from its last member, as a serial run leaves it.
+                unique = last_per_path(members)
+                superseded = len(members) - len(unique)
+                members = unique
+            if done:
+                todo = [loc for loc in members if loc.offset not in done]
+                skipped += len(members) - len(todo)
+                members = todo
+            dups: List[MemberLocation] = []
+            if deduper is not None and not verify:
+                members, dups = deduper.split(members)
+            if jobs > 1:
+                print(f"Located {len(members) + len(dups)} members; extracting with {jobs} workers")
+                result = _extract_parallel(arc_path, members, out_dir, verify_sizes, use_mmap, jobs,
+                                           max_inflight_bytes, verify, stats, journal, deduper)
+            else:
+                result = _extract_serial(arc_path, members, out_dir, verify_sizes, use_mmap, verify, stats,
+                                         journal, deduper, write_threads)
+            extracted += result[0]
+            failed += result[1]
+            if dups:
+                result = _link_duplicates(dups, out_dir, journal, deduper)
+                extracted += result[0]
+                failed += result[1]
+    finally:
+        if journal is not None:
+            journal.close()
 
     print(f"Done. Extracted {extracted} files into: {out_dir}")
+    if filtered:
+        print(f"Filtered out {filtered} members (--include/--exclude)")
+    if deduper is not None:
+        print(deduper.summary())
+    if superseded:
+        print(f"Skipped {superseded} members replaced by a later member with the same path")
+    if skipped:
+        print(f"Skipped {skipped} members already extracted (journal {journal_path_for(out_dir)})")
+    if verify:
+        print(stats.summary())
+    if codec_stats:
+        print(codec_summary(stats.codecs))
+    if failed:
+        print(f"{failed} members failed to extract.")
+        return 1
+    return 0
+
+
+# tar modes are streaming ("w|"), so the output never needs to be seekable.
+EXPORT_FORMATS = {
+    "tar": "w|",
+    "tar.gz": "w|gz",
+    "tar.bz2": "w|bz2",
+    "tar.xz": "w|xz",
+    "zip": None,
+}
+# Record ftype -> tar member type; anything else is skipped with a message.
+EXPORT_TAR_TYPES = {"0": tarfile.REGTYPE, "1": tarfile.LNKTYPE, "2": tarfile.SYMTYPE, "5": tarfile.DIRTYPE}
+ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks (for tarfile.addfile)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buf = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        # Fill b across chunk boundaries: tarfile takes any short read as the end of the data.
+        filled = 0
+        while filled < len(b):
+            if not self._buf:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buf = memoryview(chunk)
+                continue
+            n = min(len(b) - filled, len(self._buf))
+            b[filled:filled + n] = self._buf[:n]
+            self._buf = self._buf[n:]
+            filled += n
+        return filled
+
+
+def _export_name(r: Record) -> Optional[str]:
+    """Relative member name for the export, or None if it would escape the output root."""
+    name = member_key(r.name).rstrip("/")
+    if not name or any(part == ".." for part in name.split("/")):
+        return None
+    return name
+
+
+def _zip_info(name: str, r: Record, compress_type: int) -> zipfile.ZipInfo:
+    date_time = time.localtime(r.mtime_ns // 1_000_000_000)[:6] if r.mtime_ns else ZIP_MIN_DATE
+    info = zipfile.ZipInfo(name, date_time=max(date_time, ZIP_MIN_DATE))
+    info.compress_type = compress_type
+    info.external_attr = (r.mode & 0xFFFF) << 16
+    return info
+
+
+def _export_member_tar(tf: tarfile.TarFile, f, name: str, r: Record, loc: Optional[MemberLocation]) -> Tuple[bool, str]:
+    ti = tarfile.TarInfo(name)
+    ti.type = EXPORT_TAR_TYPES[r.ftype]
+    ti.mtime = r.mtime_ns // 1_000_000_000
+    ti.mode = stat.S_IMODE(r.mode) or (0o755 if r.ftype == "5" else 0o644)
+    ti.uid, ti.gid, ti.uname, ti.gname = r.uid, r.gid, r.uname, r.gname
+    if r.ftype in ("1", "2"):
+        ti.linkname = member_key(r.linkname) if r.ftype == "1" else r.linkname
+    if r.ftype != "0":
+        tf.addfile(ti)
+        return True, f"Exported {name}{'/' if r.ftype == '5' else ''}"
+
+    ti.size = r.usize
+    stream = _ChunkReader(iter_decompress(loc.comp, iter_payload(f, loc.offset, loc.csize)) if loc else ())
+    # tarfile copies exactly ti.size bytes; a short payload raises and leaves the tar unusable.
+    tf.addfile(ti, stream if r.usize else None)
+    if stream.read(1):
+        return False, f"SIZE MISMATCH for {name}: payload is longer than its header size {r.usize} (truncated)"
+    return True, f"Exported {name} [{r.comp}]"
+
+
+def _export_member_zip(zf: zipfile.ZipFile, f, name: str, r: Record, loc: Optional[MemberLocation],
+                       compress_type: int) -> Tuple[bool, str]:
+    if r.ftype == "1":
+        return False, f"Skipped {name}: zip has no hardlinks (target {r.linkname})"
+    if r.ftype == "5":
+        zf.writestr(_zip_info(name + "/", r, zipfile.ZIP_STORED), b"")
+        return True, f"Exported {name}/"
+    info = _zip_info(name, r, compress_type)
+    if r.ftype == "2":
+        # Info-ZIP convention: symlink mode bits, target as the content.
+        info.compress_type = zipfile.ZIP_STORED
+        zf.writestr(info, r.linkname.encode("utf-8"))
+        return True, f"Exported {name} -> {r.linkname}"
+
+    written = 0
+    with zf.open(info, "w", force_zip64=r.usize >= zipfile.ZIP64_LIMIT) as w:
+        if loc is not None:
+            for piece in iter_decompress(loc.comp, iter_payload(f, loc.offset, loc.csize)):
+                w.write(piece)
+                written += len(piece)
+    if written != r.usize:
+        return False, f"SIZE MISMATCH for {name}: got {written} bytes, header says {r.usize}"
+    return True, f"Exported {name} [{r.comp}]"
+
+
+def export_archive(arc_path: str, fmt_path: str, out_path: str, to: str = "tar", use_mmap: bool = False,
+                   member_filter: Optional[MemberFilter] = None, zip_level: Optional[int] = None) -> int:
+    """
+    Convert an ArchiveFile archive to tar (optionally compressed) or zip in one
+    sequential pass: each member's payload is decompressed chunk by chunk
+    straight into tarfile/zipfile, so memory stays constant and nothing is
+    staged on disk. out_path "-" writes the export to stdout (progress then
+    goes to stderr); a file is written to a temp name and renamed when done.
+    Files whose payload cannot be located are skipped unless empty.
+    """
+    if to not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {to!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if member_filter is not None and not member_filter:
+        member_filter = None
+
+    to_stdout = out_path == "-"
+    tmp_path = None
+    if to_stdout:
+        out = sys.stdout.buffer
+    else:
+        tmp_path = f"{out_path}.tmp-{os.getpid()}"
+        out = open(tmp_path, "wb")
+
+    exported = failed = 0
+    aborted = False
+    log = sys.stderr if to_stdout else sys.stdout
+    try:
+        # Nothing but export bytes may reach stdout when it is the output.
+        with contextlib.redirect_stdout(log):
+            default_key, registry = load_formats(fmt_path)
+            fmt = detect_format(arc_path, registry, default_key)
+            print(f"Detected format: {fmt.key} (magic='{fmt.magic_str}', delimiter={fmt.delimiter!r})")
+            read_token = make_token_reader(fmt.delimiter)
+
+            if to == "zip":
+                compress_type = zipfile.ZIP_STORED if zip_level == 0 else zipfile.ZIP_DEFLATED
+                container = zipfile.ZipFile(out, "w", compression=compress_type, compresslevel=zip_level)
+            else:
+                container = tarfile.open(fileobj=out, mode=EXPORT_FORMATS[to], bufsize=READ_BLOCK_SIZE)
+
+            with container, open_archive(arc_path, use_mmap) as f:
+                for r, loc in iter_members(f, read_token, fmt):
+                    if not r.name or (member_filter is not None and not member_filter(r.name)):
+                        continue
+                    name = _export_name(r)
+                    if name is None:
+                        ok, msg = False, f"Skipped {r.name!r}: unsafe member name"
+                    elif r.ftype not in EXPORT_TAR_TYPES:
+                        ok, msg = False, f"Skipped {name}: unsupported member type {r.ftype!r}"
+                    elif r.ftype == "0" and loc is None and r.usize:
+                        ok, msg = False, f"Skipped {name}: payload not found or compression {r.comp!r} unsupported"
+                    else:
+                        try:
+                            if to == "zip":
+                                ok, msg = _export_member_zip(container, f, name, r, loc, compress_type)
+                            else:
+                                ok, msg = _export_member_tar(container, f, name, r, loc)
+                        except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+                            # The member is half written; the container cannot be repaired.
+                            print(f"Export failed at {name} ({r.comp}): {e}")
+                            aborted = True
+                            break
+                    print(msg)
+                    if ok:
+                        exported += 1
+                    else:
+                        failed += 1
+                    if loc is not None:
+                        f.seek(loc.offset + loc.csize, 0)
+
+            if aborted:
+                print("Export aborted; the output is incomplete" + ("." if to_stdout else " and was removed."))
+                return 1
+            if to_stdout:
+                out.flush()
+            else:
+                out.flush()
+                os.fsync(out.fileno())
+                out.close()
+                os.replace(tmp_path, out_path)
+                tmp_path = None
+            print(f"Done. Exported {exported} members to {'stdout' if to_stdout else out_path} ({to})")
+            if failed:
+                print(f"{failed} members could not be exported.")
+    finally:
+        if tmp_path is not None:
+            out.close()
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+    return 1 if failed else 0
+
+
+# ----------------------------
+# Recovery scan (salvage)
+# ----------------------------
+
+RECOVER_MIN_FIELDS = 0x18          # fewer fields cannot hold name, sizes and checksums
+RECOVER_MAX_FIELDS = 0x400
+RECOVER_MAX_HLEN = 1024 * 1024
+
+
+@dataclass
+class RecoveredMember:
+    record: Record
+    status: str                        # "ok", "unverified", "damaged" or "truncated"
+    header_end: int                    # offset just past the header's final delimiter
+    content_start: int
+    content_size: int                  # stored (compressed) bytes
+    location: Optional[MemberLocation] = None   # set for extractable ok/unverified files
+
+
+@dataclass
+class RecoveryStats:
+    archive_bytes: int = 0
+    candidates: int = 0                # header-shaped matches examined
+    rejected: int = 0                  # ...that failed structure or checksum checks
+    members: int = 0
+    recovered: int = 0                 # header and content checksums match
+    unverified: int = 0                # intact header, but no content checksum to check
+    damaged: int = 0
+    resyncs: int = 0                   # gaps between one valid member and the next
+    recovered_bytes: int = 0
+    skipped_bytes: int = 0             # garbage/destroyed headers scanned over
+    lost_bytes: int = 0                # payload bytes of damaged members
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        mb = self.archive_bytes / (1024 * 1024)
+        rate = f"{mb / self.seconds:.1f} MB/s" if self.seconds > 0 else "n/a"
+        return (f"Recovery scan: {self.members} members ({self.recovered} verified, {self.unverified} unverified, "
+                f"{self.damaged} damaged); {self.recovered_bytes} bytes recovered, {self.skipped_bytes} skipped "
+                f"in {self.resyncs} resyncs, {self.lost_bytes} lost; {self.candidates} candidates "
+                f"({self.rejected} rejected); {mb:.2f} MB in {self.seconds:.3f}s ({rate})")
+
+
+def _header_candidate_re(delim: bytes):
+    """hlen, fcount and a short type token, each followed by the delimiter, right after a delimiter."""
+    d = re.escape(delim)
+    return re.compile(rb"(?<=" + d + rb")[0-9a-fA-F]{1,8}" + d + rb"[0-9a-fA-F]{1,4}" + d + rb"[0-9]{1,2}" + d)
+
+
+def _parse_candidate(buf, pos: int, fmt: FormatSpec) -> Optional[Tuple[Record, int, int, bool]]:
+    """
+    Validate a header candidate at pos: hlen must land on a delimiter, the
+    field count must match, and the header checksum (when present) must
+    verify. Returns (record, header end, JSON block size, checksum verified)
+    or None.
+    """
+    delim = fmt.delimiter
+    i = buf.find(delim, pos, pos + 9)
+    hlen = int(bytes(buf[pos:i]), 16)
+    if hlen > RECOVER_MAX_HLEN:
+        return None
+    body_start = i + 1
+    header_end = body_start + hlen + 1
+    if header_end > len(buf) or buf[header_end - 1:header_end] != delim:
+        return None
+    parts = bytes(buf[body_start:header_end - 1]).split(delim)
+    fcount = int(parts[0], 16)
+    if not RECOVER_MIN_FIELDS <= fcount <= RECOVER_MAX_FIELDS or len(parts) != fcount + 1:
+        return None
+    fields = [p.decode("utf-8", errors="replace") for p in parts[1:]]
+    r = record_from_fields(fields, fmt, pos)
+    jsonsize = fields[fmt.idx_jsonsize] if fmt.idx_jsonsize < len(fields) else "0"
+    if not is_hex_str(jsonsize):
+        return None
+
+    htype = r.hchecksum_type.lower()
+    h = new_checksum_hasher(htype) if htype and htype != "none" else None
+    if h is not None:
+        # The checksum covers hlen through the content checksum type, each delimited.
+        h.update(delim.join([bytes(buf[pos:i])] + parts[:-2]) + delim)
+        if not checksums_equal(h.hexdigest(), r.hchecksum):
+            return None
+    return r, header_end, int(jsonsize, 16), h is not None
+
+
+def _content_ok(buf, r: Record, start: int, size: int) -> Optional[bool]:
+    """True/False for a content checksum match, None when there is none to check."""
+    ctype = r.cchecksum_type.lower()
+    if not ctype or ctype == "none":
+        return None
+    h = new_checksum_hasher(ctype)
+    if h is None:
+        return None
+    for off in range(start, start + size, READ_BLOCK_SIZE):
+        h.update(buf[off:min(off + READ_BLOCK_SIZE, start + size)])
+    return checksums_equal(h.hexdigest(), r.cchecksum)
+
+
+def _global_header_end(buf, fmt: FormatSpec) -> int:
+    """Offset after the global header and its JSON block, or 0 if the signature/header is unreadable."""
+    delim = fmt.delimiter
+    if bytes(buf[:len(fmt.magic_str)]) != fmt.magic_str.encode("utf-8"):
+        return 0
+    sig_end = buf.find(delim)
+    hlen_end = buf.find(delim, sig_end + 1, sig_end + 10)
+    if sig_end < 0 or hlen_end < 0:
+        return 0
+    hlen = bytes(buf[sig_end + 1:hlen_end]).decode("ascii", "replace")
+    if not is_hex_str(hlen):
+        return 0
+    header_end = hlen_end + 1 + int(hlen, 16) + len(delim)
+    fields = bytes(buf[hlen_end + 1:header_end - len(delim)]).split(delim)
+    jsonsize = 0
+    if b"json" in fields:
+        k = fields.index(b"json")
+        if k + 2 < len(fields) and is_hex_str(fields[k + 2].decode("ascii", "replace")):
+            jsonsize = int(fields[k + 2], 16)
+    return min(len(buf), header_end + jsonsize + len(delim))
+
+
+def recovery_scan(buf, fmt: FormatSpec, stats: Optional[RecoveryStats] = None) -> Iterable[RecoveredMember]:
+    """
+    Salvage members from a possibly damaged archive held in buf (bytes or an
+    mmap). Header candidates are found with one compiled regex over the
+    whole buffer rather than a byte-at-a-time resync; each is validated by
+    its layout and header checksum, so its payload position is exact rather
+    than guessed from a magic byte. Intact payloads are then checked against
+    the content checksum and skipped over; after a damaged payload the scan
+    resumes at its start, so headers inside a shortened payload are found.
+    """
+    stats = stats if stats is not None else RecoveryStats()
+    stats.archive_bytes = len(buf)
+    delim = fmt.delimiter
+    pattern = _header_candidate_re(delim)
+
+    pos = _global_header_end(buf, fmt)
+    covered = pos      # end of the last member accounted for
+
+    while True:
+        m = pattern.search(buf, pos)
+        if m is None:
+            break
+        stats.candidates += 1
+        start = m.start()
+        parsed = _parse_candidate(buf, start, fmt)
+        if parsed is None:
+            stats.rejected += 1
+            pos = start + 1
+            continue
+        r, header_end, jsonsize, verified = parsed
+
+        if start > covered:
+            stats.resyncs += 1
+            stats.skipped_bytes += start - covered
+        elif start < covered:
+            # Found inside a payload already counted as lost.
+            stats.lost_bytes -= min(stats.lost_bytes, covered - start)
+
+        content_start = header_end + jsonsize + len(delim)
+        size = r.csize if r.comp and r.comp.lower() != "none" and r.csize else r.usize
+        stats.members += 1
+
+        if content_start + size > len(buf):
+            status = "truncated"
+            ok = False
+        else:
+            check = _content_ok(buf, r, content_start, size)
+            if check is None and size == 0:
+                check = verified or None    # nothing stored: the header says it all
+            ok = check is not False
+            status = "ok" if check else ("unverified" if check is None else "damaged")
+
+        loc = None
+        if ok and is_extractable(r):
+            loc = MemberLocation(name=r.name, comp=r.comp, offset=content_start, csize=r.csize, usize=r.usize,
+                                 cchecksum_type=r.cchecksum_type, cchecksum=r.cchecksum)
+        yield RecoveredMember(record=r, status=status, header_end=header_end, content_start=content_start,
+                              content_size=size, location=loc)
+
+        if ok:
+            if status == "ok":
+                stats.recovered += 1
+            else:
+                stats.unverified += 1
+            end = content_start + size + len(delim)
+            stats.recovered_bytes += end - start
+            pos = covered = end
+        else:
+            stats.damaged += 1
+            end = min(len(buf), content_start + size + len(delim))
+            stats.recovered_bytes += content_start - start
+            stats.lost_bytes += end - content_start
+            pos, covered = content_start, end
+
+    # Trailing delimiters (end-of-archive padding) are not garbage.
+    tail = bytes(buf[covered:])
+    if tail.strip(delim):
+        stats.resyncs += 1
+        stats.skipped_bytes += len(tail)
+
+
+def salvage_archive(arc_path: str, fmt_path: str, out_dir: str, list_only: bool = False,
+                    report_path: Optional[str] = None, verify_sizes: bool = True) -> int:
+    """
+    Recovery mode: run recovery_scan() over the mapped archive, then (unless
+    list_only) extract every member whose header verified and whose payload
+    is intact. Prints per-member status and resync statistics; report_path
+    gets them as JSON. Returns 1 if anything was damaged or skipped.
+    """
+    default_key, registry = load_formats(fmt_path)
+    fmt = detect_format(arc_path, registry, default_key)
+    print(f"Detected format: {fmt.key} (magic='{fmt.magic_str}', delimiter={fmt.delimiter!r})")
+
+    stats = RecoveryStats()
+    found: List[RecoveredMember] = []
+    damaged: List[RecoveredMember] = []
+    t0 = time.perf_counter()
+    with open(arc_path, "rb") as raw:
+        size = os.fstat(raw.fileno()).st_size
+        buf = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            for rm in recovery_scan(buf, fmt, stats):
+                r = rm.record
+                if rm.status in ("damaged", "truncated"):
+                    damaged.append(rm)
+                if list_only or rm.status not in ("ok", "unverified"):
+                    print(f"{rm.status.upper():<10} @{r.header_pos}", end=" ")
+                    _print_list_line(r.ftype, r.name, r.usize, r.comp, r.csize)
+                if rm.location is not None:
+                    found.append(rm)
+        finally:
+            if size:
+                buf.close()
+    stats.seconds = time.perf_counter() - t0
+
+    extracted = failed = 0
+    if not list_only:
+        out_dir = os.path.abspath(out_dir)
+        os.makedirs(out_dir, exist_ok=True)
+        with open_archive(arc_path) as f:
+            for rm in found:
+                ok, msg = extract_member(f, rm.location, out_dir, verify_sizes)
+                print(msg)
+                if ok:
+                    extracted += 1
+                else:
+                    failed += 1
+        print(f"Done. Extracted {extracted} files into: {out_dir}")
+    print(stats.summary())
+
+    if report_path:
+        report = {"archive": os.path.abspath(arc_path), "stats": dict(stats.__dict__),
+                  "extracted": extracted, "failed": failed,
+                  "damaged": [{"name": rm.record.name, "header_pos": rm.record.header_pos, "status": rm.status}
+                              for rm in damaged]}
+        tmp_path = report_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as rf:
+            json.dump(report, rf, indent=2)
+        os.replace(tmp_path, report_path)
+    return 1 if (failed or stats.damaged or stats.skipped_bytes) else 0
+
+
+# ----------------------------
+# Batch mode
+# ----------------------------
+
+BATCH_OPS = ("list", "extract", "verify", "build-index")
+BATCH_MESSAGE_RE = re.compile(r"fail|mismatch|short read|not found|could not|error", re.IGNORECASE)
+BATCH_MAX_MESSAGES = 20
+
+
+def expand_batch_sources(patterns: List[str], manifests: Optional[List[str]] = None) -> List[str]:
+    """
+    Archive paths from glob patterns plus manifest files (one path per line,
+    '#' comments, relative paths resolved against the manifest's directory).
+    Sorted and de-duplicated.
+    """
+    found = set()
+    for pattern in patterns or []:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        found.update(os.path.abspath(m) for m in matches if os.path.isfile(m))
+    for manifest in manifests or []:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as mf:
+            for line in mf:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                found.add(os.path.abspath(os.path.join(base, line)))
+    return sorted(found)
+
+
+def _batch_out_dirs(archives: List[str], out_dir: str) -> Dict[str, str]:
+    """One output dir per archive, mirroring its path below the archives' common directory."""
+    if not archives:
+        return {}
+    common = os.path.commonpath([os.path.dirname(a) for a in archives])
+    return {a: os.path.join(out_dir, os.path.splitext(os.path.relpath(a, common))[0]) for a in archives}
+
+
+def _batch_init(fmt_path: str, stamp: Tuple[int, int], default_key: Optional[str],
+                registry: Dict[str, FormatSpec]) -> None:
+    # Seed the worker's format cache with the parent's registry: no config parsing per archive.
+    _FORMAT_CACHE[fmt_path] = (stamp, default_key, registry)
+
+
+def _batch_run(arc_path: str, op: str, fmt_path: str, out_dir: str, verify_sizes: bool,
+               use_mmap: bool, use_index: bool) -> Dict[str, Any]:
+    """Run one archive's operation with its output captured; returns its report entry."""
+    sink = io.StringIO()
+    result: Dict[str, Any] = {"archive": arc_path, "op": op, "pid": os.getpid()}
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sink):
+            if op == "list":
+                code = list_archive(arc_path, fmt_path, use_mmap=use_mmap, use_index=use_index)
+            elif op == "build-index":
+                code = build_index(arc_path, fmt_path, use_mmap=use_mmap)
+            else:
+                code = extract_archive(arc_path, fmt_path, out_dir, verify_sizes=verify_sizes, use_mmap=use_mmap,
+                                       use_index=use_index, verify=(op == "verify"))
+        result["exit"] = code
+        result["error"] = None
+    except Exception as e:
+        result["exit"] = 1
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - t0
+
+    lines = sink.getvalue().splitlines()
+    result["summary"] = next((ln for ln in reversed(lines) if ln.startswith(("Done.", "Wrote index"))), None)
+    result["messages"] = [ln for ln in lines if BATCH_MESSAGE_RE.search(ln)][:BATCH_MAX_MESSAGES]
+    if op != "list" and op != "build-index":
+        result["out_dir"] = out_dir
+    return result
+
+
+def batch_archives(sources: List[str], fmt_path: str, op: str = "list", manifests: Optional[List[str]] = None,
+                   out_dir: str = "output", jobs: int = 1, report_path: str = "batch-report.json",
+                   verify_sizes: bool = True, use_mmap: bool = False, use_index: bool = True) -> int:
+    """
+    Run op over many archives on one process pool. The format registry is
+    loaded once here and handed to every worker. Archives are submitted
+    largest first and each idle worker takes the next one, so a few huge
+    archives don't leave the other workers waiting behind one long queue.
+    Writes an aggregated JSON report; returns 1 if any archive failed.
+    """
+    archives = expand_batch_sources(sources, manifests)
+    if not archives:
+        print("No archives matched.")
+        return 2
+
+    fmt_abs = os.path.abspath(fmt_path)
+    default_key, registry = load_formats(fmt_abs)
+    st = os.stat(fmt_abs)
+    stamp = (st.st_size, st.st_mtime_ns)
+
+    sizes = {a: (os.path.getsize(a) if os.path.exists(a) else 0) for a in archives}
+    out_dirs = _batch_out_dirs(archives, os.path.abspath(out_dir))
+    order = sorted(archives, key=lambda a: sizes[a], reverse=True)
+    jobs = max(1, min(jobs, len(archives)))
+
+    print(f"Batch {op}: {len(archives)} archives, {sum(sizes.values())} bytes, {jobs} workers")
+    results: Dict[str, Dict[str, Any]] = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_batch_init,
+                             initargs=(fmt_abs, stamp, default_key, registry)) as pool:
+        futures = {pool.submit(_batch_run, a, op, fmt_abs, out_dirs[a], verify_sizes, use_mmap, use_index): a
+                   for a in order}
+        for fut in as_completed(futures):
+            arc = futures[fut]
+            try:
+                res = fut.result()
+            except Exception as e:  # worker died
+                res = {"archive": arc, "op": op, "exit": 1, "error": f"{type(e).__name__}: {e}",
+                       "seconds": None, "summary": None, "messages": []}
+            res["size"] = sizes[arc]
+            results[arc] = res
+            status = "ok" if res["exit"] == 0 else "FAILED"
+            secs = f"{res['seconds']:.2f}s" if res["seconds"] is not None else "n/a"
+            print(f"[{status}] {arc} ({secs}){' ' + res['error'] if res['error'] else ''}")
+    elapsed = time.perf_counter() - t0
+
+    entries = [results[a] for a in archives]
+    failed = [e for e in entries if e["exit"] != 0]
+    total_bytes = sum(sizes.values())
+    report = {
+        "op": op,
+        "fmt": fmt_abs,
+        "jobs": jobs,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - elapsed)),
+        "seconds": elapsed,
+        "archives": len(entries),
+        "failed": len(failed),
+        "bytes": total_bytes,
+        "mb_per_s": total_bytes / elapsed / (1024 * 1024) if elapsed > 0 else None,
+        "results": entries,
+    }
+    tmp_path = report_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as rf:
+        json.dump(report, rf, indent=2)
+    os.replace(tmp_path, report_path)
+
+    print(f"Done. {len(entries) - len(failed)} ok, {len(failed)} failed in {elapsed:.2f}s; report: {report_path}")
+    return 1 if failed else 0
+
+
+# ----------------------------
+# Archive writer
+# ----------------------------
+
+WRITE_PROGRAM_NAME = "PyArchiveFile"
+
+
+@dataclass(frozen=True)
+class PackEntry:
+    """One filesystem object to be packed, in archive order."""
+    src: str
+    name: str        # archive name, always "./..."
+    ftype: str       # "0" file, "2" symlink, "5" directory
+    st: os.stat_result
+    linkname: str = ""
+
+
+def _archive_name(path: str) -> str:
+    parts = [p for p in os.path.normpath(path).replace(os.sep, "/").split("/") if p not in ("", ".", "..")]
+    return "./" + "/".join(parts) if parts else "."
+
+
+def scan_sources(paths: List[str]) -> List[PackEntry]:
+    """
+    Expand the given paths into pack entries. Directories are walked with
+    sorted names so the same tree always packs in the same order.
+    """
+    entries: List[PackEntry] = []
+
+    def _add(src: str) -> None:
+        st = os.lstat(src)
+        name = _archive_name(src)
+        if stat.S_ISLNK(st.st_mode):
+            entries.append(PackEntry(src=src, name=name, ftype="2", st=st, linkname=os.readlink(src)))
+        elif stat.S_ISDIR(st.st_mode):
+            if name != ".":
+                entries.append(PackEntry(src=src, name=name, ftype="5", st=st))
+            for child in sorted(os.listdir(src)):
+                _add(os.path.join(src, child))
+        elif stat.S_ISREG(st.st_mode):
+            entries.append(PackEntry(src=src, name=name, ftype="0", st=st))
+        else:
+            print(f"Skipping unsupported file type: {src}")
+
+    for p in paths:
+        _add(p)
+    return entries
+
+
+def new_compressor(comp: str, level: Optional[int] = None):
+    """Incremental compressor for comp (counterpart of new_decompressor)."""
+    codec = CODECS.get(comp)
+    if codec is None or codec.new_compressor is None:
+        raise ValueError(f"Unsupported compression: {comp}")
+    return codec.new_compressor(level)
+
+
+def _compress_file(src: str, comp: str, level: Optional[int], algo: str,
+                   chunk_size: int = READ_BLOCK_SIZE) -> Tuple[List[bytes], int, int, str]:
+    """
+    Worker: compress one file in chunks and checksum the stored bytes.
+    lzma/bz2/zlib and hashlib release the GIL, so threads run in parallel.
+    Returns (compressed chunks, usize, csize, checksum).
+    """
+    comp_obj = new_compressor(comp, level)
+    h = new_checksum_hasher(algo)
+    out: List[bytes] = []
+    usize = csize = 0
+
+    def _emit(data: bytes) -> None:
+        nonlocal csize
+        if data:
+            out.append(data)
+            h.update(data)
+            csize += len(data)
+
+    with open(src, "rb") as fin:
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            usize += len(chunk)
+            _emit(comp_obj.compress(chunk))
+    _emit(comp_obj.flush())
+    return out, usize, csize, h.hexdigest().lower()
+
+
+def _hex(value: int) -> str:
+    return format(value, "x")
+
+
+def _owner_names(st: os.stat_result) -> Tuple[str, str]:
+    uname = gname = ""
+    if pwd is not None:
+        try:
+            uname = pwd.getpwuid(st.st_uid).pw_name
+        except KeyError:
+            pass
+    if grp is not None:
+        try:
+            gname = grp.getgrgid(st.st_gid).gr_name
+        except KeyError:
+            pass
+    return uname, gname
+
+
+def _pack_header(covered: List[str], trailing: List[str], delim: bytes, algo: str,
+                 checksum_prefix: Optional[List[str]] = None) -> bytes:
+    """
+    Serialize a header the way ReadFileHeaderDataBySize reads it:
+    hlen, fcount, covered..., header checksum, trailing..., delimiter.
+    hlen counts everything after its own delimiter except the final one; the
+    header checksum covers checksum_prefix + hlen + fcount + covered.
+    """
+    digest_len = new_checksum_hasher(algo).digest_size * 2
+    body = [_hex(len(covered) + 1 + len(trailing))] + covered
+    enc = [s.encode("utf-8") for s in body]
+    tail = [s.encode("utf-8") for s in trailing]
+    hlen = len(delim.join(enc + [b"0" * digest_len] + tail))
+    checked = [s.encode("utf-8") for s in (checksum_prefix or [])] + [_hex(hlen).encode("utf-8")] + enc
+    h = new_checksum_hasher(algo)
+    h.update(delim.join(checked) + delim)
+    hck = h.hexdigest().lower().encode("utf-8")
+    return delim.join([_hex(hlen).encode("utf-8")] + enc + [hck] + tail) + delim
+
+
+def _member_header(entry: PackEntry, fid: int, comp: str, usize: int, csize: int,
+                   cchecksum_type: str, cchecksum: str, delim: bytes, algo: str) -> bytes:
+    st = entry.st
+    uname, gname = _owner_names(st)
+    btime_ns = getattr(st, "st_birthtime_ns", st.st_ctime_ns)
+    covered = [
+        entry.ftype, "UTF-8", "UTF-8", entry.name, entry.linkname,
+        _hex(usize), _hex(getattr(st, "st_blksize", 0) or 0), _hex(getattr(st, "st_blocks", 0) or 0), "0",
+        _hex(st.st_atime_ns), _hex(st.st_mtime_ns), _hex(st.st_ctime_ns), _hex(btime_ns),
+        _hex(st.st_mode), "0", comp, _hex(csize),
+        _hex(st.st_uid), uname, _hex(st.st_gid), gname,
+        _hex(fid), _hex(fid), _hex(st.st_nlink), "0", "0",
+        "+1", "json", "0", "0", "none", "0", "2", "0",
+        algo, cchecksum_type,
+    ]
+    return _pack_header(covered, [cchecksum], delim, algo)
+
+
+def _global_header(fmt: FormatSpec, numfiles: int, algo: str) -> bytes:
+    delim = fmt.delimiter
+    formstring = fmt.magic_str + str(int(fmt.version.replace(".", "") or "1"))
+    now_ns = time.time_ns()
+    covered = [
+        _hex(now_ns), _hex(now_ns), "UTF-8",
+        platform.system() + platform.release().split(".")[0], platform.python_implementation(),
+        WRITE_PROGRAM_NAME, _hex(numfiles), "+1",
+        "json", "0", "0", "none", "0", "2", "0",
+        algo,
+    ]
+    return formstring.encode("utf-8") + delim + _pack_header(covered, [], delim, algo, [formstring])
+
+
+def create_archive(arc_path: str, fmt_path: str, sources: List[str], comp: str = "lzma",
+                   level: Optional[int] = None, jobs: int = 1, checksum: str = "md5",
+                   max_inflight_bytes: int = DEFAULT_INFLIGHT_BYTES,
+                   comp_for: Optional[Callable[[PackEntry], str]] = None) -> int:
+    """
+    Pack sources into a new archive. comp_for, if given, picks the codec per
+    file (e.g. a compression mix) instead of comp. Files are compressed on a thread pool
+    (a bounded window of jobs * 2 tasks / max_inflight_bytes) and written in
+    scan order, so output is deterministic for a given tree and timestamps.
+    The archive is written to a temp file and renamed into place.
+    """
+    default_key, registry = load_formats(fmt_path)
+    fmt = registry[default_key] if default_key in registry else next(iter(registry.values()))
+    delim = fmt.delimiter
+    if new_checksum_hasher(checksum) is None:
+        print(f"Unsupported checksum: {checksum}")
+        return 2
+
+    entries = scan_sources(sources)
+    jobs = max(1, jobs)
+    t0 = time.perf_counter()
+    total_usize = total_csize = 0
+    tmp_path = arc_path + ".tmp"
+
+    with open(tmp_path, "wb") as out, ThreadPoolExecutor(max_workers=jobs) as pool:
+        out.write(_global_header(fmt, len(entries), checksum))
+        out.write(delim)   # empty global JSON block, skipped by "+1"
+
+        pending: deque = deque()
+        inflight = 0
+        next_submit = 0
+
+        def _cost(e: PackEntry) -> int:
+            return e.st.st_size if e.ftype == "0" else 0
+
+        for fid, entry in enumerate(entries):
+            while (next_submit < len(entries) and len(pending) < jobs * 2
+                   and (not pending or inflight + _cost(entries[next_submit]) <= max_inflight_bytes)):
+                e = entries[next_submit]
+                fut = None
+                e_comp = comp_for(e) if comp_for is not None else comp
+                if e.ftype == "0" and e.st.st_size > 0:
+                    fut = pool.submit(_compress_file, e.src, e_comp, level, checksum)
+                pending.append((fut, e_comp))
+                inflight += _cost(e)
+                next_submit += 1
+
+            fut, e_comp = pending.popleft()
+            inflight -= _cost(entry)
+            chunks: List[bytes] = []
+            if fut is not None:
+                chunks, usize, csize, cchecksum = fut.result()
+                member_comp, cchecksum_type = e_comp, checksum
+            elif entry.ftype == "0":
+                usize = csize = 0
+                member_comp, cchecksum_type = "", checksum
+                cchecksum = file_checksum(b"", checksum)
+            else:
+                usize = csize = 0
+                member_comp, cchecksum_type, cchecksum = "", "none", "0"
+
+            out.write(_member_header(entry, fid, member_comp, usize, csize,
+                                     cchecksum_type, cchecksum, delim, checksum))
+            out.write(delim)   # empty JSON block
+            for chunk in chunks:
+                out.write(chunk)
+            out.write(delim)   # skipped by fseeknextfile "+1"
+            total_usize += usize
+            total_csize += csize
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp_path, arc_path)
+    elapsed = time.perf_counter() - t0
+    rate = total_usize / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+    print(f"Wrote {arc_path}: {len(entries)} members, {total_usize} -> {total_csize} bytes "
+          f"({'mixed' if comp_for is not None else comp}, {jobs} threads) in {elapsed:.2f}s ({rate:.1f} MiB/s)")
     return 0
 
 
@@ -583,19 +3235,118 @@ def main() -> int:
     ap_list = sub.add_parser("list", help="List archive contents")
     ap_list.add_argument("archive", help="Path to archive file (e.g. data.arc)")
     ap_list.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
+    ap_list.add_argument("--mmap", action="store_true", help="Memory-map the archive instead of buffered reads")
+    ap_list.add_argument("--no-index", action="store_true", help="Ignore the .arcidx sidecar and scan the archive")
+
+    ap_idx = sub.add_parser("build-index", help="Write a .arcidx sidecar index next to the archive")
+    ap_idx.add_argument("archive", help="Path to archive file (e.g. data.arc)")
+    ap_idx.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
+    ap_idx.add_argument("--mmap", action="store_true", help="Memory-map the archive instead of buffered reads")
+
+    ap_exp = sub.add_parser("export", help="Convert an archive to tar/zip in one streaming pass")
+    ap_exp.add_argument("archive", help="Path to archive file (e.g. data.arc)")
+    ap_exp.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
+    ap_exp.add_argument("--to", choices=list(EXPORT_FORMATS), default="tar", help="Output format (default: tar)")
+    ap_exp.add_argument("--out", default="-", help="Output file, or - for stdout (default: -)")
+    ap_exp.add_argument("--mmap", action="store_true", help="Read the archive through mmap")
+    ap_exp.add_argument("--include", action="append", metavar="PATTERN",
+                        help="Only export members matching this glob, or regex with a 're:' prefix (repeatable)")
+    ap_exp.add_argument("--exclude", action="append", metavar="PATTERN",
+                        help="Skip members matching this glob, or regex with a 're:' prefix (repeatable)")
+    ap_exp.add_argument("--zip-level", type=int, default=None,
+                        help="Deflate level for --to zip (0 stores members uncompressed)")
+
+    ap_salv = sub.add_parser("salvage", help="Recover members from a damaged archive (checksum-validated resync)")
+    ap_salv.add_argument("archive", help="Path to archive file (e.g. data.arc)")
+    ap_salv.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
+    ap_salv.add_argument("--out", default="output", help="Output directory (default: output)")
+    ap_salv.add_argument("--list", action="store_true", help="Only report what can be recovered")
+    ap_salv.add_argument("--report", default=None, help="Write recovery statistics as JSON to this file")
+    ap_salv.add_argument("--no-size-check", action="store_true", help="Don't warn on uncompressed size mismatch")
 
     ap_ext = sub.add_parser("extract", help="Extract archive contents")
     ap_ext.add_argument("archive", help="Path to archive file (e.g. data.arc)")
     ap_ext.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
     ap_ext.add_argument("--out", default="output", help="Output directory (default: output)")
     ap_ext.add_argument("--no-size-check", action="store_true", help="Disable uncompressed size verification")
+    ap_ext.add_argument("--mmap", action="store_true", help="Memory-map the archive; payloads are decompressed without copies")
+    ap_ext.add_argument("--jobs", type=int, default=1, help="Worker processes for decompression (default: 1, serial)")
+    ap_ext.add_argument("--max-inflight-mb", type=int, default=DEFAULT_INFLIGHT_BYTES // (1024 * 1024),
+                        help="Cap on member bytes queued to workers when --jobs > 1 (default: 256)")
+    ap_ext.add_argument("--member", action="append", metavar="NAME",
+                        help="Extract only this member (repeatable); uses the index to seek straight to it")
+    ap_ext.add_argument("--no-index", action="store_true", help="Ignore the .arcidx sidecar and scan the archive")
+    ap_ext.add_argument("--include", action="append", metavar="PATTERN",
+                        help="Only extract members matching this glob, or regex with a 're:' prefix (repeatable)")
+    ap_ext.add_argument("--exclude", action="append", metavar="PATTERN",
+                        help="Skip members matching this glob, or regex with a 're:' prefix (repeatable)")
+    ap_ext.add_argument("--dedup", nargs="?", const="hardlink", choices=DEDUP_MODES,
+                        help="Link members with identical content to the first extracted copy "
+                             "instead of writing them again (default mode: hardlink)")
+    ap_ext.add_argument("--write-threads", type=int, default=WRITE_BEHIND_THREADS,
+                        help=f"Threads writing decoded members behind decompression when --jobs is 1; "
+                             f"0 writes inline (default: {WRITE_BEHIND_THREADS})")
+    ap_ext.add_argument("--verify", action="store_true",
+                        help="Check content checksums while extracting; stop at the first mismatch")
+    ap_ext.add_argument("--resume", action="store_true",
+                        help="Journal finished members in the output dir and skip them when rerun after an interruption")
+    ap_ext.add_argument("--codec-stats", action="store_true",
+                        help="Print bytes in/out and decompression time per codec")
+
+    ap_new = sub.add_parser("create", help="Pack files/directories into a new archive")
+    ap_new.add_argument("archive", help="Path of the archive to write")
+    ap_new.add_argument("paths", nargs="+", help="Files or directories to pack")
+    ap_new.add_argument("--fmt", required=True, help="Format config file (.ini or .json); the default format is written")
+    ap_new.add_argument("--compression", choices=writable_codecs(), default="lzma", help="Member compression (default: lzma)")
+    ap_new.add_argument("--level", type=int, default=None, help="Compression level/preset (codec default if omitted)")
+    ap_new.add_argument("--checksum", default="md5", help="Header/content checksum algorithm (default: md5)")
+    ap_new.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Compression threads (default: CPU count)")
+    ap_new.add_argument("--max-inflight-mb", type=int, default=DEFAULT_INFLIGHT_BYTES // (1024 * 1024),
+                        help="Cap on file bytes queued to compression threads (default: 256)")
+
+    ap_batch = sub.add_parser("batch", help="List/extract many archives on one process pool")
+    ap_batch.add_argument("archives", nargs="*", help="Archive paths or glob patterns (quote them; ** recurses)")
+    ap_batch.add_argument("--manifest", action="append", metavar="FILE",
+                          help="File listing archive paths, one per line (repeatable)")
+    ap_batch.add_argument("--fmt", required=True, help="Format config file (.ini or .json)")
+    ap_batch.add_argument("--op", choices=BATCH_OPS, default="list", help="Operation per archive (default: list)")
+    ap_batch.add_argument("--out", default="output", help="Base output dir; each archive gets a subdirectory")
+    ap_batch.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    ap_batch.add_argument("--report", default="batch-report.json", help="Aggregated JSON report (default: batch-report.json)")
+    ap_batch.add_argument("--no-size-check", action="store_true", help="Disable uncompressed size verification")
+    ap_batch.add_argument("--mmap", action="store_true", help="Memory-map archives instead of buffered reads")
+    ap_batch.add_argument("--no-index", action="store_true", help="Ignore .arcidx sidecars and scan the archives")
 
     args = ap.parse_args()
 
     if args.cmd == "list":
-        return list_archive(args.archive, args.fmt)
+        return list_archive(args.archive, args.fmt, use_mmap=args.mmap, use_index=not args.no_index)
+    if args.cmd == "build-index":
+        return build_index(args.archive, args.fmt, use_mmap=args.mmap)
+    if args.cmd == "export":
+        return export_archive(args.archive, args.fmt, args.out, to=args.to, use_mmap=args.mmap,
+                              member_filter=MemberFilter(args.include, args.exclude), zip_level=args.zip_level)
+
+    if args.cmd == "salvage":
+        return salvage_archive(args.archive, args.fmt, args.out, list_only=args.list, report_path=args.report,
+                               verify_sizes=not args.no_size_check)
+
     if args.cmd == "extract":
-        return extract_archive(args.archive, args.fmt, args.out, verify_sizes=not args.no_size_check)
+        return extract_archive(args.archive, args.fmt, args.out, verify_sizes=not args.no_size_check,
+                               use_mmap=args.mmap, jobs=args.jobs,
+                               max_inflight_bytes=args.max_inflight_mb * 1024 * 1024,
+                               names=args.member, use_index=not args.no_index, verify=args.verify,
+                               resume=args.resume, member_filter=MemberFilter(args.include, args.exclude),
+                               dedup=args.dedup, write_threads=args.write_threads, codec_stats=args.codec_stats)
+    if args.cmd == "batch":
+        return batch_archives(args.archives, args.fmt, op=args.op, manifests=args.manifest, out_dir=args.out,
+                              jobs=args.jobs, report_path=args.report, verify_sizes=not args.no_size_check,
+                              use_mmap=args.mmap, use_index=not args.no_index)
+    if args.cmd == "create":
+        return create_archive(args.archive, args.fmt, args.paths, comp=args.compression, level=args.level,
+                              jobs=args.jobs, checksum=args.checksum,
+                              max_inflight_bytes=args.max_inflight_mb * 1024 * 1024)
 
     return 2
 
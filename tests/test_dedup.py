@@ -0,0 +1,101 @@
+"""
+--dedup checks for testdata.py: repeated members are linked to their first
+copy (or copied when the filesystem refuses the link), and placeholder
+checksums never count as a content key.
+
+  python -m pytest tests/test_dedup.py
+"""
+
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+sys.path.insert(0, str(REPO_DIR))
+import testdata  # noqa: E402
+
+
+def run_tool(*args, cwd):
+    return subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), *args],
+                          cwd=cwd, capture_output=True, check=True, text=True)
+
+
+def loc(cchecksum_type="md5", cchecksum="9e107d9d372bb6826bd81d3542a419d6"):
+    return testdata.MemberLocation(name="a", comp="lzma", offset=0, csize=10, usize=20,
+                                   cchecksum_type=cchecksum_type, cchecksum=cchecksum)
+
+
+@pytest.mark.parametrize("ctype, checksum", [
+    ("", "9e107d9d"), ("none", "9e107d9d"), ("md5", ""), ("md5", "0"), ("md5", "0000"),
+    ("md5", "0x"), ("md5", "0x000"), ("md5", "0X00"),
+])
+def test_stored_key_ignores_placeholders(ctype, checksum):
+    assert testdata.ExtractDedup.stored_key(loc(ctype, checksum)) is None
+
+
+@pytest.mark.parametrize("checksum", ["9E107D9D", "0x9e107d9d", "x0x0", "00x0", "0x0x"])
+def test_stored_key_keeps_real_checksums(checksum):
+    key = testdata.ExtractDedup.stored_key(loc("MD5", checksum))
+    assert key == ("lzma", 10, 20, "md5", checksum.lower())
+
+
+@pytest.fixture
+def archive(tmp_path):
+    rng = random.Random(7)
+    blob = rng.randbytes(150001)
+    files = {"src/a/x": blob, "src/b/x": blob, "src/b/y": blob, "src/c": b"different\n"}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "--jobs", "1", "src", cwd=tmp_path)
+    return tmp_path, files
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_hardlink_dedup(archive, jobs):
+    tmp_path, files = archive
+    out = run_tool("extract", "t.arc", "--fmt", "fmt.json", "--dedup", "hardlink", "--jobs", jobs,
+                   "--out", "o", cwd=tmp_path).stdout
+
+    assert "Dedup: 2 members hardlinked" in out
+    for name, data in files.items():
+        assert (tmp_path / "o" / name).read_bytes() == data
+    inodes = {os.stat(tmp_path / "o" / name).st_ino for name in ("src/a/x", "src/b/x", "src/b/y")}
+    assert len(inodes) == 1
+    assert os.stat(tmp_path / "o" / "src/c").st_nlink == 1
+
+
+def test_reflink_dedup_falls_back_to_copies(archive):
+    tmp_path, files = archive
+    out = run_tool("extract", "t.arc", "--fmt", "fmt.json", "--dedup", "reflink",
+                   "--out", "o", cwd=tmp_path).stdout
+
+    # Filesystems without FICLONE refuse the reflink; the bytes are copied instead.
+    assert "Dedup: 2 members reflinked" in out or "2 links refused; copied instead" in out
+    for name, data in files.items():
+        assert (tmp_path / "o" / name).read_bytes() == data
+        assert os.stat(tmp_path / "o" / name).st_nlink == 1
+
+
+def test_after_write_links_repeated_output(tmp_path):
+    dedup = testdata.ExtractDedup("hardlink")
+    data = b"same bytes\n" * 100
+    digests = {testdata.DEDUP_DIGEST: hashlib.new(testdata.DEDUP_DIGEST, data).hexdigest()}
+    no_key = loc("none", "")
+    for name in ("one", "two"):
+        (tmp_path / name).write_bytes(data)
+        dedup.after_write(no_key, str(tmp_path / name), digests, f"Extracted {name}")
+
+    assert dedup.linked == 1 and dedup.saved_bytes == len(data)
+    assert os.path.samefile(tmp_path / "one", tmp_path / "two")
@@ -0,0 +1,87 @@
+"""
+Export checks for testdata.py: members whose decompressed pieces are not a
+multiple of tarfile's 16 KiB copy buffer must still come out whole, and a
+zip member whose size disagrees with its header counts as a failure.
+
+  python -m pytest tests/test_export.py
+"""
+
+import io
+import json
+import random
+import subprocess
+import sys
+import tarfile
+import zipfile
+import zlib
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+sys.path.insert(0, str(REPO_DIR))
+import testdata  # noqa: E402
+
+
+def run_tool(*args, cwd):
+    return subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), *args],
+                          cwd=cwd, capture_output=True, check=True)
+
+
+def test_chunk_reader_fills_across_chunks():
+    reader = testdata._ChunkReader([b"a" * 1000, b"", b"b" * 20000])
+    assert reader.read(16384) == b"a" * 1000 + b"b" * 15384
+    assert reader.read(16384) == b"b" * 4616
+    assert reader.read(16384) == b""
+
+
+@pytest.mark.parametrize("compression", ["lzma", "zlib", "bzip2", "lzw"])
+def test_tar_export_odd_sized_pieces(tmp_path, compression):
+    rng = random.Random(2)
+    files = {
+        "src/a/r.bin": rng.randbytes(300001),
+        "src/a/t.txt": b"hello odd sizes\n" * 12345,
+        "src/b/small.txt": b"x" * 7,
+    }
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "--compression", compression, "src", cwd=tmp_path)
+    out = run_tool("export", "t.arc", "--fmt", "fmt.json", "--to", "tar.gz", cwd=tmp_path).stdout
+
+    with tarfile.open(fileobj=io.BytesIO(out), mode="r:gz") as tf:
+        exported = {ti.name: tf.extractfile(ti).read() for ti in tf if ti.isfile()}
+    assert exported == files
+
+
+def test_zip_export_round_trip(tmp_path):
+    files = {"src/a.txt": b"zip me\n" * 5000, "src/b/c.bin": random.Random(3).randbytes(70001)}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "src", cwd=tmp_path)
+    run_tool("export", "t.arc", "--fmt", "fmt.json", "--to", "zip", "--out", "t.zip", cwd=tmp_path)
+
+    with zipfile.ZipFile(tmp_path / "t.zip") as zf:
+        assert {name: zf.read(name) for name in files} == files
+
+
+@pytest.mark.parametrize("usize", [10, 5000])
+def test_zip_size_mismatch_is_a_failure(usize):
+    payload = zlib.compress(b"0123456789" * 100)
+    f = io.BytesIO(payload)
+    r = testdata.Record(ftype="0", name="a.txt", usize=usize, comp="zlib", csize=len(payload), header_pos=0,
+                        mode=0o100644)
+    loc = testdata.MemberLocation(name="a.txt", comp="zlib", offset=0, csize=len(payload), usize=usize)
+    with zipfile.ZipFile(io.BytesIO(), "w") as zf:
+        ok, msg = testdata._export_member_zip(zf, f, "a.txt", r, loc, zipfile.ZIP_DEFLATED)
+    assert not ok
+    assert msg == f"SIZE MISMATCH for a.txt: got 1000 bytes, header says {usize}"
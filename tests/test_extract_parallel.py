@@ -0,0 +1,53 @@
+"""
+Parallel extraction checks for testdata.py: a path that occurs more than once
+is only handed to the workers for its last member.
+
+  python -m pytest tests/test_extract_parallel.py
+"""
+
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+sys.path.insert(0, str(REPO_DIR))
+import testdata  # noqa: E402
+
+
+def run_tool(*args, cwd):
+    return subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), *args],
+                          cwd=cwd, capture_output=True, check=True, text=True)
+
+
+def loc(name, offset):
+    return testdata.MemberLocation(name=name, comp="lzma", offset=offset, csize=1, usize=1)
+
+
+def test_last_per_path_keeps_last_member_in_order():
+    members = [loc("./a", 0), loc("b", 10), loc("/a", 20), loc("c", 30), loc("b", 40)]
+    kept = testdata.last_per_path(members)
+    assert [m.offset for m in kept] == [20, 30, 40]
+
+
+def test_parallel_extract_skips_replaced_members(tmp_path):
+    rng = random.Random(5)
+    files = {f"src/f{i}": rng.randbytes(50000 * i) for i in (1, 2, 3)}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+
+    # src/f2 is stored twice, then the whole tree again.
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "--jobs", "1", "src", "src/f2", "src", cwd=tmp_path)
+    out = run_tool("extract", "t.arc", "--fmt", "fmt.json", "--jobs", "3", "--out", "o", cwd=tmp_path).stdout
+
+    assert "Skipped 4 members replaced by a later member with the same path" in out
+    assert out.count("Extracted src/f2 ") == 1
+    for name, data in files.items():
+        assert (tmp_path / "o" / name).read_bytes() == data
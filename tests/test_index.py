@@ -0,0 +1,113 @@
+"""
+.arcidx sidecar checks for testdata.py: build-index, lookups by member name,
+and falling back to a scan once the archive no longer matches the index.
+
+  python -m pytest tests/test_index.py
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+sys.path.insert(0, str(REPO_DIR))
+import testdata  # noqa: E402
+
+
+def run_tool(*args, cwd):
+    return subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), *args],
+                          cwd=cwd, capture_output=True, check=True, text=True)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    rng = random.Random(11)
+    files = {f"src/d{i % 3}/f{i}.bin": rng.randbytes(rng.randint(0, 40000)) for i in range(12)}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "--jobs", "1", "src", cwd=tmp_path)
+    return tmp_path, files
+
+
+def test_build_index_and_lookup(archive):
+    tmp_path, files = archive
+    out = run_tool("build-index", "t.arc", "--fmt", "fmt.json", cwd=tmp_path).stdout
+    assert "Wrote index" in out
+
+    index = testdata.load_index(str(tmp_path / "t.arc"))
+    assert index is not None
+    for name, data in files.items():
+        for spelling in (name, "./" + name, "/" + name):
+            e = index.lookup(spelling)
+            assert e is not None and e.ftype == "0" and e.usize == len(data)
+    assert index.lookup("src/missing.bin") is None
+    positions = [e.header_pos for e in index.in_archive_order()]
+    assert positions == sorted(positions)
+
+
+def test_extract_member_uses_index(archive):
+    tmp_path, files = archive
+    run_tool("build-index", "t.arc", "--fmt", "fmt.json", cwd=tmp_path)
+    wanted = ["src/d1/f4.bin", "./src/d2/f11.bin"]
+    out = run_tool("extract", "t.arc", "--fmt", "fmt.json", "--out", "o",
+                   "--member", wanted[0], "--member", wanted[1], cwd=tmp_path).stdout
+
+    assert "Using index:" in out
+    extracted = sorted(p.relative_to(tmp_path / "o").as_posix() for p in (tmp_path / "o").rglob("*") if p.is_file())
+    assert extracted == ["src/d1/f4.bin", "src/d2/f11.bin"]
+    for name in extracted:
+        assert (tmp_path / "o" / name).read_bytes() == files[name]
+
+
+def test_stale_index_is_ignored(archive):
+    tmp_path, files = archive
+    arc = tmp_path / "t.arc"
+    run_tool("build-index", "t.arc", "--fmt", "fmt.json", cwd=tmp_path)
+    st = os.stat(arc)
+    os.utime(arc, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert testdata.load_index(str(arc)) is None
+    out = run_tool("extract", "t.arc", "--fmt", "fmt.json", "--out", "o", "--member", "src/d0/f3.bin",
+                   cwd=tmp_path).stdout
+    assert "Using index:" not in out
+    assert (tmp_path / "o/src/d0/f3.bin").read_bytes() == files["src/d0/f3.bin"]
+
+
+def test_index_file_round_trip_and_damage(tmp_path):
+    arc = tmp_path / "a.arc"
+    arc.write_bytes(b"x" * 100)
+    entries = [
+        testdata.IndexEntry(name="./b", ftype="0", comp="lzma", header_pos=50, offset=60, csize=5, usize=9,
+                            hchecksum_type="md5", hchecksum="ab", cchecksum_type="crc32", cchecksum="cd"),
+        testdata.IndexEntry(name="a/é", ftype="5", comp="", header_pos=10, offset=-1, csize=0, usize=0),
+    ]
+    path = testdata.write_index(str(arc), entries)
+    index = testdata.load_index(str(arc))
+    assert sorted(index.entries, key=lambda e: e.header_pos) == sorted(entries, key=lambda e: e.header_pos)
+    assert index.lookup("a/é").location() is None
+    assert index.lookup("b").location().offset == 60
+
+    raw = Path(path).read_bytes()
+    Path(path).write_bytes(raw[:-3])
+    assert testdata.load_index(str(arc)) is None
+    Path(path).write_bytes(b"NOTINDEX" + raw[8:])
+    assert testdata.load_index(str(arc)) is None
+
+
+def test_lookup_returns_last_copy_of_a_name():
+    entries = [testdata.IndexEntry(name=name, ftype="0", comp="lzma", header_pos=pos, offset=pos + 5,
+                                   csize=1, usize=1)
+               for name, pos in (("./a", 0), ("b", 10), ("a", 20), ("/a", 30), ("c", 40))]
+    index = testdata.ArchiveIndex(entries)
+    assert index.lookup("a").header_pos == 30
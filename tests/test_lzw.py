@@ -0,0 +1,228 @@
+"""
+Round trips for neozcompress.py: the headerless 16-bit format and the
+compress (.Z) style bit-packed format, at table sizes that are and are not
+powers of two; block mode and its CLEAR code; the streaming
+LZWCompressor/LZWDecompressor fed across arbitrary chunk boundaries; plus
+the altzcompress.py string wrappers.
+
+  python -m pytest tests/test_lzw.py
+"""
+
+import io
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(REPO_DIR))
+import altzcompress  # noqa: E402
+import neozcompress  # noqa: E402
+
+TABLE_SIZES = [256, 300, 512, 1000, 4096, 5000, 65536, 100000]
+
+
+def corpus(size=200000, seed=1):
+    rng = random.Random(seed)
+    words = [rng.randbytes(rng.randint(2, 9)) for _ in range(50)]
+    text = b" ".join(rng.choice(words) for _ in range(size // 6))[:size]
+    return text + rng.randbytes(size // 8) + b"a" * (size // 4)
+
+
+@pytest.mark.parametrize("data", [b"", b"a", b"ab" * 3, b"\x00" * 70000, corpus()],
+                         ids=["empty", "one", "short", "zeros", "mixed"])
+@pytest.mark.parametrize("table_size", TABLE_SIZES)
+def test_variable_width_round_trip(data, table_size):
+    packed = neozcompress.lzw_compress_bytes(data, table_size, block_mode=False)
+    assert neozcompress.lzw_decompress_bytes(packed) == data
+    if data:
+        assert packed[:2] == neozcompress.MAGIC_BYTES
+        assert packed[2] == neozcompress.lzw_max_bits(table_size)
+
+
+@pytest.mark.parametrize("table_size", [512, 1000, 4096, 65536])
+def test_fixed_width_round_trip(table_size):
+    data = corpus(50000)
+    packed = neozcompress.lzw_compress_bytes(data, table_size, fixed_width=True)
+    assert len(packed) % 2 == 0
+    assert neozcompress.lzw_decompress_bytes(packed, table_size) == data
+
+
+@pytest.mark.parametrize("table_size, maxbits", [
+    (1, 9), (256, 9), (512, 9), (513, 10), (1000, 10), (4096, 12), (4097, 13), (65536, 16), (1 << 20, 16),
+])
+def test_max_bits_rounds_up(table_size, maxbits):
+    assert neozcompress.lzw_max_bits(table_size) == maxbits
+
+
+def test_variable_width_is_smaller_than_fixed():
+    data = corpus()
+    fixed = neozcompress.lzw_compress_bytes(data, 4096, fixed_width=True)
+    packed = neozcompress.lzw_compress_bytes(data, 4096, block_mode=False)
+    assert len(packed) < len(fixed)
+
+
+def test_unpack_reports_header():
+    packed = neozcompress.lzw_compress_bytes(corpus(20000), 1000, block_mode=False)
+    codes, table_size, block_mode = neozcompress.lzw_unpack_codes(packed)
+    assert (table_size, block_mode) == (1024, False)
+    assert max(codes) < 1000
+    assert neozcompress.lzw_pack_codes(codes, 1000) == packed
+
+
+def test_truncated_header_is_rejected():
+    with pytest.raises(ValueError):
+        neozcompress.lzw_decompress_bytes(neozcompress.MAGIC_BYTES)
+
+
+@pytest.mark.skipif(shutil.which("gzip") is None, reason="gzip not installed")
+@pytest.mark.parametrize("table_size", [512, 1000, 65536])
+def test_gzip_reads_variable_width(table_size):
+    data = corpus()
+    packed = neozcompress.lzw_compress_bytes(data, table_size, block_mode=False)
+    out = subprocess.run(["gzip", "-dc"], input=packed, capture_output=True, check=True).stdout
+    assert out == data
+
+
+@pytest.mark.parametrize("table_size", [512, 1000, 4096])
+def test_altz_string_round_trip(table_size):
+    text = "A wiki (/\u02c8w\u026aki/ \u24d8 WICK-ee) is a form of hypertext publication. " * 200
+    packed = altzcompress.compress_str_to_bytes(text, table_size)
+    assert packed.startswith(altzcompress.MAGIC_BYTES)
+    assert packed == neozcompress.compress_str_to_bytes(text, table_size)
+    assert altzcompress.decompress_bytes_to_str(packed) == text
+
+
+@pytest.mark.parametrize("text", ["", "x", "hello hello hello " * 50])
+def test_altz_reads_legacy_layout(text):
+    # Older altzcompress output: the magic, then 16-bit codes.
+    codes = neozcompress.lzw_compress_bytes_core(text.encode("utf-8"), 4096)
+    legacy = altzcompress.MAGIC_BYTES + b"".join(code.to_bytes(2, "big") for code in codes)
+    assert altzcompress.decompress_bytes_to_str(legacy) == text
+
+
+def test_altz_requires_magic():
+    with pytest.raises(ValueError):
+        altzcompress.decompress_bytes_to_bytes(neozcompress.lzw_compress_bytes(b"abc", fixed_width=True))
+
+
+def stream_decode(packed, feed, max_length=0, table_size=4096):
+    """Decode packed in feed-byte pieces the way a zlib-style caller does."""
+    d = neozcompress.LZWDecompressor(table_size)
+    out = []
+    for i in range(0, len(packed), feed):
+        data = packed[i:i + feed]
+        while data:
+            piece = d.decompress(data, max_length)
+            assert not max_length or len(piece) <= max_length
+            out.append(piece)
+            data = d.unconsumed_tail
+    out.append(d.flush())
+    assert d.eof
+    return b"".join(out)
+
+
+@pytest.mark.parametrize("feed", [1, 3, 1000, 65536])
+@pytest.mark.parametrize("max_length", [0, 1, 4096])
+@pytest.mark.parametrize("block_mode", [False, True])
+def test_streaming_decoder_across_chunks(feed, max_length, block_mode):
+    data = corpus(30000 if feed < 100 or max_length == 1 else 200000)
+    packed = neozcompress.lzw_compress_bytes(data, 512, block_mode=block_mode)
+    assert stream_decode(packed, feed, max_length) == data
+
+
+@pytest.mark.parametrize("table_size", [512, 4096])
+def test_streaming_decoder_reads_fixed_width(table_size):
+    data = corpus(50000)
+    packed = neozcompress.lzw_compress_bytes(data, table_size, fixed_width=True)
+    assert stream_decode(packed, 777, 5000, table_size) == data
+
+
+def test_streaming_decoder_rebuilds_entries_past_history(monkeypatch):
+    # Entries older than the history window are spelled out from the prefix table.
+    monkeypatch.setattr(neozcompress, "STREAM_HISTORY", 3000)
+    rng = random.Random(4)
+    data = b"".join(rng.choice([b"abcabcabd" * 40, rng.randbytes(300), b"z" * 2000]) for _ in range(200))
+    packed = neozcompress.lzw_compress_bytes(data, 65536, block_mode=False)
+    assert stream_decode(packed, 500, 700) == data
+
+
+@pytest.mark.parametrize("chunk", [1, 10, 9999, 10 ** 6])
+@pytest.mark.parametrize("block_mode", [False, True])
+def test_streaming_compressor_matches_one_shot(chunk, block_mode):
+    data = corpus(40000 if chunk < 100 else 300000)
+    comp = neozcompress.LZWCompressor(1000, block_mode=block_mode)
+    pieces = [comp.compress(data[i:i + chunk]) for i in range(0, len(data), chunk)]
+    streamed = b"".join(pieces) + comp.flush()
+    assert streamed == neozcompress.lzw_compress_bytes(data, 1000, block_mode=block_mode)
+
+
+def test_file_helpers_round_trip():
+    data = corpus()
+    packed, out = io.BytesIO(), io.BytesIO()
+    neozcompress.lzw_compress_file(io.BytesIO(data), packed, 4096, chunk_size=3333)
+    neozcompress.lzw_decompress_file(io.BytesIO(packed.getvalue()), out, chunk_size=2048)
+    assert out.getvalue() == data
+
+
+def mixed_corpus(seed=6):
+    """Segments of unrelated data, so a full table stops fitting and block mode clears it."""
+    rng = random.Random(seed)
+    segments = []
+    for i in range(6):
+        alphabet = rng.randbytes(6)
+        segments.append(bytes(rng.choice(alphabet) for _ in range(60000)))
+    return b"".join(segments)
+
+
+@pytest.mark.parametrize("table_size", [512, 4096])
+def test_block_mode_clears_and_round_trips(table_size):
+    data = mixed_corpus()
+    packed = neozcompress.lzw_compress_bytes(data, table_size, block_mode=True)
+    assert packed[2] & neozcompress.FLAG_BLOCK_MODE
+    codes, _, block_mode = neozcompress.lzw_unpack_codes(packed)
+    assert block_mode and neozcompress.CLEAR in codes
+    assert neozcompress.lzw_decompress_bytes(packed) == data
+    assert stream_decode(packed, 4099, 8192) == data
+
+
+def test_block_mode_beats_a_full_table():
+    data = mixed_corpus()
+    plain = neozcompress.lzw_compress_bytes(data, 4096, block_mode=False)
+    block = neozcompress.lzw_compress_bytes(data, 4096, block_mode=True)
+    assert len(block) < len(plain)
+
+
+def test_clear_resets_table_and_width():
+    # Two independently compressed segments joined by CLEAR: the second must
+    # decode against a fresh table, starting again at 9-bit codes.
+    first = corpus(30000, seed=8)
+    second = corpus(30000, seed=9)
+    codes = (neozcompress.lzw_compress_bytes_core(first, 4096, block_mode=True) + [neozcompress.CLEAR]
+             + neozcompress.lzw_compress_bytes_core(second, 4096, block_mode=True))
+    assert max(codes) >= 2048     # the first table reached 12-bit codes
+    packed = neozcompress.lzw_pack_codes(codes, 4096, block_mode=True)
+
+    assert neozcompress.lzw_unpack_codes(packed) == (codes, 4096, True)
+    assert neozcompress.lzw_decompress_bytes(packed) == first + second
+    for feed in (1, 2, 64, 1000):
+        assert stream_decode(packed, feed) == first + second
+
+
+def test_block_mode_rejects_code_past_table():
+    packed = neozcompress.lzw_pack_codes([97, 98, 300], 4096, block_mode=True)
+    with pytest.raises(ValueError):
+        neozcompress.lzw_decompress_bytes(packed)
+
+
+@pytest.mark.skipif(shutil.which("gzip") is None, reason="gzip not installed")
+@pytest.mark.parametrize("table_size", [512, 65536])
+def test_gzip_reads_block_mode(table_size):
+    data = mixed_corpus()
+    packed = neozcompress.lzw_compress_bytes(data, table_size, block_mode=True)
+    out = subprocess.run(["gzip", "-dc"], input=packed, capture_output=True, check=True).stdout
+    assert out == data
@@ -0,0 +1,126 @@
+"""
+--resume checks for testdata.py: the extraction journal, picking up after an
+interrupted run, and re-extracting files that no longer match the journal.
+
+  python -m pytest tests/test_resume.py
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+sys.path.insert(0, str(REPO_DIR))
+import testdata  # noqa: E402
+
+
+def run_tool(*args, cwd):
+    return subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), *args],
+                          cwd=cwd, capture_output=True, check=True, text=True)
+
+
+def extract(tmp_path, *extra):
+    return run_tool("extract", "t.arc", "--fmt", "fmt.json", "--out", "o", "--resume", *extra, cwd=tmp_path).stdout
+
+
+def journal_lines(tmp_path):
+    return (tmp_path / "o" / testdata.JOURNAL_NAME).read_text(encoding="utf-8").splitlines()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    rng = random.Random(13)
+    files = {f"src/f{i:02d}.bin": rng.randbytes(rng.randint(1, 30000)) for i in range(20)}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+    run_tool("create", "t.arc", "--fmt", "fmt.json", "--jobs", "1", "src", cwd=tmp_path)
+    return tmp_path, files
+
+
+def assert_extracted(tmp_path, files):
+    for name, data in files.items():
+        assert (tmp_path / "o" / name).read_bytes() == data
+
+
+def test_journal_records_every_member(archive):
+    tmp_path, files = archive
+    extract(tmp_path)
+    lines = journal_lines(tmp_path)
+    head = json.loads(lines[0])
+    assert head["archive"] == "t.arc" and head["size"] == os.path.getsize(tmp_path / "t.arc")
+    entries = [json.loads(line) for line in lines[1:]]
+    assert sorted(testdata.member_key(e["name"]) for e in entries) == sorted(files)
+    assert all(e["ok"] for e in entries)
+
+    out = extract(tmp_path)
+    assert f"Resuming: {len(files)} members already extracted" in out
+    assert "Done. Extracted 0 files" in out
+
+
+@pytest.mark.parametrize("jobs", ["1", "3"])
+def test_resume_after_interrupted_run(archive, jobs):
+    tmp_path, files = archive
+    extract(tmp_path)
+    # Simulate a crash after 8 members: a short journal with a torn last line,
+    # and nothing on disk past the recorded members.
+    lines = journal_lines(tmp_path)
+    kept = [json.loads(line) for line in lines[1:9]]
+    (tmp_path / "o" / testdata.JOURNAL_NAME).write_text("\n".join(lines[:9]) + '\n{"name": "./src/f', encoding="utf-8")
+    recorded = {testdata.member_key(e["name"]) for e in kept}
+    for name in files:
+        if name not in recorded:
+            (tmp_path / "o" / name).unlink()
+
+    out = extract(tmp_path, "--jobs", jobs)
+    assert "Resuming: 8 members already extracted" in out
+    assert f"Done. Extracted {len(files) - 8} files" in out
+    assert_extracted(tmp_path, files)
+    assert len(journal_lines(tmp_path)) == len(files) + 1
+
+
+def test_resume_re_extracts_changed_file(archive):
+    tmp_path, files = archive
+    extract(tmp_path)
+    # The newest entries are always re-hashed, so a damaged last file is noticed.
+    last = testdata.member_key(json.loads(journal_lines(tmp_path)[-1])["name"])
+    (tmp_path / "o" / last).write_bytes(b"damaged")
+
+    out = extract(tmp_path)
+    assert f"Resuming: {len(files) - 1} members already extracted" in out
+    assert "Done. Extracted 1 files" in out
+    assert_extracted(tmp_path, files)
+
+
+def test_journal_for_other_archive_is_ignored(archive):
+    tmp_path, files = archive
+    extract(tmp_path)
+    arc = tmp_path / "t.arc"
+    st = os.stat(arc)
+    os.utime(arc, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert testdata.load_journal(str(arc), str(tmp_path / "o")) == []
+    out = extract(tmp_path)
+    assert "Ignoring journal" in out
+    assert f"Done. Extracted {len(files)} files" in out
+    assert_extracted(tmp_path, files)
+
+
+def test_resume_start_stops_at_first_gap():
+    def entry(offset, csize, ok=True):
+        return testdata.JournalEntry(name="x", offset=offset, csize=csize, usize=0, digest="", ok=ok)
+
+    assert testdata.resume_start([]) == 0
+    assert testdata.resume_start([entry(10, 5), entry(20, 5)]) == 25
+    assert testdata.resume_start([entry(10, 5), entry(20, 5, ok=False), entry(30, 5)]) == 15
+    assert testdata.resume_start([entry(10, 5), entry(40, 5), entry(20, 5)]) == 45
@@ -0,0 +1,132 @@
+"""
+Checks for the reader in test.py: the bounded-read header decoder and lazily
+loaded ArchiveMember entries.
+
+  python -m pytest tests/test_testpy.py
+"""
+
+import importlib.util
+import io
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FORMAT = {"config": {"default": "ArchiveFile"},
+          "ArchiveFile": {"magic": "ArchiveFile", "hex": "4172636869766546696c65", "delimiter": "\u0000",
+                          "name": "ArchiveFile", "extension": ".arc"}}
+
+# "test" would be the standard library's package, so load test.py by path.
+_spec = importlib.util.spec_from_file_location("archive_test", REPO_DIR / "test.py")
+archive_test = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(archive_test)
+
+
+class NoTell(io.BytesIO):
+    def tell(self):
+        raise io.UnsupportedOperation("tell")
+
+
+def header_bytes(fields, delim="\x00", pad=0):
+    body = delim.join(fields) + delim
+    return ("0" * pad + format(len(body) - len(delim), "x") + delim + body).encode("UTF-8")
+
+
+@pytest.mark.parametrize("probe_size", [4, 16, 512])
+@pytest.mark.parametrize("pad", [0, 40])
+def test_header_read_leaves_file_at_payload(monkeypatch, probe_size, pad):
+    monkeypatch.setattr(archive_test, "__header_probe_size__", probe_size)
+    fields = ["0", "name.txt", "x" * 100, "md5"]
+    fp = NoTell(header_bytes(fields, pad=pad) + b"PAYLOAD")
+    out = archive_test.ReadFileHeaderDataBySize(fp)
+    assert out[1:] == fields
+    assert int(out[0], 16) == len("\x00".join(fields))
+    assert fp.read() == b"PAYLOAD"
+
+
+def test_header_read_at_end_of_file():
+    assert archive_test.ReadFileHeaderDataBySize(io.BytesIO(b"")) == []
+
+
+class ReadLog(io.BytesIO):
+    """Records the (start, end) span of every read()."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.spans = []
+
+    def read(self, size=-1):
+        start = self.tell()
+        out = super().read(size)
+        self.spans.append((start, start + len(out)))
+        return out
+
+
+@pytest.fixture
+def archive(tmp_path):
+    rng = random.Random(5)
+    files = {"src/a.bin": rng.randbytes(5000), "src/b.txt": b"hello " * 2000, "src/empty": b""}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "fmt.json").write_text(json.dumps(FORMAT))
+    subprocess.run([sys.executable, str(REPO_DIR / "testdata.py"), "create", "t.arc", "--fmt", "fmt.json",
+                    "--jobs", "1", "src"], cwd=tmp_path, capture_output=True, check=True)
+    return (tmp_path / "t.arc").read_bytes(), files
+
+
+def read_members(data, lazy):
+    return archive_test.ReadFileDataWithContentToArray(io.BytesIO(data), formatspecs=archive_test.__file_format_dict__,
+                                                       lazy=lazy)["ffilelist"]
+
+
+def test_lazy_listing_reads_no_content(monkeypatch, archive):
+    # A small header probe, so over-read bytes are not mistaken for content reads.
+    monkeypatch.setattr(archive_test, "__header_probe_size__", 16)
+    data, files = archive
+    fp = ReadLog(data)
+    members = archive_test.ReadFileDataWithContentToArray(fp, formatspecs=archive_test.__file_format_dict__,
+                                                          lazy=True)["ffilelist"]
+    assert all(isinstance(m, archive_test.ArchiveMember) for m in members)
+    assert sorted(m.fname for m in members if m.ftype == 0) == sorted("./" + name for name in files)
+    stored = [(m.fcontentstart, m.fcontentstart + m.fstoredsize) for m in members if m.fstoredsize]
+    assert stored
+    for start, end in fp.spans:
+        assert not any(start < cend and cstart < end for cstart, cend in stored)
+
+
+def test_lazy_read_matches_files(archive):
+    data, files = archive
+    members = {m.fname: m for m in read_members(data, lazy=True)}
+    for name, content in files.items():
+        member = members["./" + name]
+        assert member.fsize == len(content)
+        assert member.read() == content
+        # read() leaves the archive where it was, so reads can come in any order.
+        assert member.read() == content
+
+
+def test_to_dict_matches_eager_entry(archive):
+    data, _ = archive
+    eager = read_members(data, lazy=False)
+    lazy = read_members(data, lazy=True)
+    assert [m.fid for m in lazy] == [e["fid"] for e in eager]
+    for member, entry in zip(lazy, eager):
+        got = member.to_dict()
+        assert got.pop("fcontents").read() == entry.pop("fcontents").read()
+        assert got == entry
+
+
+def test_lazy_read_detects_damaged_content(archive):
+    data, files = archive
+    member = next(m for m in read_members(data, lazy=True) if m.fname == "./src/a.bin")
+    damaged = bytearray(data)
+    damaged[member.fcontentstart + 10] ^= 0xFF
+    member = next(m for m in read_members(bytes(damaged), lazy=True) if m.fname == "./src/a.bin")
+    with pytest.raises(ValueError, match="Checksum Error"):
+        member.read()
+    assert len(member.read(uncompress=False, skipchecksum=True)) == member.fstoredsize